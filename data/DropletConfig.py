@@ -20,6 +20,7 @@ class ConfigModel(BaseModel):
         DEFAULT_USER (str): The default user account to be used for accessing the droplet.
         SSH_DO_USER_NAME (str): The name of the SSH key user configured on DigitalOcean.
         DO_PROJECT_NAME (str): The name of the project in DigitalOcean under which the droplet will be organized.
+        APT_UPGRADE (bool): Whether to upgrade the system packages while provisioning the droplet.
     """
     DROPLET_NAME: str
     DROPLET_REGION: str
@@ -27,6 +28,7 @@ class ConfigModel(BaseModel):
     DROPLET_SIZE: str
     DEFAULT_USER: str
     DO_PROJECT_NAME: str
+    APT_UPGRADE: bool = False
 
 
 @singleton
@@ -43,6 +45,7 @@ class DropletConfig:
         ssh_do_user_name (str): The name of the SSH key user configured on DigitalOcean.
         do_project_name (str): The name of the project in DigitalOcean under which the droplet will be organized.
         droplet_name_pattern (str): The pattern that the droplet name must follow.
+        apt_upgrade (bool): Whether to upgrade the system packages while provisioning the droplet.
     """
     def __init__(self, config_path: str = join(getcwd(), 'configs', 'droplet_config.json')):
         self.config_path = config_path
@@ -54,6 +57,7 @@ class DropletConfig:
         self.size = self._config.DROPLET_SIZE
         self.default_user = self._config.DEFAULT_USER
         self.do_project_name = self._config.DO_PROJECT_NAME
+        self.apt_upgrade = self._config.APT_UPGRADE
         self._verify_droplet_name_pattern()
 
     def _get_droplet_name(self) -> str:
@@ -1,6 +1,21 @@
 # -*- coding: utf-8 -*-
-from .DropletConfig import DropletConfig
-from .puppeter_chrome_config import PuppeteerChromeConfig
-from .ssh_config import SSHConfig
+from importlib import import_module
+
 from .decorators import *
 from .test_exceptions import *
+
+# The configurations are imported on the first access, so a task loads only the pydantic models it uses
+_configs = {
+    'DropletConfig': '.DropletConfig',
+    'PuppeteerChromeConfig': '.puppeter_chrome_config',
+    'SSHConfig': '.ssh_config',
+    'PoolConfig': '.pool_config',
+    'SizingConfig': '.sizing_config',
+    'ArtifactConfig': '.artifact_config',
+}
+
+
+def __getattr__(name: str):
+    if name in _configs:
+        return getattr(import_module(_configs[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
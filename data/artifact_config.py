@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import json
+from os import getcwd
+from os.path import join
+
+from pydantic import BaseModel, Field
+from .decorators import singleton
+
+
+class ArtifactConfigModel(BaseModel):
+    """
+    Data model for the provisioning artifact cache configuration.
+    The sources may be URLs, file:// URLs or local paths, so the cache can be filled from a local stand-in.
+
+    Attributes:
+        chrome_deb_url (str): The source of the GoogleChrome .deb package.
+        node_dist_url (str): The NodeJs distribution directory with SHASUMS256.txt and the linux-x64 tarball.
+        build_tools_repo (str): The build_tools repository.
+        max_age (int): The time (in seconds) after which a cached artifact is fetched again.
+    """
+    chrome_deb_url: str = 'https://dl.google.com/linux/direct/google-chrome-stable_current_amd64.deb'
+    node_dist_url: str = 'https://nodejs.org/dist/latest-v20.x'
+    build_tools_repo: str = 'https://github.com/ONLYOFFICE/build_tools.git'
+    max_age: int = Field(default=86400, ge=0)
+
+
+@singleton
+class ArtifactConfig:
+    """
+    Singleton class to manage the provisioning artifact cache configuration.
+
+    Attributes:
+        config_path (str): Path to the artifact configuration JSON file.
+    """
+
+    def __init__(self, config_path: str = join(getcwd(), 'configs', 'artifact_config.json')):
+        self.config_path = config_path
+        self._config = self._load_config(self.config_path)
+
+    @property
+    def chrome_deb_url(self) -> str:
+        """
+        Gets the source of the GoogleChrome .deb package.
+
+        :return: The URL or the local path of the package.
+        """
+        return self._config.chrome_deb_url
+
+    @property
+    def node_dist_url(self) -> str:
+        """
+        Gets the NodeJs distribution directory.
+
+        :return: The URL or the local path of the directory.
+        """
+        return self._config.node_dist_url
+
+    @property
+    def build_tools_repo(self) -> str:
+        """
+        Gets the build_tools repository.
+
+        :return: The URL or the local path of the repository.
+        """
+        return self._config.build_tools_repo
+
+    @property
+    def max_age(self) -> int:
+        """
+        Gets the time (in seconds) after which a cached artifact is fetched again.
+
+        :return: The maximum age of a cached artifact.
+        """
+        return self._config.max_age
+
+    @staticmethod
+    def _load_config(file_path: str) -> ArtifactConfigModel:
+        """
+        Loads the artifact configuration from a JSON file and returns an instance of ArtifactConfigModel.
+
+        :param file_path: The path to the artifact configuration JSON file.
+        :return: An instance of ArtifactConfigModel containing the loaded configuration.
+        """
+        with open(file_path, 'r') as f:
+            return ArtifactConfigModel(**json.load(f))
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from rich import print
 from functools import wraps
-import digitalocean
 
 
 def singleton(class_):
@@ -18,6 +17,7 @@ def singleton(class_):
 def droplet_exists(method):
     @wraps(method)
     def wrapper(self, *args, **kwargs):
+        import digitalocean
 
         if not self.droplet:
             return print("[red]|ERROR| Droplet was not found.")
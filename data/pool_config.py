@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import json
+from os import getcwd
+from os.path import join
+
+from pydantic import BaseModel, Field
+from .decorators import singleton
+
+
+class PoolConfigModel(BaseModel):
+    """
+    Data model for the warm droplet pool configuration.
+
+    Attributes:
+        size (int): The number of warm droplets kept in the pool per browser and image.
+        idle_ttl (int): The time (in seconds) after which an idle droplet is removed from the pool.
+    """
+    size: int = Field(default=1, ge=0)
+    idle_ttl: int = Field(default=3600, ge=0)
+
+
+@singleton
+class PoolConfig:
+    """
+    Singleton class to manage the warm droplet pool configuration.
+
+    Attributes:
+        config_path (str): Path to the pool configuration JSON file.
+    """
+
+    def __init__(self, config_path: str = join(getcwd(), 'configs', 'pool_config.json')):
+        self.config_path = config_path
+        self._config = self._load_config(self.config_path)
+
+    @property
+    def size(self) -> int:
+        """
+        Gets the number of warm droplets kept in the pool per browser and image.
+
+        :return: The pool size.
+        """
+        return self._config.size
+
+    @property
+    def idle_ttl(self) -> int:
+        """
+        Gets the time (in seconds) after which an idle droplet is removed from the pool.
+
+        :return: The idle time to live.
+        """
+        return self._config.idle_ttl
+
+    @staticmethod
+    def _load_config(file_path: str) -> PoolConfigModel:
+        """
+        Loads the pool configuration from a JSON file and returns an instance of PoolConfigModel.
+
+        :param file_path: The path to the pool configuration JSON file.
+        :return: An instance of PoolConfigModel containing the loaded configuration.
+        """
+        with open(file_path, 'r') as f:
+            return PoolConfigModel(**json.load(f))
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import json
+from copy import copy, deepcopy
 from os import getcwd
 from os.path import join
 
@@ -51,9 +52,13 @@ class FullConfigModel(BaseModel):
 
 @singleton
 class PuppeteerChromeConfig:
+    executable_paths = {'chrome': '/usr/bin/google-chrome-stable', 'firefox': '/usr/bin/firefox'}
+
     def __init__(self, config_path: str = join(getcwd(), 'configs', 'puppeteer_chrome_config.json')):
         self.config_path = config_path
-        self._config = self._load_config(self.config_path)
+        self.file_path = config_path
+        self._data = self._read_json(self.config_path)
+        self._config = FullConfigModel(**self._data)
         self.test_options = self._config.testOptions
         self.puppeteer_options = self._config.puppeteerOptions
         self.report_options = self._config.reportOptions
@@ -62,10 +67,65 @@ class PuppeteerChromeConfig:
         self._verify_browser_type()
         self._verify_document_server_url()
 
+    def for_browser(self, browser: str, config_path: str) -> "PuppeteerChromeConfig":
+        """
+        Create a copy of the configuration for another browser and save it to a separate file.
+        If the browser differs from the configured one, its default executable path is used.
+        The other keys of the configuration file are copied as is.
+
+        :param browser: The browser of the copy.
+        :param config_path: The path to save the configuration file of the copy to.
+        :return: The configuration for the browser.
+        """
+        config = self._copy()
+        config.browser = browser.lower()
+        config._verify_browser_type()
+
+        if config.browser != self.browser:
+            config._config.puppeteerOptions.browser = config.browser
+            config._config.puppeteerOptions.executablePath = self.executable_paths[config.browser]
+            config._data['puppeteerOptions']['browser'] = config.browser
+            config._data['puppeteerOptions']['executablePath'] = self.executable_paths[config.browser]
+
+        return config._save(config_path)
+
+    def for_target(self, ds_url: str, config_path: str) -> "PuppeteerChromeConfig":
+        """
+        Create a copy of the configuration for another DocumentServer and save it to a separate file.
+        The other keys of the configuration file are copied as is.
+
+        :param ds_url: The URL of the DocumentServer example, e.g. https://host/example.
+        :param config_path: The path to save the configuration file of the copy to.
+        :return: The configuration for the DocumentServer.
+        :raises PuppeteerChromeConfigError: If the URL does not end with '/example'.
+        """
+        config = self._copy()
+        config.ds_url = ds_url.rstrip('/')
+        config._config.testOptions.url = config.ds_url
+        config._data['testOptions']['url'] = config.ds_url
+        config._verify_document_server_url()
+        return config._save(config_path)
+
+    def _copy(self) -> "PuppeteerChromeConfig":
+        config = copy(self)
+        config._config = self._config.model_copy(deep=True)
+        config._data = deepcopy(self._data)
+        return config
+
+    def _save(self, file_path: str) -> "PuppeteerChromeConfig":
+        self.test_options = self._config.testOptions
+        self.puppeteer_options = self._config.puppeteerOptions
+        self.report_options = self._config.reportOptions
+        self.file_path = file_path
+
+        with open(file_path, 'w') as f:
+            json.dump(self._data, f, indent=4)
+        return self
+
     @staticmethod
-    def _load_config(file_path: str) -> FullConfigModel:
+    def _read_json(file_path: str) -> dict:
         with open(file_path, 'r') as f:
-            return FullConfigModel(**json.load(f))
+            return json.load(f)
 
     def _verify_browser_type(self):
         if self.browser not in ["chrome", "firefox"]:
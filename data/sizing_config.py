@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import json
+from os import getcwd
+from os.path import join
+
+from pydantic import BaseModel, Field
+from .decorators import singleton
+
+
+class DropletSizeModel(BaseModel):
+    """
+    Data model for a DigitalOcean droplet size.
+
+    Attributes:
+        slug (str): The slug of the size.
+        vcpus (int): The number of virtual CPUs.
+        memory (int): The memory in megabytes.
+        price_hourly (float): The price in USD per hour.
+    """
+    slug: str
+    vcpus: int = Field(ge=1)
+    memory: int = Field(ge=1)
+    price_hourly: float = Field(ge=0)
+
+
+class SizingConfigModel(BaseModel):
+    """
+    Data model for the automatic droplet sizing configuration.
+
+    Attributes:
+        base_memory (int): The memory in megabytes used by the system, NodeJs and the test runner.
+        browser_memory (dict): The memory in megabytes used by one browser instance, per browser.
+        memory_reserve (float): The share of the droplet memory kept free to avoid swapping.
+        threads_per_vcpu (int): The maximum number of test threads per virtual CPU.
+        max_threads (int): The maximum number of test threads on a droplet.
+        test_duration (float): The duration in seconds of a test without history.
+        sizes (list): The droplet sizes to choose from.
+    """
+    base_memory: int = Field(default=512, ge=0)
+    browser_memory: dict[str, int] = Field(default_factory=lambda: {'chrome': 500, 'firefox': 600})
+    memory_reserve: float = Field(default=0.1, ge=0, lt=1)
+    threads_per_vcpu: int = Field(default=1, ge=1)
+    max_threads: int = Field(default=16, ge=1)
+    test_duration: float = Field(default=30, gt=0)
+    sizes: list[DropletSizeModel] = Field(default_factory=list)
+
+
+@singleton
+class SizingConfig:
+    """
+    Singleton class to manage the automatic droplet sizing configuration.
+
+    Attributes:
+        config_path (str): Path to the sizing configuration JSON file.
+    """
+
+    def __init__(self, config_path: str = join(getcwd(), 'configs', 'sizing_config.json')):
+        self.config_path = config_path
+        self._config = self._load_config(self.config_path)
+        self.base_memory = self._config.base_memory
+        self.browser_memory = self._config.browser_memory
+        self.memory_reserve = self._config.memory_reserve
+        self.threads_per_vcpu = self._config.threads_per_vcpu
+        self.max_threads = self._config.max_threads
+        self.test_duration = self._config.test_duration
+        self.sizes = self._config.sizes
+
+    @staticmethod
+    def _load_config(file_path: str) -> SizingConfigModel:
+        """
+        Loads the sizing configuration from a JSON file and returns an instance of SizingConfigModel.
+
+        :param file_path: The path to the sizing configuration JSON file.
+        :return: An instance of SizingConfigModel containing the loaded configuration.
+        """
+        with open(file_path, 'r') as f:
+            return SizingConfigModel(**json.load(f))
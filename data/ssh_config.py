@@ -3,6 +3,8 @@ import json
 from os import getcwd
 from os.path import join
 
+from typing import Literal
+
 from pydantic import BaseModel
 from .decorators import singleton
 
@@ -12,8 +14,10 @@ class SSHConfigModel(BaseModel):
 
     Attributes:
         wait_execution_time (int): The time (in seconds) to wait for SSH commands to complete.
+        wait_mode (str): The way of waiting for the test service: 'event' or 'poll'.
     """
     wait_execution_time: int
+    wait_mode: Literal['event', 'poll'] = 'event'
 
 @singleton
 class SSHConfig:
@@ -39,6 +43,17 @@ class SSHConfig:
         """
         return self._config.wait_execution_time
 
+    @property
+    def wait_mode(self) -> str:
+        """
+        Gets the way of waiting for the test service.
+        'event' - the service exit is streamed over a single SSH channel,
+        'poll' - the service status is checked every wait_execution_time seconds.
+
+        :return: The wait mode.
+        """
+        return self._config.wait_mode
+
     @staticmethod
     def _load_config(file_path: str) -> SSHConfigModel:
         """
@@ -15,3 +15,9 @@ class DigitalOceanSshKeyError(TestException): ...
 class PuppeteerChromeConfigError(TestException): ...
 
 class DocumentServerError(TestException): ...
+
+class ImageBakeError(TestException): ...
+
+class PuppeteerUploadError(TestException): ...
+
+class ServiceWatchError(TestException): ...
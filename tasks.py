@@ -1,10 +1,9 @@
-from invoke import task
+from invoke import task, Exit
 from rich.prompt import Prompt
 from rich import print
-from digitalocean_wrapper import DigitalOceanWrapper
+from rich.table import Table
 
-from data import DropletConfig
-from test import PuppeteerTest
+# The test tools, DigitalOcean and the configurations are imported inside the tasks, so invoke starts fast
 
 
 @task
@@ -15,8 +14,23 @@ def run_test(
         threads: int = None,
         url_param: str = None,
         params: int = None,
-        prcache: bool = None
+        prcache: bool = None,
+        droplets: int = 1,
+        pool: bool = False,
+        full_upload: bool = False,
+        file_types: str = None,
+        live_sync: int = 0,
+        browsers: str = None,
+        sequential: bool = False,
+        schedule: bool = False,
+        auto_size: bool = False,
+        telemetry_interval: int = 5,
+        artifact_cache: bool = False,
+        ds_urls: str = None,
+        cache: bool = False
 ):
+    from test import PuppeteerTest
+
     puppeteer_flags = {
         "retries": retries,
         "threads": threads,
@@ -25,14 +39,134 @@ def run_test(
         "prcache": prcache
     }
 
-    PuppeteerTest(flags=puppeteer_flags).run(save_droplet=save_droplet)
+    PuppeteerTest(flags=puppeteer_flags).run(
+        save_droplet=save_droplet,
+        droplets=droplets,
+        pool=pool,
+        full_upload=full_upload,
+        file_types=file_types.split(',') if file_types else None,
+        live_sync=live_sync,
+        browsers=browsers.split(',') if browsers else None,
+        sequential=sequential,
+        schedule=schedule,
+        auto_size=auto_size,
+        telemetry_interval=telemetry_interval,
+        artifact_cache=artifact_cache,
+        ds_urls=ds_urls.split(',') if ds_urls else None,
+        cache=cache
+    )
+
+@task
+def rerun_failed(c, retries: int = None, threads: int = None):
+    from test import PuppeteerTest
+
+    PuppeteerTest(flags={"retries": retries, "threads": threads}).rerun_failed()
 
 @task
 def create_droplet(c):
+    from test import PuppeteerTest
+
     PuppeteerTest().test.create_test_droplet()
 
+@task
+def bake_image(c):
+    from test import PuppeteerTest
+
+    PuppeteerTest().test.bake_image()
+
+@task
+def prefetch_artifacts(c):
+    from test.puppeteer_test.test_tools.artifact_cache import ArtifactCache
+
+    for name, path in ArtifactCache().prefetch().items():
+        print(f"[green]|INFO| Artifact [cyan]{name}[/] is cached at {path}")
+
+@task
+def pool_warm(c):
+    from test import PuppeteerTest
+
+    PuppeteerTest().test.warm_pool()
+
+@task
+def pool_clean(c):
+    from test import PuppeteerTest
+
+    test = PuppeteerTest().test
+    deleted = test.pool.scale_down()
+    print(f"[green]|INFO| Deleted idle pool droplets: [cyan]{deleted or 'none'}")
+
+@task
+def slowest_tests(c, limit: int = 20, browser: str = None, version: str = None):
+    from test.puppeteer_test.test_tools.run_history import RunHistory
+
+    table = Table(title='Slowest tests')
+    for column in ('Test', 'Avg, s', 'Max, s', 'Runs'):
+        table.add_column(column)
+
+    for test, avg, max_duration, runs in RunHistory().slowest(limit=limit, browser=browser, ds_version=version):
+        table.add_row(test, f"{avg:.1f}", f"{max_duration:.1f}", str(runs))
+    print(table)
+
+@task
+def regressions(c, browser: str = 'chrome', ratio: float = 1.5, min_delta: float = 5.0):
+    from test.puppeteer_test.test_tools.run_history import RunHistory
+
+    table = Table(title=f'Regressions in {browser} versus the previous DocumentServer version')
+    for column in ('Test', 'Status', 'Previous, s', 'Current, s'):
+        table.add_column(column)
+
+    for test, prev_status, status, prev_duration, duration in RunHistory().regressions(browser, ratio, min_delta):
+        table.add_row(
+            test,
+            f"{prev_status} -> {status}",
+            f"{prev_duration:.1f}" if prev_duration is not None else '-',
+            f"{duration:.1f}" if duration is not None else '-'
+        )
+    print(table)
+
+@task
+def benchmark_report(c, rows: int = 50000):
+    from test.puppeteer_test.benchmarks import ReportRewriteBenchmark
+    ReportRewriteBenchmark(rows=rows).run()
+
+@task
+def benchmark_startup(c, budget: float = 1.0, repeat: int = 5):
+    from test.puppeteer_test.benchmarks import StartupBenchmark
+
+    if not StartupBenchmark(budget=budget, repeat=repeat).run():
+        raise Exit(code=1)
+
+@task
+def status(c):
+    from data import DropletConfig
+    from test.puppeteer_test.test_tools.cached_digitalocean import CachedDigitalOcean
+    from test.puppeteer_test.test_tools.droplet_pool import DropletPool
+
+    do, droplet_config = CachedDigitalOcean(), DropletConfig()
+    pool = DropletPool(do, droplet_config)
+    pool_members = pool.members()
+
+    table = Table(title='Test droplets')
+    for column in ('Droplet', 'Status', 'IP', 'Size', 'Pool'):
+        table.add_column(column)
+
+    for name in sorted(name for name in do.droplet.get_droplet_names() if name.startswith(droplet_config.name)):
+        droplet = do.droplet.get_by_name(name)
+        member = pool_members.get(name)
+        table.add_row(
+            name,
+            droplet.status if droplet else '-',
+            droplet.ip_address if droplet else '-',
+            droplet.size_slug if droplet else '-',
+            ('leased' if pool.is_leased(member) else 'free') if member else '-'
+        )
+    print(table)
+
 @task
 def delete_droplet(c):
+    from digitalocean_wrapper import DigitalOceanWrapper
+    from data import DropletConfig
+
     do = DigitalOceanWrapper()
     droplet_config = DropletConfig()
 
@@ -1,2 +1,9 @@
 # -*- coding: utf-8 -*-
-from .puppeteer_test import PuppeteerTest
+
+
+def __getattr__(name: str):
+    # PuppeteerTest is imported on the first access, so the lightweight tasks do not load the test tools
+    if name == 'PuppeteerTest':
+        from .puppeteer_test import PuppeteerTest
+        return PuppeteerTest
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,2 +1,8 @@
 # -*- coding: utf-8 -*-
-from test.puppeteer_test.puppeter_test import PuppeteerTest
+
+
+def __getattr__(name: str):
+    if name == 'PuppeteerTest':
+        from test.puppeteer_test.puppeter_test import PuppeteerTest
+        return PuppeteerTest
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from .report_rewrite import ReportRewriteBenchmark
+from .startup import StartupBenchmark
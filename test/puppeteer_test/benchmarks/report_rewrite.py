@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+import time
+import tracemalloc
+from os.path import join, getsize
+from tempfile import TemporaryDirectory
+
+from bs4 import BeautifulSoup
+from rich import print
+from rich.table import Table
+
+from ..test_tools.html_path_rewriter import HtmlPathRewriter
+
+
+class ReportRewriteBenchmark:
+    """
+    A class to compare the streaming report path rewriter with the previous BeautifulSoup implementation
+    on a generated report.html. The time and the peak of the Python memory allocations are measured.
+    """
+    remote_report_dir = '/root/Dep.Tests/puppeteer/out'
+
+    def __init__(self, rows: int = 50000):
+        """
+        :param rows: The number of rows in the generated report table.
+        """
+        self.rows = rows
+
+    def run(self) -> None:
+        """
+        Run both implementations on the same generated report and print the results.
+        """
+        with TemporaryDirectory() as tmp_dir:
+            table = Table(title=f"report.html rewrite, {self.rows} rows")
+            for column in ('Implementation', 'File size, MB', 'Time, s', 'Peak memory, MB'):
+                table.add_column(column)
+
+            for name, func in (('BeautifulSoup', self.soup_rewrite), ('Streaming', self.stream_rewrite)):
+                path = join(tmp_dir, f"{name}.html")
+                elapsed = self._measure_time(func, self.generate(path))
+                peak = self._measure_memory(func, self.generate(path))
+                table.add_row(name, f"{getsize(path) / 1024 ** 2:.1f}", f"{elapsed:.2f}", f"{peak / 1024 ** 2:.1f}")
+
+            print(table)
+
+    def generate(self, path: str) -> str:
+        """
+        Write a report.html with a table of links to the remote report files.
+        :param path: The path of the file to create.
+        :return: The path of the created file.
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('<html><head><title>Report</title></head><body><table><tbody>\n')
+            f.write('<tr><th>File</th><th>Status</th><th>Screenshot</th></tr>\n')
+            for num in range(self.rows):
+                screenshot = f"{self.remote_report_dir}/screenshots/file_{num}.png"
+                f.write(
+                    f'<tr><td>file_{num}.docx</td><td>passed</td>'
+                    f'<td><a href="{screenshot}">screenshot</a></td><td>{screenshot}</td></tr>\n'
+                )
+            f.write('</tbody></table></body></html>\n')
+        return path
+
+    def soup_rewrite(self, path: str) -> None:
+        """
+        The BeautifulSoup implementation used by Report.convert_paths_to_relative before the streaming rewriter.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            soup = BeautifulSoup(f.read(), 'html.parser')
+
+        for a in soup.find_all('a', href=True):
+            a['href'] = a['href'].replace(self.remote_report_dir, '.')
+
+        for td in soup.find_all('td'):
+            if td.string and self.remote_report_dir in td.string:
+                td.string = td.string.replace(self.remote_report_dir, '.')
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(str(soup))
+
+    def stream_rewrite(self, path: str) -> None:
+        HtmlPathRewriter(self.remote_report_dir, '.').rewrite_file(path)
+
+    @staticmethod
+    def _measure_time(func, path: str) -> float:
+        start = time.perf_counter()
+        func(path)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def _measure_memory(func, path: str) -> int:
+        """
+        The memory is measured in a separate pass, since tracing the allocations slows the code down.
+        """
+        tracemalloc.start()
+        try:
+            func(path)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import json
+import subprocess
+import sys
+import time
+from os import getcwd
+
+from rich import print
+from rich.table import Table
+
+
+class StartupBenchmark:
+    """
+    A class to measure the startup time of the invoke tasks in fresh interpreters
+    and to check that the heavy modules are not imported before they are needed.
+    """
+    heavy_modules = ('bs4', 'digitalocean', 'pydantic', 'paramiko', 'requests')
+    scenarios = (
+        ('invoke tasks', 'import tasks', heavy_modules),
+        ('status', 'from test.puppeteer_test.test_tools import cached_digitalocean, droplet_pool', heavy_modules[:2]),
+        ('create-droplet setup', 'from test import PuppeteerTest; PuppeteerTest()', heavy_modules[:2]),
+    )
+
+    def __init__(self, budget: float = 1.0, repeat: int = 5, cwd: str = None):
+        """
+        :param budget: The maximum startup time of a scenario in seconds.
+        :param repeat: The number of runs of each scenario, the best time is reported.
+        :param cwd: The directory with tasks.py and the configs. Defaults to the current directory.
+        """
+        self.budget = budget
+        self.repeat = repeat
+        self.cwd = cwd or getcwd()
+
+    def run(self) -> bool:
+        """
+        Run the scenarios and print the results.
+        :return: True if every scenario fits the budget and does not import the modules it must not import.
+        """
+        table = Table(title=f"Startup time, budget {self.budget:.2f} s")
+        for column in ('Scenario', 'Time, s', 'Unexpected imports'):
+            table.add_column(column)
+
+        passed = True
+        for name, code, forbidden in self.scenarios:
+            elapsed, modules = min(self._measure(code) for _ in range(self.repeat))
+            unexpected = sorted(set(modules) & set(forbidden))
+            passed = passed and elapsed <= self.budget and not unexpected
+            table.add_row(name, f"{elapsed:.3f}", ', '.join(unexpected) or '-')
+
+        print(table)
+        if not passed:
+            print("[red]|ERROR| The startup time is over the budget or heavy modules are imported too early")
+        return passed
+
+    def _measure(self, code: str) -> tuple[float, list]:
+        """
+        :param code: The code to run in a fresh interpreter.
+        :return: The wall time of the interpreter and the top-level packages imported by the code.
+        """
+        report = "import sys, json; print(json.dumps(sorted({m.split('.')[0] for m in sys.modules})))"
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-c', f"{code}\n{report}"], cwd=self.cwd, capture_output=True, text=True, check=True
+        )
+        elapsed = time.perf_counter() - start
+        return elapsed, json.loads(result.stdout.strip().splitlines()[-1])
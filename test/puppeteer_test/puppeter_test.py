@@ -1,6 +1,16 @@
 # -*- coding: utf-8 -*-
+from collections import Counter
+from os.path import join, isfile
+
 from test.puppeteer_test.test_tools import TestTools
+from test.puppeteer_test.test_tools.pipeline import Pipeline, StageSkipped
+from test.puppeteer_test.test_tools.test_sharder import TestSharder, TestShard
+from test.puppeteer_test.test_tools.tracer import Tracer
+from test.puppeteer_test.test_tools.artifact_cache import ArtifactCache
+from test.puppeteer_test.test_tools.report_parser import ReportParser
+from test.puppeteer_test.test_tools.result_cache import ResultCache
 from rich import print
+from rich.table import Table
 from data import PuppeteerChromeConfig
 
 
@@ -9,17 +19,514 @@ class PuppeteerTest:
     def __init__(self, flags: dict = None):
         self.puppeteer_config = PuppeteerChromeConfig()
         self.test = TestTools(puppeteer_config=self.puppeteer_config, flags=flags)
+        self.browsers = [self.puppeteer_config.browser]
+        self.runners: list[TestTools] = [self.test]
+        self.report_tests: list[TestTools] = [self.test]
+        self.droplet_owners: list[tuple[TestTools, str]] = []
+
+    def run(
+            self,
+            save_droplet: bool = False,
+            droplets: int = 1,
+            pool: bool = False,
+            full_upload: bool = False,
+            file_types: list = None,
+            live_sync: int = 0,
+            browsers: list = None,
+            sequential: bool = False,
+            schedule: bool = False,
+            auto_size: bool = False,
+            telemetry_interval: int = 5,
+            artifact_cache: bool = False,
+            ds_urls: list = None,
+            cache: bool = False
+    ) -> None:
+        """
+        Run the puppeteer tests. The stages of the run are executed as a dependency graph,
+        so independent stages, such as cloning the repositories and creating the droplet, overlap.
+
+        :param save_droplet: If True, the droplets will not be deleted after the test run.
+        :param droplets: The number of droplets to split the tests between.
+        :param pool: If True, the droplets are leased from the warm droplet pool and returned to it after the run.
+        :param full_upload: If True, the whole puppeteer archive is uploaded instead of the changed files only.
+        :param file_types: File extensions of the pp-files to check out. If None, all files are checked out.
+        :param live_sync: The interval in seconds to mirror the report while the tests run. 0 disables live sync.
+        :param browsers: The browsers to run the tests in. If None, the browser from the configuration is used.
+        :param sequential: If True, the browsers are run one after another on the same droplet,
+         otherwise each browser is run on its own droplet at the same time.
+        :param schedule: If True, the tests are ordered and split between the droplets by their historical durations.
+        :param auto_size: If True, the droplet size and, if not set, the number of threads are chosen for the workload.
+        :param telemetry_interval: The interval in seconds of the resource sampling on the droplet. 0 disables it.
+        :param artifact_cache: If True, NodeJs, GoogleChrome and build_tools are prefetched into the local cache
+         and uploaded to the droplets instead of being downloaded on each droplet.
+        :param ds_urls: The URLs of the DocumentServer examples to run the tests against.
+         If None, the DocumentServer from the configuration is used.
+         With sequential=True the targets are run one after another on the same droplet,
+         otherwise each target is run on its own droplet at the same time.
+        :param cache: If True, the tests with a cached passed result for the same scripts, input file,
+         DocumentServer version, browser and test options are skipped and their cached results are added
+         to the report. The tests to run are passed to run.py with --test_list.
+        """
+        if browsers and droplets > 1:
+            return print("[red]|ERROR| Running several browsers on a fleet of droplets is not supported")
+        if ds_urls and (browsers or droplets > 1):
+            return print(
+                "[red]|ERROR| Running several DocumentServers in several browsers or on a fleet of droplets "
+                "is not supported"
+            )
+
+        self.test.prepare_tmp_dir()
+        self.browsers = browsers or [self.puppeteer_config.browser]
+        self.test.delta_upload = not full_upload
+        self.test.file_types = file_types
+        self.test.live_sync = live_sync
+        self.test.schedule = schedule
+        self.test.auto_size = auto_size
+        self.test.telemetry_interval = telemetry_interval
+        self.test.artifact_cache = ArtifactCache() if artifact_cache else None
+        self.test.result_cache = ResultCache() if cache else None
+        pipeline = Pipeline('Puppeteer test')
+        if not ds_urls:
+            pipeline.add('check_document_server', self.test.check_document_server)
+            pipeline.add('get_ds_version', self._print_run_info, after=['check_document_server'])
+        pipeline.add('get_ssh_keys', lambda: self.test.do_ssh_keys_id)
+        pipeline.add('clone_repo', self.test.clone_puppeteer_repo)
+        if artifact_cache:
+            pipeline.add('prefetch_artifacts', self.test.artifact_cache.prefetch)
+
+        if ds_urls:
+            self._add_target_stages(pipeline, ds_urls, sequential=sequential, save_droplet=save_droplet, pool=pool)
+        elif browsers:
+            self._add_matrix_stages(pipeline, browsers, sequential=sequential, save_droplet=save_droplet, pool=pool)
+        elif droplets > 1:
+            self._add_fleet_stages(pipeline, droplets=droplets, save_droplet=save_droplet, pool=pool)
+        else:
+            self._add_droplet_stages(pipeline, self.test, save_droplet=save_droplet, pool=pool)
+            pipeline.add('handle_report', self.test.handle_report, after=['download_report'])
+
+        Tracer().reset()
+        try:
+            pipeline.run()
+        finally:
+            self._cleanup_droplets(pipeline, save_droplet=save_droplet, pool=pool)
+            self._export_trace()
+            self._print_target_summary() if ds_urls else None
+            print(f"[green]|INFO| {self.test.do.stats}")
+        self._print_makespan() if schedule else None
+
+    def rerun_failed(self) -> None:
+        """
+        Rerun the failed tests of the last report in Reports/<version>/<browser> on the droplet
+        saved by a previous run and merge their results into the report in place.
+        """
+        self.test.prepare_tmp_dir()
+        self.test.check_document_server()
+        self._print_run_info()
+        Tracer().reset()
+        try:
+            self.test.rerun_failed()
+        finally:
+            print(f"[green]|INFO| {self.test.do.stats}")
 
-    def run(self, save_droplet: bool = False) -> None:
+    def _cleanup_droplets(self, pipeline: Pipeline, save_droplet: bool = False, pool: bool = False) -> None:
+        """
+        Close the sessions and delete or return the droplets whose cleanup stages did not run
+        because an earlier stage failed. Only the droplets whose creation stage was started are cleaned up.
+
+        :param pipeline: The finished pipeline.
+        :param save_droplet: If True, the droplets are kept and only their sessions are closed.
+        :param pool: If True, the droplets are returned to the warm droplet pool.
+        """
+        cleanup = 'return_droplet' if pool else 'close_session' if save_droplet else 'delete_droplet'
+        for test, prefix in self.droplet_owners:
+            create = pipeline.stages.get(f'{prefix}create_droplet')
+            stage = pipeline.stages.get(f'{prefix}{cleanup}')
+            if create is None or create.status not in ('done', 'failed') or (stage and stage.status == 'done'):
+                continue
+
+            print(f"[red]|WARNING| The run failed, cleaning up the droplet [cyan]{test.droplet_name}")
+            try:
+                if pool:
+                    test.return_pool_droplet()
+                    continue
+                test.close_session()
+                if not save_droplet:
+                    test.droplet = test.droplet or test.do.droplet.get_by_name(test.droplet_name)
+                    test.delete_test_droplet()
+            except Exception as e:
+                print(f"[red]|ERROR| Failed to clean up the droplet {test.droplet_name}: {e}")
+
+    def _print_run_info(self) -> None:
         print(
             f"[green]|INFO| The test is run on the Document Server version: "
-            f"[red]{self.test.ds_version}[/]. Browser: [red]{self.test.puppeteer_config.browser}"
+            f"[red]{self.test.ds_version}[/]. Browser: [red]{', '.join(self.browsers)}"
+        )
+
+    def _resolve_target_version(self, test: TestTools) -> None:
+        """
+        Print the DocumentServer version of the target and name its report directory after the version.
+        The targets of the same version are told apart by their hosts.
+        Called after the versions of all targets were requested, successfully or not.
+
+        :param test: The TestTools instance of the target.
+        """
+        versions = Counter(target.ds.version for target in self.report_tests)
+        host = test.ds.parsed_url.netloc.replace(':', '_')
+        if test.ds.version is None:
+            print(f"[red]|WARNING| The version of DocumentServer {test.puppeteer_config.ds_url} is unknown")
+            test.report_version = f"unknown_{host}"
+        else:
+            test.report_version = test.ds.version if versions[test.ds.version] == 1 else f"{test.ds.version}_{host}"
+        print(
+            f"[green]|INFO| The test is run on the Document Server [cyan]{test.puppeteer_config.ds_url}[/] "
+            f"version: [red]{test.ds.version}[/]. Browser: [red]{test.puppeteer_config.browser}"
+        )
+
+    def _print_target_summary(self) -> None:
+        """
+        Print the combined results of the runs against all DocumentServer targets.
+        """
+        table = Table(title='DocumentServer targets')
+        for column in ('Target', 'Version', 'Tests', 'Passed', 'Failed', 'Duration, min', 'Report'):
+            table.add_column(column)
+
+        for test in self.report_tests:
+            results = ReportParser().parse(test.report.path) if test.report_version and isfile(test.report.path) else []
+            passed = sum(result.status == 'passed' for result in results)
+            table.add_row(
+                test.puppeteer_config.ds_url,
+                test.ds.version or '-',
+                str(len(results)) if results else '-',
+                str(passed) if results else '-',
+                str(len(results) - passed) if results else '-',
+                f"{sum(result.duration or 0 for result in results) / 60:.1f}" if results else '-',
+                test.report.dir if test.report_version else '-'
+            )
+        print(table)
+
+    def _export_trace(self) -> None:
+        """
+        Save the trace of the run stages next to each report.
+        """
+        for test in self.report_tests:
+            if test.ds_version:
+                Tracer().export(join(test.report.dir, 'out', 'trace.json'))
+            else:
+                print("[red]|WARNING| The trace is not saved: the DocumentServer version is unknown")
+
+    def _print_makespan(self) -> None:
+        """
+        Print the makespan predicted by the scheduler and the actual run time of each droplet.
+        """
+        table = Table(title='Scheduled makespan')
+        for column in ('Droplet', 'Tests', 'Predicted, min', 'Actual, min'):
+            table.add_column(column)
+
+        for test in self.runners:
+            if test.predicted_makespan is None:
+                continue
+            table.add_row(
+                test.droplet_name,
+                str(len(test.puppeteer_run_script.test_list or [])),
+                f"{test.predicted_makespan / 60:.1f}",
+                f"{test.actual_makespan / 60:.1f}" if test.actual_makespan is not None else '-'
+            )
+        print(table)
+
+    def _add_fleet_stages(self, pipeline: Pipeline, droplets: int, save_droplet: bool = False, pool: bool = False) -> None:
+        """
+        Add the stages that split the test files into balanced shards, run each shard on its own droplet
+        at the same time and merge the downloaded reports into one report directory.
+
+        :param pipeline: The pipeline to add the stages to.
+        :param droplets: The number of droplets.
+        :param save_droplet: If True, the droplets will not be deleted after the test run.
+        :param pool: If True, the droplets are leased from the warm droplet pool.
+        """
+        shard_tests = [self.test.spawn_shard(TestShard(index)) for index in range(1, droplets + 1)]
+        self.runners = shard_tests
+
+        def split_tests():
+            shards = TestSharder().split(droplets, scheduler=self.test.get_scheduler() if self.test.schedule else None)
+            print(f"[green]|INFO| Tests are split into [cyan]{len(shards)}[/] shards: {shards}")
+            for test, shard in zip(shard_tests, shards):
+                test.shard = shard
+
+        def check_shard(test: TestTools):
+            if not test.shard.files:
+                print(f"[green]|INFO| Shard [cyan]{test.shard.index}[/] has no tests, its droplet is not created")
+                raise StageSkipped(f"shard_{test.shard.index}")
+
+        pipeline.add('split_tests', split_tests, after=['clone_repo'])
+        downloads = []
+        for test in shard_tests:
+            prefix = f"shard_{test.shard.index}:"
+            pipeline.add(f'{prefix}check_shard', lambda test=test: check_shard(test), after=['split_tests'])
+            downloads.append(
+                self._add_droplet_stages(
+                    pipeline,
+                    test,
+                    save_droplet=save_droplet,
+                    pool=pool,
+                    prefix=prefix,
+                    after=[f'{prefix}check_shard']
+                )
+            )
+
+        def merge_reports():
+            if any(test.shard.files and pipeline.stages[download].status != 'done'
+                   for test, download in zip(shard_tests, downloads)):
+                raise StageSkipped('merge_reports')
+            self.test.report.merge([test.report for test in shard_tests if test.shard.files])
+            self.test.cached_results = {
+                file: result for test in shard_tests for file, result in test.cached_results.items()
+            }
+            self.test.handle_report()
+
+        pipeline.add('merge_reports', merge_reports, after=['split_tests'], wait=downloads)
+
+    def _add_matrix_stages(
+            self,
+            pipeline: Pipeline,
+            browsers: list,
+            sequential: bool = False,
+            save_droplet: bool = False,
+            pool: bool = False
+    ) -> None:
+        """
+        Add the stages that run the tests in each browser. The repositories are cloned, the DocumentServer version
+        is requested and the puppeteer archive is prepared once for all browsers.
+        The report of each browser is saved to its own directory.
+
+        :param pipeline: The pipeline to add the stages to.
+        :param browsers: The browsers to run the tests in.
+        :param sequential: If True, the browsers are run one after another on the same droplet,
+         which is provisioned for all of them. Otherwise, each browser is run on its own droplet at the same time.
+        :param save_droplet: If True, the droplets will not be deleted after the test run.
+        :param pool: If True, the droplets are leased from the warm droplet pool.
+        """
+        pipeline.add('prepare_archive', self.test.prepare_puppeteer_archive, after=['clone_repo'])
+        browser_tests = [
+            self.test.spawn_browser(browser, provision_browsers=browsers if sequential else None)
+            for browser in browsers
+        ]
+        self.runners = browser_tests
+        self.report_tests = browser_tests
+
+        if not sequential:
+            for test in browser_tests:
+                test.live_status = False
+                download = self._add_droplet_stages(
+                    pipeline,
+                    test,
+                    save_droplet=save_droplet,
+                    pool=pool,
+                    prefix=f"{test.puppeteer_config.browser}:",
+                    archive_stage='prepare_archive'
+                )
+                pipeline.add(f"{test.puppeteer_config.browser}:handle_report", test.handle_report, after=[download])
+            return
+
+        self._add_shared_droplet_stages(
+            pipeline,
+            browser_tests,
+            [test.puppeteer_config.browser for test in browser_tests],
+            save_droplet=save_droplet,
+            pool=pool
         )
 
-        self.test.create_test_droplet()
-        self.test.move_to_user_project()
-        self.test.run_script_on_droplet()
-        self.test.wait_execute_script()
-        self.test.download_report()
-        self.test.handle_report()
-        self.test.delete_test_droplet() if not save_droplet else None
+    def _add_target_stages(
+            self,
+            pipeline: Pipeline,
+            ds_urls: list,
+            sequential: bool = False,
+            save_droplet: bool = False,
+            pool: bool = False
+    ) -> None:
+        """
+        Add the stages that run the tests against each DocumentServer. The targets are checked and their versions
+        are requested at the same time. The repositories are cloned and the puppeteer archive is prepared once
+        for all targets. The report of each target is saved to the directory of its version.
+
+        :param pipeline: The pipeline to add the stages to.
+        :param ds_urls: The URLs of the DocumentServer examples.
+        :param sequential: If True, the targets are run one after another on the same droplet.
+         Otherwise, each target is run on its own droplet at the same time.
+        :param save_droplet: If True, the droplets will not be deleted after the test run.
+        :param pool: If True, the droplets are leased from the warm droplet pool.
+        """
+        pipeline.add('prepare_archive', self.test.prepare_puppeteer_archive, after=['clone_repo'])
+        target_tests = [self.test.spawn_target(ds_url, index) for index, ds_url in enumerate(ds_urls, start=1)]
+        names = [f"target_{index}" for index in range(1, len(target_tests) + 1)]
+        self.runners = target_tests
+        self.report_tests = target_tests
+
+        for name, test in zip(names, target_tests):
+            pipeline.add(f'{name}:check_document_server', test.check_document_server)
+            pipeline.add(
+                f'{name}:probe_ds_version', lambda test=test: test.ds_version,
+                after=[f'{name}:check_document_server']
+            )
+        for name, test in zip(names, target_tests):
+            pipeline.add(
+                f'{name}:get_ds_version', lambda test=test: self._resolve_target_version(test),
+                after=[f'{name}:probe_ds_version'],
+                wait=[f'{other}:probe_ds_version' for other in names if other != name]
+            )
+
+        if sequential:
+            return self._add_shared_droplet_stages(
+                pipeline,
+                target_tests,
+                names,
+                save_droplet=save_droplet,
+                pool=pool,
+                check_stages=[f'{name}:check_document_server' for name in names],
+                version_stages=[f'{name}:get_ds_version' for name in names]
+            )
+
+        for name, test in zip(names, target_tests):
+            test.live_status = False
+            download = self._add_droplet_stages(
+                pipeline,
+                test,
+                save_droplet=save_droplet,
+                pool=pool,
+                prefix=f"{name}:",
+                archive_stage='prepare_archive',
+                check_stage=f'{name}:check_document_server',
+                version_stage=f'{name}:get_ds_version'
+            )
+            pipeline.add(f"{name}:handle_report", test.handle_report, after=[download])
+
+    def _add_shared_droplet_stages(
+            self,
+            pipeline: Pipeline,
+            tests: list,
+            names: list,
+            save_droplet: bool = False,
+            pool: bool = False,
+            check_stages: list = None,
+            version_stages: list = None
+    ) -> None:
+        """
+        Add the stages that run the TestTools instances one after another on the droplet of the first instance.
+        The workspace of the droplet is reset between the runs. A failed run of an instance does not cancel
+        the runs of the next instances.
+
+        :param pipeline: The pipeline to add the stages to.
+        :param tests: The TestTools instances. They use the puppeteer archive prepared by the 'prepare_archive' stage.
+        :param names: The prefixes of the stage names of the instances.
+        :param save_droplet: If True, the droplet will not be deleted after the test run.
+        :param pool: If True, the droplet is leased from the warm droplet pool and returned to it after the run.
+        :param check_stages: The DocumentServer check stage of each instance.
+         Defaults to 'check_document_server' for all instances. If the instances check different DocumentServers,
+         the droplet is created when all checks have ended, whatever their results.
+        :param version_stages: The DocumentServer version stage of each instance.
+         Defaults to 'get_ds_version' for all instances.
+        """
+        check_stages = check_stages or ['check_document_server'] * len(tests)
+        version_stages = version_stages or ['get_ds_version'] * len(tests)
+        shared_check = set(check_stages) if len(set(check_stages)) == 1 else set()
+        owner, previous = tests[0], None
+        self.droplet_owners.append((owner, ''))
+        pipeline.add(
+            'create_droplet',
+            owner.lease_pool_droplet if pool else owner.create_test_droplet,
+            after=['get_ssh_keys', *shared_check, *(['prepare_archive'] if owner.auto_size else [])],
+            wait=[stage for stage in dict.fromkeys(check_stages) if stage not in shared_check]
+        )
+        pipeline.add('move_to_project', owner.move_to_user_project, after=['create_droplet'])
+
+        downloads = []
+        for test, name, check_stage, version_stage in zip(tests, names, check_stages, version_stages):
+            def run_script(test: TestTools = test, first: bool = previous is None):
+                if not first:
+                    test.use_droplet_of(owner)
+                    test.reset_workspace()
+                test.run_script_on_droplet()
+
+            pipeline.add(
+                f'{name}:run_script', run_script,
+                after=['create_droplet', 'prepare_archive', check_stage],
+                wait=[previous] if previous else []
+            )
+            # The live report sync of the wait resolves the report directory, so the version must be known
+            pipeline.add(
+                f'{name}:wait_execute_script', test.wait_execute_script,
+                after=[f'{name}:run_script', version_stage]
+            )
+            pipeline.add(f'{name}:download_report', test.download_report, after=[f'{name}:wait_execute_script'])
+            pipeline.add(f'{name}:handle_report', test.handle_report, after=[f'{name}:download_report'])
+            previous = f'{name}:download_report'
+            downloads.append(previous)
+
+        pipeline.add('close_session', owner.close_session, wait=downloads)
+        if pool:
+            pipeline.add('return_droplet', owner.return_pool_droplet, after=['close_session', 'move_to_project'])
+        elif not save_droplet:
+            pipeline.add('delete_droplet', owner.delete_test_droplet, after=['close_session', 'move_to_project'])
+
+    def _add_droplet_stages(
+            self,
+            pipeline: Pipeline,
+            test: TestTools,
+            save_droplet: bool = False,
+            pool: bool = False,
+            prefix: str = '',
+            after: list = None,
+            archive_stage: str = None,
+            check_stage: str = 'check_document_server',
+            version_stage: str = 'get_ds_version'
+    ) -> str:
+        """
+        Add the stages of a test run on a single droplet.
+
+        :param pipeline: The pipeline to add the stages to.
+        :param test: The TestTools instance that owns the droplet.
+        :param save_droplet: If True, the droplet will not be deleted after the test run.
+        :param pool: If True, the droplet is leased from the warm droplet pool and returned to it after the run.
+        :param prefix: The prefix of the stage names.
+        :param after: Additional stages the puppeteer archive preparation and the droplet creation depend on.
+        :param archive_stage: The stage that prepares the shared puppeteer archive.
+         If None, the archive of the instance is prepared by its own stage.
+        :param check_stage: The stage that checks the DocumentServer the instance runs against.
+        :param version_stage: The stage that requests the version of the DocumentServer, before the report is synced.
+        :return: The name of the report download stage.
+        """
+        if archive_stage is None:
+            archive_stage = f'{prefix}prepare_archive'
+            pipeline.add(archive_stage, test.prepare_puppeteer_archive, after=['clone_repo', *(after or [])])
+
+        self.droplet_owners.append((test, prefix))
+        pipeline.add(
+            f'{prefix}create_droplet',
+            test.lease_pool_droplet if pool else test.create_test_droplet,
+            after=['get_ssh_keys', check_stage, *(after or []), *([archive_stage] if test.auto_size else [])]
+        )
+        pipeline.add(f'{prefix}move_to_project', test.move_to_user_project, after=[f'{prefix}create_droplet'])
+        pipeline.add(
+            f'{prefix}run_script', test.run_script_on_droplet,
+            after=[f'{prefix}create_droplet', archive_stage, check_stage]
+        )
+        # The live report sync of the wait resolves the report directory, so the version must be known
+        pipeline.add(
+            f'{prefix}wait_execute_script', test.wait_execute_script,
+            after=[f'{prefix}run_script', version_stage]
+        )
+        pipeline.add(f'{prefix}download_report', test.download_report, after=[f'{prefix}wait_execute_script'])
+
+        pipeline.add(f'{prefix}close_session', test.close_session, after=[f'{prefix}download_report'])
+
+        if pool:
+            pipeline.add(
+                f'{prefix}return_droplet', test.return_pool_droplet,
+                after=[f'{prefix}close_session', f'{prefix}move_to_project']
+            )
+        elif not save_droplet:
+            pipeline.add(
+                f'{prefix}delete_droplet', test.delete_test_droplet,
+                after=[f'{prefix}close_session', f'{prefix}move_to_project']
+            )
+
+        return f'{prefix}download_report'
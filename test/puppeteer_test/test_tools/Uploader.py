@@ -1,16 +1,20 @@
 # -*- coding: utf-8 -*-
-from host_tools import File
+import json
+import shlex
+
+from rich import print
 from ssh_wrapper import Sftp
 from posixpath import join
 from typing import Union
 
 
-from data import PuppeteerChromeConfig
+from data import PuppeteerChromeConfig, PuppeteerUploadError
 from .paths import Paths
 from .linux_script_demon import LinuxScriptDemon
 
 from .puppeteer_run_script import PuppeteerRunScript
-from .puppeter_repo import PuppeterRepo
+from .puppeteer_archive import PuppeteerArchive
+from .ssh_executer import SshExecuter
 
 
 class Uploader:
@@ -23,7 +27,10 @@ class Uploader:
             sftp: Sftp,
             puppeteer_config: Union[PuppeteerChromeConfig],
             linux_service: LinuxScriptDemon,
-            puppeteer_run_script: PuppeteerRunScript
+            puppeteer_run_script: PuppeteerRunScript,
+            puppeteer_archive: PuppeteerArchive = None,
+            tmp_dir: str = None,
+            ssh_executer: SshExecuter = None
     ):
         """
         Initialize the Uploader with necessary configurations and paths.
@@ -32,7 +39,11 @@ class Uploader:
         :param puppeteer_config: Configuration for Puppeteer, specifying the browser and other settings.
         :param linux_service: An instance of LinuxScriptDemon for managing the Linux service.
         :param puppeteer_run_script: An instance of PuppeteerRunScript for managing the Puppeteer script.
-        :param tmp_dir: Temporary directory for storing files before upload. Defaults to system temp directory.
+        :param puppeteer_archive: The puppeteer archive to upload. Defaults to the archive of the whole
+         puppeteer directory at Paths.local_puppeteer_archive.
+        :param tmp_dir: Temporary directory for storing files before upload. Defaults to Paths.tmp_dir.
+        :param ssh_executer: An instance of SshExecuter for the same server. If passed, the puppeteer files are
+         synchronized by content hashes and only the changed files are uploaded.
         """
         self.path = Paths()
         self.sftp = sftp
@@ -40,17 +51,31 @@ class Uploader:
         self.puppeteer_run_script = puppeteer_run_script
         self.remote_service_path = join(self.linux_service.services_dir, self.linux_service.name)
         self.puppeteer_config = puppeteer_config
-        self.puppeter_repo = PuppeterRepo()
+        self.puppeteer_archive = puppeteer_archive or PuppeteerArchive(self.path.local_puppeteer_archive)
+        self.tmp_dir = tmp_dir or self.path.tmp_dir
+        self.ssh_executer = ssh_executer
 
     def upload_test_files(self):
         """
         Upload all necessary files for running Puppeteer tests to the remote server.
         """
-        self._upload_puppeteer()
-        self._upload(self.puppeteer_config.config_path, self.path.remote_puppeter_config_file)
+        self._upload_artifacts()
+        self._sync_puppeteer() if self.ssh_executer else self._upload_puppeteer()
+        self._upload(self.puppeteer_config.file_path, self.path.remote_puppeter_config_file)
         self._upload(self.puppeteer_run_script.create(), self.path.remote_puppeter_run_sh)
         self._upload(self._create_run_script_service(), self.remote_service_path)
 
+        if self.puppeteer_run_script.telemetry:
+            self._upload(self.puppeteer_run_script.telemetry.create(), self.path.remote_telemetry_sampler)
+
+    def upload_provisioning_files(self):
+        """
+        Upload the provisioning script and its service to the remote server. Used to bake a droplet image.
+        """
+        self._upload_artifacts()
+        self._upload(self.puppeteer_run_script.create_provisioning(), self.path.remote_puppeter_run_sh)
+        self._upload(self._create_run_script_service(), self.remote_service_path)
+
     def _upload(self, local_path: str, remote_path: str) -> None:
         """
         Upload a single file to the remote server.
@@ -59,17 +84,113 @@ class Uploader:
         """
         self.sftp.upload_file(local=local_path, remote=remote_path, stdout=True)
 
+    def _upload_artifacts(self) -> None:
+        """
+        Upload the cached provisioning artifacts the run script installs from.
+        The artifacts are not needed if the droplet is booted from a pre-baked image. If the SSH executer is set,
+        the artifacts already uploaded with the same content are skipped.
+        """
+        artifacts = self.puppeteer_run_script.artifacts
+        if not artifacts or self.puppeteer_run_script.provisioned:
+            return
+
+        local = artifacts.prefetch()
+        remote_paths = [artifacts.remote_path(name) for name in local]
+        remote_digests = self._read_remote_digests(remote_paths) if self.ssh_executer else {}
+        for name, local_path in local.items():
+            if remote_digests.get(artifacts.remote_path(name)) == artifacts.digest(local_path):
+                print(f"[green]|INFO| The artifact [cyan]{name}[/] is already uploaded")
+                continue
+            self._upload(local_path, artifacts.remote_path(name))
+
+    def _read_remote_digests(self, remote_paths: list) -> dict:
+        """
+        :param remote_paths: The paths to the remote files.
+        :return: The sha256 digests of the existing remote files by their paths.
+        """
+        paths = ' '.join(shlex.quote(path) for path in remote_paths)
+        output = self.ssh_executer.exec_cmd(f"sha256sum -- {paths} 2>/dev/null", stdout=False, stderr=False).stdout
+        return {
+            name: digest
+            for digest, name in (line.split(maxsplit=1) for line in (output or '').splitlines() if ' ' in line)
+        }
+
     def _create_run_script_service(self) -> str:
         """
         Create the systemd service file for running the Puppeteer script.
         :return: The path to the created service file.
         """
-        return self.linux_service.create(save_path=join(self.path.tmp_dir, self.linux_service.name))
+        return self.linux_service.create(save_path=join(self.tmp_dir, self.linux_service.name))
 
     def _upload_puppeteer(self) -> None:
         """
-        Prepare and upload the Puppeteer repository to the remote server.
+        Upload the prepared Puppeteer archive to the remote server.
+        The remote manifest is removed, since the run script replaces the whole puppeteer directory.
+        """
+        self._upload(self.puppeteer_archive.archive_path, self.path.remote_puppeteer_archive)
+        self._exec(f"rm -f '{self.path.remote_puppeteer_manifest}'") if self.ssh_executer else None
+
+    def _sync_puppeteer(self) -> None:
+        """
+        Synchronize the Puppeteer directory on the remote server with the local one.
+
+        The content hashes of the local files are compared with the manifest stored on the server
+        by the previous upload. Only the changed files are uploaded in a delta archive and unpacked in place,
+        the files removed locally are deleted on the server, then the manifest is updated.
+        The manifest is removed before the changes and uploaded only after all of them succeeded,
+        so an interrupted synchronization is followed by a full one. The report of the previous run is removed.
+
+        :raises PuppeteerUploadError: If a command of the synchronization fails on the server.
+        """
+        local = self.puppeteer_archive.manifest()
+        remote = self._read_remote_manifest()
+        changed = [rel for rel, digest in local.items() if remote.get(rel) != digest]
+        deleted = [rel for rel in remote if rel not in local]
+        print(
+            f"[green]|INFO| Delta upload: [cyan]{len(changed)}[/] changed, [cyan]{len(deleted)}[/] deleted, "
+            f"[cyan]{len(local) - len(changed)}[/] unchanged files"
+        )
+
+        remote_dir = self.path.remote_puppeteer_dir
+        self._exec(
+            f"rm -f '{self.path.remote_puppeteer_manifest}' '{self.path.remote_puppeteer_archive}' "
+            f"&& rm -rf '{self.path.remote_report_dir}' && mkdir -p '{remote_dir}'"
+        )
+
+        if changed:
+            delta_archive = PuppeteerArchive(join(self.tmp_dir, self.path.puppeteer_delta_archive_name))
+            self._upload(delta_archive.create(paths=changed), self.path.remote_puppeteer_delta_archive)
+            delta = self.path.remote_puppeteer_delta_archive
+            # python3 is present on the base image, unzip is installed only by the provisioning
+            self._exec(f"python3 -m zipfile -e '{delta}' '{remote_dir}' && rm -f '{delta}'")
+
+        for num in range(0, len(deleted), 200):
+            self._exec(f"cd '{remote_dir}' && rm -f -- {' '.join(shlex.quote(rel) for rel in deleted[num:num + 200])}")
+
+        manifest_path = join(self.tmp_dir, 'puppeteer_manifest.json')
+        with open(manifest_path, 'w') as f:
+            json.dump(local, f)
+        self._upload(manifest_path, self.path.remote_puppeteer_manifest)
+
+    def _read_remote_manifest(self) -> dict:
+        """
+        :return: The manifest of the files uploaded to the server, or an empty dictionary if there is none.
+        """
+        output = self.ssh_executer.exec_cmd(
+            f"cat '{self.path.remote_puppeteer_manifest}' 2>/dev/null", stdout=False, stderr=False
+        ).stdout
+        try:
+            return json.loads(output) if output else {}
+        except json.JSONDecodeError:
+            return {}
+
+    def _exec(self, cmd: str) -> None:
+        """
+        Execute a command on the remote server the files are uploaded to.
+        :param cmd: The command to execute.
+        :raises PuppeteerUploadError: If the command fails.
         """
-        self.puppeter_repo.clone()
-        File.compress(self.path.local_puppeteer_dir, self.path.local_puppeteer_archive, stdout=True)
-        self._upload(self.path.local_puppeteer_archive, self.path.remote_puppeteer_archive)
+        marker = 'puppeteer_upload_ok'
+        output = self.ssh_executer.exec_cmd(f"{{ {cmd}; }} && echo {marker}", stdout=False)
+        if marker not in (output.stdout or ''):
+            raise PuppeteerUploadError(f"|ERROR| The command failed on the server: {cmd}")
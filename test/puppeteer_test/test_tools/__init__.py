@@ -1,2 +1,8 @@
 # -*- coding: utf-8 -*-
-from .test_tools import TestTools
+
+
+def __getattr__(name: str):
+    if name == 'TestTools':
+        from .test_tools import TestTools
+        return TestTools
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
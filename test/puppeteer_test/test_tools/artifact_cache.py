@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from os import makedirs
+from os.path import join, isfile, getmtime
+from posixpath import join as remote_join
+from urllib.parse import urlparse
+from urllib.request import urlopen
+from typing import Optional
+
+from host_tools import Shell
+from rich import print
+
+from data import ArtifactConfig
+from .paths import Paths
+from .puppeter_repo import PuppeterRepo
+
+
+class ArtifactCache:
+    """
+    A class to keep the provisioning artifacts in the local cache and push them to the droplets.
+
+    The GoogleChrome package, the NodeJs tarball and the build_tools bundle are fetched once into
+    Paths.artifacts_dir and fetched again when they are older than max_age. The droplets receive them
+    over SFTP and install them from the local copies instead of downloading them from the internet.
+    The sources may be file:// URLs or local paths, so the cache can be filled offline from a local stand-in.
+    """
+    chrome_deb = 'google-chrome-stable_current_amd64.deb'
+    node_tarball = 'node-linux-x64.tar.xz'
+    build_tools_bundle = 'build_tools.bundle'
+
+    def __init__(self, config: ArtifactConfig = None, cache_dir: str = None):
+        """
+        :param config: The artifact cache configuration. Defaults to ArtifactConfig().
+        :param cache_dir: The directory of the cached artifacts. Defaults to Paths.artifacts_dir.
+        """
+        self.path = Paths()
+        self.config = config or ArtifactConfig()
+        self.cache_dir = cache_dir or self.path.artifacts_dir
+        self._lock = threading.Lock()
+        self._artifacts: Optional[dict[str, str]] = None
+
+    def prefetch(self) -> dict[str, str]:
+        """
+        Fill the cache with the missing and outdated artifacts. The artifacts are fetched once per instance,
+        the concurrent callers wait for the first one.
+        :return: The paths to the cached artifacts by their names.
+        """
+        with self._lock:
+            if self._artifacts is None:
+                makedirs(self.cache_dir, exist_ok=True)
+                self._artifacts = {
+                    self.chrome_deb: self._fetch(self.config.chrome_deb_url, self.chrome_deb),
+                    self.node_tarball: self._fetch_node(),
+                    self.build_tools_bundle: self._bundle_build_tools()
+                }
+            return self._artifacts
+
+    def remote_path(self, name: str) -> str:
+        """
+        :param name: The name of the artifact.
+        :return: The path to the artifact on the droplet.
+        """
+        return remote_join(self.path.remote_home_dir, name)
+
+    @staticmethod
+    def digest(path: str) -> str:
+        """
+        :param path: The path to the file.
+        :return: The sha256 hex digest of the file content.
+        """
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def _fetch(self, source: str, name: str, sha256: str = None) -> str:
+        """
+        Copy the source into the cache unless the cached copy is fresh.
+        :param source: The URL, file:// URL or local path of the artifact.
+        :param name: The name of the artifact in the cache.
+        :param sha256: The expected sha256 hex digest of the artifact.
+        :return: The path to the cached artifact.
+        :raises ValueError: If the digest of the fetched artifact does not match the expected one.
+        """
+        path = join(self.cache_dir, name)
+        if self._is_fresh(path) and (sha256 is None or self.digest(path) == sha256):
+            return path
+
+        print(f"[green]|INFO| Fetching the artifact [cyan]{name}[/] from {source}")
+        tmp_path = f"{path}.tmp"
+        with self._open(source) as response, open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(response, f, 1024 * 1024)
+
+        if sha256 is not None and self.digest(tmp_path) != sha256:
+            os.remove(tmp_path)
+            raise ValueError(f"|ERROR| The checksum of the artifact {name} from {source} does not match")
+
+        os.replace(tmp_path, path)
+        return path
+
+    def _fetch_node(self) -> str:
+        """
+        Fetch the linux-x64 NodeJs tarball listed in SHASUMS256.txt of the distribution directory
+        and verify its checksum.
+        :return: The path to the cached tarball.
+        """
+        path = join(self.cache_dir, self.node_tarball)
+        if self._is_fresh(path):
+            return path
+
+        with self._open(f"{self.config.node_dist_url.rstrip('/')}/SHASUMS256.txt") as response:
+            shasums = response.read().decode('utf-8')
+
+        match = re.search(r'^([0-9a-f]{64})\s+(node-v[\d.]+-linux-x64\.tar\.xz)$', shasums, re.MULTILINE)
+        if not match:
+            raise ValueError(f"|ERROR| The linux-x64 tarball is not listed in {self.config.node_dist_url}")
+
+        sha256, tarball = match.groups()
+        return self._fetch(f"{self.config.node_dist_url.rstrip('/')}/{tarball}", self.node_tarball, sha256=sha256)
+
+    def _bundle_build_tools(self) -> str:
+        """
+        Update the build_tools mirror and pack it into a git bundle.
+        :return: The path to the cached bundle.
+        """
+        path = join(self.cache_dir, self.build_tools_bundle)
+        if self._is_fresh(path):
+            return path
+
+        mirror = PuppeterRepo().update_mirror(self.config.build_tools_repo)
+        print(f"[green]|INFO| Bundling the mirror {mirror} into the artifact [cyan]{self.build_tools_bundle}")
+        Shell.call(f"git --git-dir '{mirror}' bundle create '{path}.tmp' --all")
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def _is_fresh(self, path: str) -> bool:
+        """
+        :return: True if the cached artifact exists and is younger than max_age.
+        """
+        return isfile(path) and time.time() - getmtime(path) < self.config.max_age
+
+    @staticmethod
+    def _open(source: str):
+        """
+        :param source: The URL, file:// URL or local path.
+        :return: The readable binary response.
+        """
+        return urlopen(source if urlparse(source).scheme else f"file://{os.path.abspath(source)}", timeout=60)
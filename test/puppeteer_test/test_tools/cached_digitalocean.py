@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional, TYPE_CHECKING
+
+from rich import print
+
+if TYPE_CHECKING:
+    from digitalocean_wrapper import DigitalOceanWrapper
+
+
+class RateLimiter:
+    """
+    A sliding-window limiter that keeps the API requests of the process under the DigitalOcean rate limit.
+    """
+
+    def __init__(self, per_minute: int = 240):
+        """
+        :param per_minute: The maximum number of requests in any 60 seconds.
+        """
+        self.per_minute = per_minute
+        self._lock = threading.Lock()
+        self._requests: deque = deque()
+
+    def acquire(self) -> None:
+        """
+        Wait until a request fits the window and record it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._requests and now - self._requests[0] >= 60:
+                    self._requests.popleft()
+                if len(self._requests) < self.per_minute:
+                    self._requests.append(now)
+                    return
+                delay = 60 - (now - self._requests[0])
+            time.sleep(delay)
+
+
+class CachedResource:
+    """
+    A proxy of a DigitalOceanWrapper resource, such as droplet or ssh_key, that caches the results of its lookups.
+
+    The results are cached by the method and its arguments for the TTL of the resource. Concurrent identical
+    lookups are coalesced into one request. A mutating method clears the cache of the resource.
+    Other attributes are passed through to the resource.
+    """
+
+    def __init__(self, client: "CachedDigitalOcean", resource: str, ttl: float, lookups: tuple, mutations: tuple):
+        """
+        :param client: The caching client that owns the resource.
+        :param resource: The name of the DigitalOceanWrapper resource.
+        :param ttl: The time (in seconds) the lookup results are kept.
+        :param lookups: The names of the methods that are cached.
+        :param mutations: The names of the methods that clear the cache.
+        """
+        self._client = client
+        self._resource = resource
+        self._ttl = ttl
+        self._lookups = lookups
+        self._mutations = mutations
+        self._lock = threading.Lock()
+        self._cache: dict[tuple, tuple[float, Any]] = {}
+        self._key_locks: dict[tuple, threading.Lock] = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(getattr(self._client.do, self._resource), name)
+        if name in self._lookups:
+            return lambda *args, **kwargs: self._lookup(name, attr, args, kwargs)
+        if name in self._mutations:
+            return lambda *args, **kwargs: self._mutate(attr, args, kwargs)
+        return attr
+
+    def invalidate(self) -> None:
+        """
+        Clear the cached lookups of the resource.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def _lookup(self, name: str, method: Callable, args: tuple, kwargs: dict) -> Any:
+        key = (name, *map(self._arg_key, args), *sorted((k, self._arg_key(v)) for k, v in kwargs.items()))
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < self._ttl:
+                self._client.count_hit()
+                return cached[1]
+
+            result = self._client.call(method, *args, **kwargs)
+            with self._lock:
+                self._cache[key] = (time.monotonic(), result)
+            return result
+
+    def _mutate(self, method: Callable, args: tuple, kwargs: dict) -> Any:
+        try:
+            return self._client.call(method, *args, **kwargs)
+        finally:
+            self.invalidate()
+
+    @staticmethod
+    def _arg_key(value: Any) -> Any:
+        """
+        :return: The cache key of the argument. DigitalOcean objects are identified by their IDs.
+        """
+        return getattr(value, 'id', value) if not isinstance(value, (str, int, float, bool, type(None))) else value
+
+
+class CachedDigitalOcean:
+    """
+    A caching client layer in front of DigitalOceanWrapper.
+
+    The droplet and SSH key lookups repeated within a run are served from memory for the resource TTLs,
+    so polling and repeated name lookups cost no API round trips. Any create, delete or move clears
+    the cached lookups of its resource. All requests pass through a process-wide rate limiter
+    and are retried with exponential backoff and jitter when the API answers 429 Too Many Requests.
+    """
+    limiter = RateLimiter()
+    retries = 5
+
+    def __init__(
+            self,
+            digital_ocean: "DigitalOceanWrapper" = None,
+            droplet_ttl: float = 30,
+            ssh_key_ttl: float = 600
+    ):
+        """
+        :param digital_ocean: Wrapper object to interact with DigitalOcean API.
+         Defaults to DigitalOceanWrapper(), which is created and imported on the first request.
+        :param droplet_ttl: The time (in seconds) the droplet lookups are kept.
+        :param ssh_key_ttl: The time (in seconds) the SSH key lookups are kept.
+        """
+        self._do: Optional["DigitalOceanWrapper"] = digital_ocean
+        self.calls = 0
+        self.hits = 0
+        self._stats_lock = threading.Lock()
+        self.droplet = CachedResource(
+            self, 'droplet', droplet_ttl,
+            lookups=('get_droplet_names', 'get_by_name', 'info'),
+            mutations=('create', 'delete', 'move_to_project')
+        )
+        self.ssh_key = CachedResource(
+            self, 'ssh_key', ssh_key_ttl,
+            lookups=('get_by_pub_key', 'get_all_ssh_key_names'),
+            mutations=('create', 'delete')
+        )
+
+    @property
+    def do(self) -> "DigitalOceanWrapper":
+        """
+        The wrapped DigitalOceanWrapper. It is created on the first access.
+        """
+        with self._stats_lock:
+            if self._do is None:
+                from digitalocean_wrapper import DigitalOceanWrapper
+                self._do = DigitalOceanWrapper()
+            return self._do
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.do, name)
+
+    def invalidate(self) -> None:
+        """
+        Clear the cached lookups of all resources.
+        """
+        self.droplet.invalidate()
+        self.ssh_key.invalidate()
+
+    def call(self, method: Callable, *args, **kwargs) -> Any:
+        """
+        Make the API request within the rate limit, retrying it while the API answers 429.
+        :param method: The method of the DigitalOceanWrapper resource.
+        :return: The result of the method.
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            with self._stats_lock:
+                self.calls += 1
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not self._is_rate_limited(e):
+                    raise
+                delay = min(2 ** attempt, 60) + random.uniform(0, 1)
+                print(f"[red]|WARNING| DigitalOcean rate limit is reached, retrying in {delay:.1f} seconds")
+                time.sleep(delay)
+
+    def count_hit(self) -> None:
+        """
+        Count a lookup served from the cache.
+        """
+        with self._stats_lock:
+            self.hits += 1
+
+    @property
+    def stats(self) -> str:
+        """
+        :return: The number of API requests and of the lookups served from the cache.
+        """
+        return f"DigitalOcean API requests: {self.calls}, cached lookups: {self.hits}"
+
+    @staticmethod
+    def _is_rate_limited(error: Exception) -> bool:
+        """
+        python-digitalocean raises DataReadError with the message of the API and without the status code,
+        so for it the 'too_many_requests' answer is recognized by the message.
+
+        :return: True if the error is the 429 Too Many Requests answer of the API.
+        """
+        import digitalocean
+
+        status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+        if status is not None:
+            return status == 429
+
+        message = str(error).lower()
+        return isinstance(error, digitalocean.DataReadError) and (
+            'rate limit' in message or 'too many requests' in message or 'too_many_requests' in message
+        )
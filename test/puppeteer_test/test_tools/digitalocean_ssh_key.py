@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 from os.path import dirname, basename
-from typing import Optional
+from typing import Optional, Union, TYPE_CHECKING
 from rich import print
 
 
-from digitalocean_wrapper import DigitalOceanWrapper
 from rich.prompt import Prompt
 
 from data import DropletConfig, DigitalOceanSshKeyError
+from .cached_digitalocean import CachedDigitalOcean
+
+if TYPE_CHECKING:
+    from digitalocean_wrapper import DigitalOceanWrapper
 
 
 class DigitalOceanSshKey:
@@ -15,28 +18,34 @@ class DigitalOceanSshKey:
     Class to manage SSH keys for a DigitalOcean droplet.
     """
 
-    def __init__(self, droplet_config: DropletConfig, digital_ocean: DigitalOceanWrapper):
+    def __init__(self, droplet_config: DropletConfig, digital_ocean: Union["DigitalOceanWrapper", CachedDigitalOcean]):
         """
         Initializes the DigitalOceanSshKey instance.
 
         :param droplet_config: Configuration object for the droplet.
-        :param digital_ocean: Wrapper object to interact with DigitalOcean API.
+        :param digital_ocean: Wrapper object to interact with DigitalOcean API, optionally behind the caching layer.
         """
         self.droplet_config = droplet_config
         self.do = digital_ocean
         self.local_ssh_key_path = self.do.ssh_key.default_pub_key_path
         self.local_pub_key = self._get_local_public_key()
+        self._keys_id: Optional[list] = None
 
     def get_keys_id(self) -> list:
         """
         Retrieve the list of SSH key IDs to be used for the DigitalOcean droplet.
+        The found key IDs are cached for subsequent calls.
 
         :return: A list of SSH key IDs.
         :raises DigitalOceanSshKeyError: If no SSH key ID can be retrieved or created.
         """
+        if self._keys_id:
+            return self._keys_id
+
         ssh_key = self.get_id_by_pub_key() or self.create_ssh_key()
         if ssh_key:
-            return [ssh_key]
+            self._keys_id = [ssh_key]
+            return self._keys_id
 
         raise DigitalOceanSshKeyError(f"|ERROR| Cannot get digitalocean's ssh key id")
 
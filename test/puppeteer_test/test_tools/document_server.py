@@ -1,6 +1,13 @@
 # -*- coding: utf-8 -*-
+import json
+import os
 import re
+import threading
+from os import makedirs
+from os.path import isfile, dirname
+
 import requests
+from requests.adapters import HTTPAdapter
 from rich import print
 
 from typing import Optional
@@ -14,9 +21,21 @@ from .paths import Paths
 class DocumentServer:
     """
     A class to interact with a document server
+
+    The version is read from the banner at the top of sdk-all.js. The bundle is streamed in chunks
+    and the download stops at the first match, the first chunk is requested with an HTTP Range where
+    the server supports it. The found version is cached on disk together with the ETag and Last-Modified
+    of the bundle, so an unchanged DocumentServer answers 304 Not Modified and the bundle is not transferred.
     """
-    version_pattern = re.compile(r'Version:\s*(\d+\.\d+\.\d+)\s*\(build:(\d+)\)', re.IGNORECASE)
+    version_pattern = re.compile(rb'Version:\s*(\d+\.\d+\.\d+)\s*\(build:(\d+)\)', re.IGNORECASE)
     sdk_link = 'sdkjs/word/sdk-all.js'
+    probe_bytes = 64 * 1024
+    chunk_size = 16 * 1024
+    timeout = (5, 30)
+
+    _session: Optional[requests.Session] = None
+    _session_lock = threading.Lock()
+    _cache_lock = threading.Lock()
 
     def __init__(self, url: str):
         """
@@ -26,17 +45,21 @@ class DocumentServer:
         self.path = Paths()
         self.url = url
         self.parsed_url = urlparse(url)
+        self.version: Optional[str] = None
+        self._probed = False
+        self._version_lock = threading.Lock()
 
     def get_version(self) -> Optional[str]:
         """
         Retrieve the version information from the SDK JavaScript file on the document server.
+        The server is probed once, the result is cached for subsequent calls even if the version is not found.
         :return: The version string if found, otherwise None.
         """
-        if self.url:
-            match = self.version_pattern.search(self._get_sdk_all_js_content())
-            if match:
-                return f"{match.group(1)}.{match.group(2)}"
-        return None
+        with self._version_lock:
+            if self.url and not self._probed:
+                self.version = self._probe_version()
+                self._probed = True
+        return self.version
 
     def check_example_is_up(self) -> bool:
         """
@@ -65,21 +88,113 @@ class DocumentServer:
             f"responded with status code: [cyan]{response.status_code}[/]"
         )
 
-    def _get_sdk_all_js_content(self) -> Optional[str]:
+    @property
+    def sdk_all_url(self) -> str:
+        """
+        :return: The URL of the sdk-all.js bundle with the version banner.
         """
-        Retrieve the content of the SDK JavaScript file from the given URL.
+        return f"{self.parsed_url.scheme}://{self.parsed_url.netloc}/{self.sdk_link}"
 
-        :return: The content of the file if the request is successful, otherwise None.
+    def _probe_version(self) -> Optional[str]:
+        """
+        Read the version from sdk-all.js. The cached version is revalidated with a conditional request.
+        :return: The version string if found, otherwise None.
         """
-        sdk_all_url = f"{self.parsed_url.scheme}://{self.parsed_url.netloc}/{self.sdk_link}"
+        cached = self._load_cache().get(self.sdk_all_url, {})
+        headers = {'Range': f"bytes=0-{self.probe_bytes - 1}"}
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+        response = self._request_get(self.sdk_all_url, headers=headers, stream=True)
+        if response is None:
+            return None
 
-        response = self._request_get(sdk_all_url)
-        if response and response.status_code == 200:
-            return response.text
+        with response:
+            if response.status_code == 304 and cached.get('version'):
+                print("[green]|INFO| DocumentServer version is not changed, the cached version is used")
+                return cached['version']
+
+            if response.status_code not in (200, 206):
+                return None
+
+            version = self._search_version(response)
+            validators = {'etag': response.headers.get('ETag'), 'last_modified': response.headers.get('Last-Modified')}
+
+        if version is None and response.status_code == 206:
+            response = self._request_get(self.sdk_all_url, stream=True)
+            if response is None or response.status_code != 200:
+                return None
+            with response:
+                version = self._search_version(response)
+
+        if version and (validators['etag'] or validators['last_modified']):
+            self._save_cache(self.sdk_all_url, {**validators, 'version': version})
+        return version
+
+    def _search_version(self, response: requests.Response) -> Optional[str]:
+        """
+        Read the response body in chunks until the version banner is found.
+        :param response: The streamed response.
+        :return: The version string if found, otherwise None.
+        """
+        tail = b''
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            data = tail + chunk
+            match = self.version_pattern.search(data)
+            if match:
+                return f"{match.group(1).decode()}.{match.group(2).decode()}"
+            tail = data[-256:]
         return None
 
-    @staticmethod
-    def _request_get(url: str) -> Optional[requests.Response]:
+    def _load_cache(self) -> dict:
+        """
+        :return: The cached versions with their validators by the sdk-all.js URLs.
+        """
+        with self._cache_lock:
+            return self._read_cache()
+
+    def _save_cache(self, url: str, entry: dict) -> None:
+        """
+        Store the version and the validators of sdk-all.js. The file is read and rewritten under one hold
+        of the lock, so the entries stored by concurrent probes of several DocumentServers are kept.
+        :param url: The URL of sdk-all.js.
+        :param entry: The version with the ETag and Last-Modified of the bundle.
+        """
+        with self._cache_lock:
+            cache = self._read_cache()
+            cache[url] = entry
+            makedirs(dirname(self.path.ds_versions_file), exist_ok=True)
+            tmp_path = f"{self.path.ds_versions_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp_path, self.path.ds_versions_file)
+
+    def _read_cache(self) -> dict:
+        if not isfile(self.path.ds_versions_file):
+            return {}
+        try:
+            with open(self.path.ds_versions_file, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    @classmethod
+    def _get_session(cls) -> requests.Session:
+        """
+        :return: The HTTP session with a keep-alive connection pool shared by all DocumentServer instances.
+        """
+        with cls._session_lock:
+            if cls._session is None:
+                cls._session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                cls._session.mount('http://', adapter)
+                cls._session.mount('https://', adapter)
+            return cls._session
+
+    @classmethod
+    def _request_get(cls, url: str, headers: dict = None, stream: bool = False) -> Optional[requests.Response]:
         """
         Sends a GET request to the specified URL and returns the response.
 
@@ -87,10 +202,12 @@ class DocumentServer:
         It prints an error message if the connection fails or if any other request error occurs.
 
         :param url: The URL to send the GET request to.
+        :param headers: Additional request headers.
+        :param stream: If True, the body is not downloaded until it is read.
         :return: The response object if the request is successful; None otherwise.
         """
         try:
-            return requests.get(url)
+            return cls._get_session().get(url, headers=headers, stream=stream, timeout=cls.timeout)
 
         except requests.ConnectionError:
             print(f"[red]|ERROR| Failed to connect to the server: {url}")
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from os.path import isfile, dirname
+from typing import Union, TYPE_CHECKING
+
+from rich import print
+
+from data import DropletConfig, PoolConfig
+from .paths import Paths
+from .cached_digitalocean import CachedDigitalOcean
+
+if TYPE_CHECKING:
+    from digitalocean_wrapper import DigitalOceanWrapper
+
+
+class DropletPool:
+    """
+    A class to manage a pool of warm, provisioned droplets with lease/return semantics.
+
+    Pool members are recorded in a local registry together with their tags (browser and image key).
+    A run leases a free member with matching tags or registers a new one, and returns it when finished.
+    Idle members are removed after PoolConfig.idle_ttl seconds, and the number of free members
+    per tags is limited by PoolConfig.size.
+    """
+    _thread_lock = threading.Lock()
+
+    def __init__(
+            self,
+            digital_ocean: Union["DigitalOceanWrapper", CachedDigitalOcean],
+            droplet_config: DropletConfig,
+            pool_config: PoolConfig = None,
+            pool_path: str = None
+    ):
+        """
+        :param digital_ocean: Wrapper object to interact with DigitalOcean API, optionally behind the caching layer.
+        :param droplet_config: Configuration object for the droplet.
+        :param pool_config: Configuration object for the pool. Defaults to PoolConfig().
+        :param pool_path: The path to the JSON registry of the pool. Defaults to Paths.pool_file.
+        """
+        self.do = digital_ocean
+        self.droplet_config = droplet_config
+        self.pool_config = pool_config or PoolConfig()
+        self.pool_path = pool_path or Paths().pool_file
+
+    def lease(self, browser: str, image_key: str) -> str:
+        """
+        Lease a free pool member with the given tags. If there is no free member, a new one is registered
+        and its droplet has to be created by the caller.
+
+        :param browser: The browser the droplet is provisioned for.
+        :param image_key: The key of the image and provisioning steps of the droplet.
+        :return: The name of the leased droplet.
+        """
+        with self._locked() as members:
+            # The pool is shared between processes, so the droplets are listed without the cached lookups
+            self.do.invalidate() if isinstance(self.do, CachedDigitalOcean) else None
+            droplet_names = set(self.do.droplet.get_droplet_names())
+            self._forget_missing(members, droplet_names)
+
+            for name, member in members.items():
+                if member['browser'] == browser and member['image'] == image_key and not self.is_leased(member):
+                    print(f"[green]|INFO| Leased warm droplet [cyan]{name}[/] from the pool")
+                    self._mark_leased(member)
+                    return name
+
+            name = self._new_member_name(members, browser, droplet_names)
+            members[name] = {'browser': browser, 'image': image_key, 'last_used': time.time()}
+            self._mark_leased(members[name])
+            print(f"[green]|INFO| No warm droplet in the pool, droplet [cyan]{name}[/] will be added")
+            return name
+
+    def release(self, name: str) -> None:
+        """
+        Return the leased droplet to the pool and scale the pool down.
+        :param name: The name of the droplet.
+        """
+        with self._locked() as members:
+            if name in members:
+                members[name].pop('leased_by', None)
+                members[name]['last_used'] = time.time()
+                print(f"[green]|INFO| Droplet [cyan]{name}[/] is returned to the pool")
+        self.scale_down()
+
+    def scale_down(self) -> list[str]:
+        """
+        Delete the free members that have been idle longer than the TTL
+        and the free members exceeding the pool size for their tags.
+
+        :return: The names of the deleted droplets.
+        """
+        with self._locked() as members:
+            now, kept, expired = time.time(), {}, []
+            free = sorted(
+                ((name, m) for name, m in members.items() if not self.is_leased(m)),
+                key=lambda item: item[1]['last_used'],
+                reverse=True
+            )
+
+            for name, member in free:
+                tags = (member['browser'], member['image'])
+                kept[tags] = kept.get(tags, 0) + 1
+                if now - member['last_used'] > self.pool_config.idle_ttl or kept[tags] > self.pool_config.size:
+                    expired.append(name)
+
+            for name in expired:
+                members.pop(name)
+
+        for name in expired:
+            droplet = self.do.droplet.get_by_name(name)
+            if droplet:
+                print(f"[magenta]|INFO| Deleting idle pool droplet [cyan]{name}[/]")
+                self.do.droplet.delete(droplet)
+
+        return expired
+
+    def members(self) -> dict:
+        """
+        :return: The registry of the pool members.
+        """
+        with self._locked() as members:
+            return dict(members)
+
+    def missing(self, browser: str, image_key: str) -> int:
+        """
+        :param browser: The browser of the members.
+        :param image_key: The image key of the members.
+        :return: The number of members to add to have PoolConfig.size free members with the given tags.
+        """
+        free = [
+            m for m in self.members().values()
+            if m['browser'] == browser and m['image'] == image_key and not self.is_leased(m)
+        ]
+        return max(self.pool_config.size - len(free), 0)
+
+    def _new_member_name(self, members: dict, browser: str, droplet_names: set) -> str:
+        num = 1
+        while True:
+            name = f"{self.droplet_config.name}-pool-{browser}-{num}"
+            if name not in members and name not in droplet_names:
+                return name
+            num += 1
+
+    def _forget_missing(self, members: dict, droplet_names: set) -> None:
+        for name in [name for name, m in members.items() if name not in droplet_names and not self.is_leased(m)]:
+            members.pop(name)
+
+    @staticmethod
+    def _mark_leased(member: dict) -> None:
+        member['leased_by'] = {'host': socket.gethostname(), 'pid': os.getpid()}
+        member['last_used'] = time.time()
+
+    @staticmethod
+    def is_leased(member: dict) -> bool:
+        """
+        A lease is considered stale if the leasing process on this host is no longer running.
+        On Windows the process is not checked, because os.kill terminates it there.
+        :param member: The registry record of the pool member.
+        :return: True if the member is leased by a running process.
+        """
+        leased_by = member.get('leased_by')
+        if not leased_by:
+            return False
+
+        if leased_by['host'] != socket.gethostname() or os.name == 'nt':
+            return True
+
+        try:
+            os.kill(leased_by['pid'], 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @contextmanager
+    def _locked(self):
+        """
+        Lock the registry between threads and processes and save it after the changes.
+        """
+        os.makedirs(dirname(self.pool_path), exist_ok=True)
+        with self._thread_lock, open(f"{self.pool_path}.lock", 'w') as lock:
+            self._lock_file(lock)
+            try:
+                members = self._load()
+                yield members
+                with open(self.pool_path, 'w') as f:
+                    json.dump(members, f, indent=2)
+            finally:
+                self._unlock_file(lock)
+
+    @staticmethod
+    def _lock_file(file) -> None:
+        if os.name == 'nt':
+            import msvcrt
+            while True:
+                try:
+                    return msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                except OSError:  # LK_LOCK gives up after 10 seconds
+                    continue
+
+        import fcntl
+        fcntl.flock(file, fcntl.LOCK_EX)
+
+    @staticmethod
+    def _unlock_file(file) -> None:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            return msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+        import fcntl
+        fcntl.flock(file, fcntl.LOCK_UN)
+
+    def _load(self) -> dict:
+        if not isfile(self.pool_path):
+            return {}
+        with open(self.pool_path, 'r') as f:
+            return json.load(f)
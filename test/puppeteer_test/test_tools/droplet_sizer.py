@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from data import SizingConfig
+from data.sizing_config import DropletSizeModel
+
+
+@dataclass
+class SizePlan:
+    size: DropletSizeModel
+    threads: int
+    tests: int
+    duration: float
+
+    @property
+    def cost(self) -> float:
+        """
+        :return: The estimated cost of the run in USD, billed per second with a one-minute minimum.
+        """
+        return self.size.price_hourly * max(self.duration, 60) / 3600
+
+    def __str__(self):
+        return (
+            f"size: {self.size.slug} ({self.size.vcpus} vCPU, {self.size.memory} MB), threads: {self.threads}, "
+            f"tests: {self.tests}, estimated time: {self.duration / 60:.1f} min, estimated cost: ${self.cost:.3f}"
+        )
+
+
+class DropletSizer:
+    """
+    A class to choose the droplet size and the number of test threads for the workload.
+
+    A number of threads fits a size if each thread has its own share of vCPUs and the memory of the system
+    and the browser instances stays below the size memory minus the reserve, so the droplet neither swaps
+    nor oversubscribes the CPU. If the threads are not set, the plan with the lowest estimated cost is chosen,
+    the faster plan wins a tie.
+    """
+
+    def __init__(self, config: SizingConfig = None):
+        """
+        :param config: The sizing configuration. Defaults to SizingConfig().
+        """
+        self.config = config or SizingConfig()
+
+    def max_threads(self, size: DropletSizeModel, browsers: list[str]) -> int:
+        """
+        :param size: The droplet size.
+        :param browsers: The browsers installed on the droplet, the largest memory footprint is used.
+        :return: The maximum number of threads that fit the size, 0 if even one thread does not fit.
+        """
+        browser_memory = max(self.config.browser_memory.get(browser.lower(), 0) for browser in browsers) or 1
+        free_memory = size.memory * (1 - self.config.memory_reserve) - self.config.base_memory
+        by_memory = math.floor(free_memory / browser_memory) if free_memory > 0 else 0
+        return max(min(by_memory, size.vcpus * self.config.threads_per_vcpu, self.config.max_threads), 0)
+
+    def plan(self, tests: int, total_duration: float, browsers: list[str], threads: Optional[int] = None) -> SizePlan:
+        """
+        Choose the droplet size for the workload.
+        :param tests: The number of tests.
+        :param total_duration: The expected duration of all tests in one thread, in seconds.
+        :param browsers: The browsers installed on the droplet.
+        :param threads: The number of threads. If None, the number is chosen together with the size.
+        :return: The chosen plan.
+        :raises ValueError: If no configured size fits the number of threads.
+        """
+        plans = []
+        for size in self.config.sizes:
+            fit = self.max_threads(size, browsers)
+            if fit < 1 or (threads and fit < threads):
+                continue
+            size_threads = threads or max(min(fit, tests), 1)
+            plans.append(SizePlan(size, size_threads, tests, total_duration / size_threads))
+
+        if not plans:
+            raise ValueError(f"|ERROR| No droplet size in {self.config.config_path} fits {threads or 1} threads")
+
+        if threads:
+            return min(plans, key=lambda plan: (plan.size.price_hourly, plan.size.memory))
+        return min(plans, key=lambda plan: (round(plan.cost, 4), plan.duration))
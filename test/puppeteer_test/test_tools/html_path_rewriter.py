@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+from os.path import dirname
+from tempfile import NamedTemporaryFile
+
+
+class HtmlPathRewriter:
+    """
+    A class to replace a path prefix in a large html file in one forward pass with constant memory.
+
+    The file is read in chunks and the prefix is replaced where it is followed by a character that
+    can not continue a path segment, so '/root/out' is rewritten in '/root/out/a.png' but not in '/root/output'.
+    The tail of each chunk that may hold the beginning of a prefix is carried over to the next chunk.
+    """
+    chunk_size = 1024 * 1024
+
+    def __init__(self, old_prefix: str, new_prefix: str, chunk_size: int = None):
+        """
+        :param old_prefix: The path prefix to replace.
+        :param new_prefix: The replacement of the prefix.
+        :param chunk_size: The number of characters read at once. Defaults to 1M.
+        """
+        self.old_prefix = old_prefix
+        self.new_prefix = new_prefix
+        self.chunk_size = chunk_size or self.chunk_size
+        self.pattern = re.compile(re.escape(old_prefix) + r'(?=[^\w.\-]|\Z)')
+
+    def rewrite_file(self, path: str, encoding: str = 'utf-8') -> int:
+        """
+        Rewrite the file through a temporary file in the same directory, which then replaces the original one.
+        :param path: The path of the html file.
+        :param encoding: The encoding of the file.
+        :return: The number of replaced prefixes.
+        """
+        with (
+            open(path, 'r', encoding=encoding, newline='') as src,
+            NamedTemporaryFile('w', encoding=encoding, newline='', dir=dirname(path), delete=False) as dst
+        ):
+            try:
+                replaced = self.rewrite(src, dst)
+            except BaseException:
+                dst.close()
+                os.remove(dst.name)
+                raise
+
+        os.replace(dst.name, path)
+        return replaced
+
+    def rewrite(self, src, dst) -> int:
+        """
+        Copy the text stream with the prefix replaced.
+        :param src: The readable text stream.
+        :param dst: The writable text stream.
+        :return: The number of replaced prefixes.
+        """
+        buffer, replaced = '', 0
+
+        while True:
+            chunk = src.read(self.chunk_size)
+            buffer += chunk
+            final = not chunk
+            # A match starting before the limit is complete together with the character after it.
+            limit = len(buffer) if final else len(buffer) - len(self.old_prefix)
+            pos = 0
+
+            for match in self.pattern.finditer(buffer):
+                if match.start() >= limit:
+                    break
+                dst.write(buffer[pos:match.start()])
+                dst.write(self.new_prefix)
+                pos, replaced = match.end(), replaced + 1
+
+            if final:
+                dst.write(buffer[pos:])
+                return replaced
+
+            keep_from = max(pos, limit)
+            dst.write(buffer[pos:keep_from])
+            buffer = buffer[keep_from:]
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+from os import makedirs
+from os.path import isfile, dirname
+from typing import Optional
+
+from .paths import Paths
+
+
+class ImageRegistry:
+    """
+    A class to store the IDs of the pre-baked droplet snapshots.
+
+    The snapshots are recorded per base image, browser and fingerprint of the provisioning steps,
+    so a snapshot is used only while the provisioning script it was baked with stays the same.
+    """
+
+    def __init__(self, registry_path: str = None):
+        """
+        :param registry_path: The path to the JSON registry file. Defaults to Paths.images_file.
+        """
+        self.registry_path = registry_path or Paths().images_file
+
+    @staticmethod
+    def key(base_image: str, browser: str, fingerprint: str) -> str:
+        """
+        :return: The registry key of the snapshot.
+        """
+        return f"{base_image}:{browser.lower()}:{fingerprint}"
+
+    def get(self, base_image: str, browser: str, fingerprint: str) -> Optional[dict]:
+        """
+        Find the snapshot baked for the given parameters.
+        :param base_image: The image the snapshot was baked from.
+        :param browser: The browser installed on the snapshot.
+        :param fingerprint: The fingerprint of the provisioning steps.
+        :return: The snapshot record with the 'id' and 'name' keys, or None if there is no snapshot.
+        """
+        return self._load().get(self.key(base_image, browser, fingerprint))
+
+    def add(self, base_image: str, browser: str, fingerprint: str, snapshot_id: int, name: str) -> None:
+        """
+        Record the baked snapshot.
+        :param base_image: The image the snapshot was baked from.
+        :param browser: The browser installed on the snapshot.
+        :param fingerprint: The fingerprint of the provisioning steps.
+        :param snapshot_id: The DigitalOcean ID of the snapshot.
+        :param name: The name of the snapshot.
+        """
+        images = self._load()
+        images[self.key(base_image, browser, fingerprint)] = {'id': snapshot_id, 'name': name, 'created': time.time()}
+        makedirs(dirname(self.registry_path), exist_ok=True)
+        with open(self.registry_path, 'w') as f:
+            json.dump(images, f, indent=2)
+
+    def _load(self) -> dict:
+        if not isfile(self.registry_path):
+            return {}
+        with open(self.registry_path, 'r') as f:
+            return json.load(f)
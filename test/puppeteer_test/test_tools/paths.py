@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from os import getcwd
+from os.path import expanduser
 from posixpath import join, basename
 from data.decorators import singleton
 
@@ -13,6 +14,8 @@ class Paths:
     puppeter_run_sh_name: str = 'puppeteer_run.sh'
     puppeter_config_file_name: str = 'puppeteer_config.json'
     puppeteer_archive_name: str = 'puppeteer.zip'
+    puppeteer_delta_archive_name: str = 'puppeteer_delta.zip'
+    telemetry_sampler_name: str = 'telemetry_sampler.py'
 
     tmp_dir: str = join(getcwd(), 'tmp')
 
@@ -20,6 +23,15 @@ class Paths:
     local_puppeteer_dir = join(local_dep_test, 'puppeteer')
     local_puppeteer_files_dir = join(local_dep_test, 'puppeteer', 'files')
 
+    cache_dir: str = join(expanduser('~'), '.cache', 'puppeteer_test_wrapper')
+    images_file: str = join(cache_dir, 'images.json')
+    pool_file: str = join(cache_dir, 'pool.json')
+    mirrors_dir: str = join(cache_dir, 'mirrors')
+    history_file: str = join(cache_dir, 'history.db')
+    result_cache_file: str = join(cache_dir, 'results.db')
+    artifacts_dir: str = join(cache_dir, 'artifacts')
+    ds_versions_file: str = join(cache_dir, 'ds_versions.json')
+
     local_report_dir: str = join(getcwd(), 'Reports')
     local_puppeter_config_file: str = join(getcwd(), puppeter_config_file_name)
     local_puppeteer_archive = join(tmp_dir, puppeteer_archive_name)
@@ -30,4 +42,12 @@ class Paths:
     remote_report_dir: str = join(remote_puppeteer_dir, 'out')
     remote_result_archive: str = join(remote_home_dir, 'result.zip')
     remote_puppeteer_archive: str = join(remote_home_dir, puppeteer_archive_name)
+    remote_puppeteer_delta_archive: str = join(remote_home_dir, puppeteer_delta_archive_name)
+    remote_puppeteer_manifest: str = join(remote_home_dir, '.puppeteer_manifest.json')
     remote_puppeteer_engine: str = join(remote_puppeteer_dir, 'engine')
+    remote_provisioned_marker: str = join(remote_home_dir, '.puppeteer_provisioned')
+    remote_test_list: str = join(remote_home_dir, 'puppeteer_test_list.txt')
+    remote_telemetry_sampler: str = join(remote_home_dir, telemetry_sampler_name)
+    remote_telemetry_file: str = join(remote_home_dir, 'telemetry.csv')
+    trace_markers_name: str = 'trace_markers.txt'
+    remote_trace_markers: str = join(remote_home_dir, trace_markers_name)
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+from typing import Callable, Iterable, Optional
+
+from rich import print
+from rich.table import Table
+
+from .tracer import Tracer
+
+
+class Stage:
+    """
+    A single step of the pipeline executed after all its dependencies have finished.
+    """
+
+    def __init__(self, name: str, func: Callable, after: Iterable[str] = (), wait: Iterable[str] = ()):
+        """
+        :param name: The unique name of the stage.
+        :param func: A blocking callable without arguments executed in a worker thread.
+        :param after: The names of the stages that must be finished before this stage starts.
+        :param wait: The names of the stages that must end before this stage starts, successfully or not.
+        """
+        self.name = name
+        self.func = func
+        self.after = list(after)
+        self.wait = list(wait)
+        self.status = 'pending'
+        self.error: Optional[Exception] = None
+        self.start: Optional[float] = None
+        self.end: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """
+        :return: The execution time of the stage in seconds.
+        """
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+class StageSkipped(Exception):
+    """
+    Raised for a stage whose dependency has failed.
+    A stage function can raise it to skip the stage and its dependents without failing the pipeline.
+    """
+
+
+class Pipeline:
+    """
+    A class to run the stages of the test lifecycle as a dependency graph.
+    Independent stages are executed concurrently, each blocking stage runs in its own thread.
+    """
+
+    def __init__(self, name: str = 'Pipeline'):
+        """
+        :param name: The name of the pipeline used in the timing summary.
+        """
+        self.name = name
+        self.stages: dict[str, Stage] = {}
+        self.started: Optional[float] = None
+
+    def add(self, name: str, func: Callable, after: Iterable[str] = (), wait: Iterable[str] = ()) -> Stage:
+        """
+        Add a stage to the pipeline.
+        :param name: The unique name of the stage.
+        :param func: A blocking callable without arguments.
+        :param after: The names of the stages this stage depends on. If one of them fails, the stage is skipped.
+        :param wait: The names of the stages this stage is ordered after. The stage runs even if they fail.
+        :return: The added stage.
+        """
+        if name in self.stages:
+            raise ValueError(f"|ERROR| Stage '{name}' already exists in the pipeline")
+        self.stages[name] = Stage(name, func, after, wait)
+        return self.stages[name]
+
+    def run(self, summary: bool = True) -> None:
+        """
+        Run all stages and print the timing summary.
+        :param summary: If True, print the per-stage timing summary when the pipeline finishes.
+        :raises Exception: The first exception raised by a failed stage.
+        """
+        self._verify()
+        try:
+            asyncio.run(self._run())
+        finally:
+            self.print_summary() if summary else None
+
+        for stage in self.stages.values():
+            if stage.error:
+                raise stage.error
+
+    def critical_path(self) -> list[Stage]:
+        """
+        Find the chain of stages that determined the total execution time.
+        Starting from the stage that finished last, each step goes to the dependency that finished last.
+
+        :return: The stages of the critical path in execution order.
+        """
+        finished = [stage for stage in self.stages.values() if stage.end is not None]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda stage: stage.end)]
+        while True:
+            deps = [
+                self.stages[name] for name in path[-1].after + path[-1].wait if self.stages[name].end is not None
+            ]
+            if not deps:
+                return path[::-1]
+            path.append(max(deps, key=lambda stage: stage.end))
+
+    def print_summary(self) -> None:
+        """
+        Print the start offset, duration and status of each stage. The stages of the critical path are highlighted.
+        """
+        critical = {stage.name for stage in self.critical_path()}
+        table = Table(title=f"{self.name} stages timing")
+        for column in ('Stage', 'Start, s', 'Duration, s', 'Status', 'Critical path'):
+            table.add_column(column)
+
+        for stage in sorted(self.stages.values(), key=lambda s: (s.start is None, s.start or 0)):
+            table.add_row(
+                stage.name,
+                f"{stage.start - self.started:.1f}" if stage.start is not None else '-',
+                f"{stage.duration:.1f}",
+                stage.status,
+                '*' if stage.name in critical else '',
+                style='bold magenta' if stage.name in critical else None
+            )
+
+        print(table)
+        if self.started is not None:
+            end = max((stage.end for stage in self.stages.values() if stage.end is not None), default=self.started)
+            print(f"[green]|INFO| {self.name} finished in [cyan]{end - self.started:.1f}[/] seconds")
+
+    async def _run(self) -> None:
+        self.started = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+
+        for name in self._topological_order():
+            tasks[name] = asyncio.create_task(self._run_stage(self.stages[name], tasks))
+
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+    async def _run_stage(self, stage: Stage, tasks: dict) -> None:
+        await asyncio.gather(*(tasks[name] for name in stage.after + stage.wait), return_exceptions=True)
+
+        if any(self.stages[name].status != 'done' for name in stage.after):
+            stage.status = 'skipped'
+            raise StageSkipped(stage.name)
+
+        def run_traced():
+            with Tracer().span(stage.name, 'stage'):
+                stage.func()
+
+        stage.status = 'running'
+        stage.start = time.perf_counter()
+        try:
+            await asyncio.to_thread(run_traced)
+        except StageSkipped:
+            stage.status = 'skipped'
+            raise
+        except Exception as e:
+            stage.status, stage.error = 'failed', e
+            print(f"[red]|ERROR| Stage [cyan]{stage.name}[/] failed: {e}")
+            raise
+        finally:
+            stage.end = time.perf_counter()
+
+        stage.status = 'done'
+
+    def _topological_order(self) -> list[str]:
+        order, visited = [], set()
+
+        def visit(name: str, chain: tuple):
+            if name in chain:
+                raise ValueError(f"|ERROR| Circular dependency in the pipeline: {' -> '.join(chain + (name,))}")
+            if name in visited:
+                return
+            for dep in self.stages[name].after + self.stages[name].wait:
+                visit(dep, chain + (name,))
+            visited.add(name)
+            order.append(name)
+
+        for stage_name in self.stages:
+            visit(stage_name, ())
+        return order
+
+    def _verify(self) -> None:
+        for stage in self.stages.values():
+            unknown = [name for name in stage.after + stage.wait if name not in self.stages]
+            if unknown:
+                raise ValueError(f"|ERROR| Stage '{stage.name}' depends on unknown stages: {unknown}")
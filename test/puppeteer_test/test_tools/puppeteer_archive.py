@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import zipfile
+from os.path import join, relpath
+from typing import Optional, Iterable, Iterator
+
+from host_tools import File
+from rich import print
+
+from .paths import Paths
+
+
+class PuppeteerArchive:
+    """
+    A class to create the puppeteer archive uploaded to the droplet.
+    """
+    ignore_dirs = {'.git'}
+
+    def __init__(self, archive_path: str, files: Optional[list] = None):
+        """
+        :param archive_path: The path of the archive to create.
+        :param files: Paths of the test files relative to the puppeteer files directory to include.
+         If None, the whole puppeteer directory is archived.
+        """
+        self.path = Paths()
+        self.archive_path = archive_path
+        self.files = set(files) if files is not None else None
+        self._manifest: Optional[dict] = None
+
+    def create(self, paths: Iterable[str] = None) -> str:
+        """
+        Create the puppeteer archive.
+        :param paths: Paths relative to the puppeteer directory to archive. If None, all included files are archived.
+        :return: The path to the created archive.
+        """
+        if self.files is None and paths is None:
+            File.compress(self.path.local_puppeteer_dir, self.archive_path, stdout=True)
+            return self.archive_path
+
+        paths = sorted(paths) if paths is not None else [rel for _, rel in self.iter_files()]
+        print(f"[green]|INFO| Compressing [cyan]{len(paths)}[/] files to {self.archive_path}")
+        with zipfile.ZipFile(self.archive_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for rel in paths:
+                archive.write(join(self.path.local_puppeteer_dir, rel), rel)
+        return self.archive_path
+
+    def iter_files(self) -> Iterator[tuple[str, str]]:
+        """
+        Iterate over the files included in the archive. The git metadata of the checkouts is skipped.
+        :return: Pairs of the absolute path and the path relative to the puppeteer directory.
+        """
+        for root, dirs, file_names in os.walk(self.path.local_puppeteer_dir):
+            dirs[:] = [d for d in dirs if d not in self.ignore_dirs]
+            for name in file_names:
+                path = join(root, name)
+                if self._is_included(path):
+                    yield path, relpath(path, self.path.local_puppeteer_dir).replace(os.sep, '/')
+
+    def manifest(self) -> dict:
+        """
+        Calculate the content hashes of the included files. The result is cached.
+        :return: A dictionary where the key is the path relative to the puppeteer directory
+         and the value is the sha256 hex digest of the file.
+        """
+        if self._manifest is None:
+            self._manifest = {}
+            for path, rel in self.iter_files():
+                with open(path, 'rb') as f:
+                    self._manifest[rel] = hashlib.file_digest(f, 'sha256').hexdigest()
+        return self._manifest
+
+    def _is_included(self, path: str) -> bool:
+        """
+        Check whether the file should be added to the archive.
+        Files outside the puppeteer files directory are always included.
+
+        :param path: The absolute path of the file.
+        :return: True if the file should be archived, False otherwise.
+        """
+        if self.files is None:
+            return True
+
+        files_dir_rel = relpath(path, self.path.local_puppeteer_files_dir).replace(os.sep, '/')
+        if files_dir_rel.startswith('../'):
+            return True
+        return files_dir_rel in self.files
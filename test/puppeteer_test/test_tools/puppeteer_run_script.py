@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
-from typing import Union
+import hashlib
+from typing import Union, Optional
 from rich import print
-from data import PuppeteerChromeConfig
+from data import PuppeteerChromeConfig, DropletConfig
 
-from posixpath import join, basename, dirname
+from posixpath import join, dirname
 
 from .paths import Paths
+from .test_scheduler import TestScheduler
+from .telemetry_sampler import TelemetrySampler
+from .artifact_cache import ArtifactCache
 
 class PuppeteerRunScript:
     """
@@ -18,7 +22,8 @@ class PuppeteerRunScript:
             config: Union[PuppeteerChromeConfig],
             script_dir: str = None,
             script_name: str = None,
-            flags: dict = None
+            flags: dict = None,
+            browsers: list = None
     ):
         """
         Initialize the PuppeteerRunScript with configuration, optional script directory, script name, and flags.
@@ -26,6 +31,7 @@ class PuppeteerRunScript:
         :param script_dir: The directory where the script will be saved. Defaults to a temporary directory.
         :param script_name: The name of the script file. Defaults to a predefined name.
         :param flags: A dictionary of flags to pass to the Puppeteer script. Defaults to None.
+        :param browsers: The browsers to install on the droplet. Defaults to the browser from the configuration.
         """
         self.path = Paths()
         self.file_name = script_name or self.path.puppeter_run_sh_name
@@ -33,73 +39,264 @@ class PuppeteerRunScript:
         self.flags = flags
         self.script_path = join(script_dir or self.path.tmp_dir, self.file_name)
         self.config = config
+        self.browsers = browsers or [config.browser]
+        self.provisioned = False
+        self.apt_upgrade = DropletConfig().apt_upgrade
+        self.test_list: Optional[list] = None
+        self.telemetry: Optional[TelemetrySampler] = None
+        self.artifacts: Optional[ArtifactCache] = None
 
     @property
     def generate(self):
         """
         Generate the content of the bash script for setting up and running the Puppeteer test.
+        If the droplet is booted from a pre-baked image, the provisioning steps are skipped.
+        On a reused droplet, the provisioning steps are skipped if they were already done with the same fingerprint.
         :return: The generated bash script content as a string.
         """
         puppeteer_run_cmd = f"python3 run.py '{self.path.remote_puppeter_config_file}'{self._get_flags()}"
+        if self.test_list is not None:
+            puppeteer_run_cmd += f" --test_list '{self.path.remote_test_list}'"
         print(f"[green]|INFO| Puppeteer run cmd: [cyan]{puppeteer_run_cmd}[/]")
 
         return f"""\
 #!/bin/bash
-sudo apt-get update -y
-sudo apt-get upgrade -y
-sudo apt-get install -y curl git zip unzip
+: > '{self.path.remote_trace_markers}'
 
-# NodeJs installation
-curl -fsSL https://deb.nodesource.com/setup_20.x | sudo -E bash -
-sudo apt-get install -y nodejs
-
-{self._browser_installation()}
+# The archive is unpacked with python3 in the background, so it does not wait for the packages.
+# The full archive is absent when the files are synchronized by the delta upload
+(
+{self._mark('unpack', 'B')}
+if [ -f '{self.path.remote_puppeteer_archive}' ]; then
+mkdir -p '{dirname(self.path.remote_puppeteer_dir)}'
+rm -rf '{self.path.remote_puppeteer_dir}'
+python3 -m zipfile -e '{self.path.remote_puppeteer_archive}' '{self.path.remote_puppeteer_dir}' || exit 1
+rm -f '{self.path.remote_puppeteer_archive}'
+fi
+{self._mark('unpack', 'E')}
+) &
+unpack_pid=$!
 
-# Cloning puppeteer repositories
-cd '{self.home_dir}'
-git clone https://github.com/ONLYOFFICE/build_tools.git
+{self._mark('provisioning', 'B')}
+{'# Provisioning is covered by the droplet image' if self.provisioned else self._guarded_provisioning()}
+{self._mark('provisioning', 'E')}
 
+if ! wait $unpack_pid; then
+echo "|ERROR| Unpacking of the puppeteer archive failed" >&2
+exit 1
+fi
 
-mkdir '{dirname(self.path.remote_puppeteer_dir)}'
-rm -rf '{self.path.remote_puppeteer_dir}'
-unzip '{self.path.remote_puppeteer_archive}' -d '{self.path.remote_puppeteer_dir}'
+{self._test_list_file()}
 
 # Run Puppeteer test
 cd '{self.path.remote_puppeteer_engine}'
+{self._mark('install', 'B')}
 python3 ./install.py
-{puppeteer_run_cmd}
+{self._mark('install', 'E')}
+{self._run_tests(puppeteer_run_cmd)}\
+        """.strip()
+
+    @property
+    def provisioning(self) -> str:
+        """
+        Generate the provisioning part of the script: system packages, NodeJs, the browser and build_tools.
+        These steps do not depend on the tests and can be pre-baked into a droplet image.
+        The browser downloads and the build_tools clone run in the background while the packages are installed,
+        a browser is installed when both its download and the packages are done. If any step fails,
+        the other jobs are stopped and the script exits with an error.
+        If the artifacts are set, NodeJs, GoogleChrome and build_tools are installed from their uploaded copies.
+        :return: The provisioning commands as a string.
+        """
+        downloads, installations = self._browsers_installation()
+        node_job, node_packages = self._nodejs_installation()
+        return f"""\
+provisioning_failed() {{
+echo "|ERROR| Provisioning failed: $1" >&2
+kill $(jobs -p) 2>/dev/null
+exit 1
+}}
+
+# The downloads and the build_tools clone do not need the packages and run alongside them
+{downloads}
+{self._build_tools_clone()} &
+build_tools_pid=$!
+{node_job}
 
-# Archive results
-rm {self.path.remote_result_archive}
-cd {self.path.remote_puppeteer_dir}
-zip -r '{self.path.remote_result_archive}' {basename(self.path.remote_report_dir)} > /dev/null 2>&1\
+# System packages and NodeJs installation
+(
+set -e
+sudo apt-get update -y
+{'sudo apt-get upgrade -y' if self.apt_upgrade else '# apt-get upgrade is disabled by APT_UPGRADE in droplet_config.json'}
+sudo apt-get install -y curl git zip unzip
+{node_packages}
+) &
+packages_pid=$!
+
+wait $packages_pid || provisioning_failed 'system packages and NodeJs installation'
+{installations}
+{"wait $node_pid || provisioning_failed 'NodeJs installation'" if node_job else ''}
+wait $build_tools_pid || provisioning_failed 'build_tools clone'\
         """.strip()
 
+    @property
+    def provisioning_fingerprint(self) -> str:
+        """
+        The fingerprint of the provisioning steps. It changes whenever the provisioning commands change.
+        :return: A short sha256 hex digest of the normalized provisioning commands.
+        """
+        normalized = '\n'.join(line.strip() for line in self.provisioning.split('\n') if line.strip())
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+    def schedule(self, scheduler: TestScheduler, files: list) -> float:
+        """
+        Order the test files by their expected durations, the longest first.
+        The order is passed to run.py as the test list, so the threads take the longest tests first.
+
+        :param scheduler: The scheduler with the historical durations of the tests.
+        :param files: The test files relative to the puppeteer files directory.
+        :return: The predicted makespan in seconds for the number of threads from the flags.
+        """
+        self.test_list = scheduler.order(files)
+        return scheduler.makespan(files, (self.flags or {}).get('threads') or 1)
+
     def create(self):
         """
         Create the bash script file with the generated content.
         :return: The path to the created bash script file.
         """
-        with open(self.script_path, mode='w', newline='') as file:
-            file.write('\n'.join(line.strip() for line in self.generate.split('\n')))
-        return self.script_path
+        return self._write(self.script_path, self.generate)
+
+    def create_provisioning(self) -> str:
+        """
+        Create the bash script file that only provisions the droplet. Used to bake a droplet image.
+        :return: The path to the created bash script file.
+        """
+        return self._write(self.script_path, f"#!/bin/bash\nset -e\n{self._guarded_provisioning()}")
+
+    def _guarded_provisioning(self) -> str:
+        """
+        Wrap the provisioning steps into a check of the marker file, which records the fingerprint
+        of the provisioning done on the droplet.
+        :return: The provisioning commands executed only if the droplet was not provisioned yet.
+        """
+        marker = self.path.remote_provisioned_marker
+        return f"""\
+if [ "$(cat '{marker}' 2>/dev/null)" != '{self.provisioning_fingerprint}' ]; then
+{self.provisioning}
+echo '{self.provisioning_fingerprint}' > '{marker}'
+fi\
+        """.strip()
 
-    def _browser_installation(self):
+    def _run_tests(self, cmd: str) -> str:
         """
-        Determines the browser installation commands based on the configuration.
+        Wrap the test command into the telemetry sampling, if it is enabled, and the timing markers.
+        The markers are copied into the report directory and the exit status of the command is kept.
 
-        :return: A string representing the browser installation commands.
+        :param cmd: The command running the tests.
+        :return: The commands running the tests.
         """
-        if self.config.browser.lower() == 'firefox':
-            return """\
+        return f"""\
+{self.telemetry.start_cmd if self.telemetry else ''}
+{self._mark('tests', 'B')}
+{cmd}
+status=$?
+{self._mark('tests', 'E')}
+{self.telemetry.stop_cmd if self.telemetry else ''}
+mkdir -p '{self.path.remote_report_dir}'
+cp '{self.path.remote_trace_markers}' '{self.path.remote_report_dir}/'
+exit $status\
+        """.strip()
+
+    def _mark(self, name: str, phase: str) -> str:
+        """
+        :param name: The name of the remote stage.
+        :param phase: 'B' for the beginning of the stage, 'E' for its end.
+        :return: The command appending the timestamp of the stage to the marker file.
+        """
+        return f"echo \"{name} {phase} $(date +%s.%N)\" >> '{self.path.remote_trace_markers}'"
+
+    def _test_list_file(self) -> str:
+        """
+        :return: The commands to write the scheduled test list on the droplet, empty if the tests are not scheduled.
+        """
+        if self.test_list is None:
+            return ''
+
+        files = '\n'.join(self.test_list)
+        return f"""\
+# Test list ordered by the historical durations, the longest first
+cat > '{self.path.remote_test_list}' <<'TEST_LIST'
+{files}
+TEST_LIST\
+        """.strip()
+
+    @staticmethod
+    def _write(path: str, content: str) -> str:
+        with open(path, mode='w', newline='') as file:
+            file.write('\n'.join(line.strip() for line in content.split('\n')))
+        return path
+
+    def _nodejs_installation(self) -> tuple[str, str]:
+        """
+        :return: The commands unpacking the uploaded NodeJs tarball in the background, empty without the artifacts,
+         and the commands installing NodeJs from nodesource together with the system packages.
+        """
+        if self.artifacts:
+            tarball = self.artifacts.remote_path(self.artifacts.node_tarball)
+            return f"(sudo tar -xJf '{tarball}' -C /usr/local --strip-components=1) &\nnode_pid=$!", ''
+
+        return '', "curl -fsSL https://deb.nodesource.com/setup_20.x | sudo -E bash -\nsudo apt-get install -y nodejs"
+
+    def _build_tools_clone(self) -> str:
+        """
+        :return: The command cloning build_tools from GitHub or from the uploaded bundle.
+        """
+        build_tools, repo = join(self.home_dir, 'build_tools'), 'https://github.com/ONLYOFFICE/build_tools.git'
+        if self.artifacts:
+            bundle = self.artifacts.remote_path(self.artifacts.build_tools_bundle)
+            return (
+                f"(rm -rf '{build_tools}' && git clone -q '{bundle}' '{build_tools}' "
+                f"&& git -C '{build_tools}' remote set-url origin {repo})"
+            )
+        return f"(rm -rf '{build_tools}' && git clone {repo} '{build_tools}')"
+
+    def _browsers_installation(self) -> tuple[str, str]:
+        """
+        :return: The background download commands and the installation commands of all browsers
+         to install on the droplet.
+        """
+        steps = [self._browser_installation(browser) for browser in self.browsers]
+        return '\n\n'.join(download for download, _ in steps if download), '\n\n'.join(install for _, install in steps)
+
+    def _browser_installation(self, browser: str) -> tuple[str, str]:
+        """
+        Determines the browser installation commands.
+
+        :param browser: The browser to install.
+        :return: The commands starting the browser download in the background, empty if the browser
+         is installed from the package repository, and the commands installing the browser.
+        """
+        if browser.lower() == 'firefox':
+            return '', """\
             # FireFox installation
-            sudo apt-get install firefox -y\
+            sudo apt-get install firefox -y || provisioning_failed 'FireFox installation'\
             """
-        else:
-            return """\
+
+        if self.artifacts:
+            return '', f"""\
+            # GoogleChrome installation from the artifact cache
+            sudo apt-get install '{self.artifacts.remote_path(self.artifacts.chrome_deb)}' -y || provisioning_failed 'GoogleChrome installation'\
+            """
+
+        deb = join(self.home_dir, 'google-chrome-stable_current_amd64.deb')
+        return f"""\
+            wget -q -O '{deb}' https://dl.google.com/linux/direct/google-chrome-stable_current_amd64.deb &
+            chrome_download_pid=$!\
+            """, f"""\
             # GoogleChrome installation
-            wget https://dl.google.com/linux/direct/google-chrome-stable_current_amd64.deb
-            sudo apt-get install ./google-chrome-stable_current_amd64.deb -y\
+            wait $chrome_download_pid || provisioning_failed 'GoogleChrome download'
+            sudo apt-get install '{deb}' -y || provisioning_failed 'GoogleChrome installation'
+            rm -f '{deb}'\
             """
 
     def _get_flags(self):
@@ -1,4 +1,13 @@
 # -*- coding: utf-8 -*-
+import os
+import shutil
+import subprocess
+import tempfile
+from os import makedirs
+from os.path import isdir, basename
+from posixpath import join
+from typing import Optional
+
 from host_tools import Shell
 from rich import print
 
@@ -8,8 +17,13 @@ class PuppeterRepo:
     dep_test_repo = 'git@github.com:ONLYOFFICE/Dep.Tests.git'
     puppeter_files_repo = 'git@github.com:ONLYOFFICE-data/pp-files.git'
 
-    def __init__(self):
+    def __init__(self, file_types: Optional[list] = None):
+        """
+        :param file_types: File extensions of the pp-files to check out, e.g. ['docx', 'xlsx'].
+         If None, all files are checked out.
+        """
         self.path = Paths()
+        self.file_types = [file_type.strip().lstrip('.') for file_type in file_types or [] if file_type.strip()]
 
     def clone(self) -> None:
         self.clone_dep_test()
@@ -20,11 +34,82 @@ class PuppeterRepo:
         Clone the Dep.Tests repository
         """
         print(f"[green]|INFO| Cloning [cyan]Dep.Tests[/] repository to {self.path.local_dep_test}")
-        Shell.call(f"git clone {self.dep_test_repo} {self.path.local_dep_test} --depth 1")
+        self._checkout(self.update_mirror(self.dep_test_repo), self.dep_test_repo, self.path.local_dep_test)
 
     def clone_test_files(self) -> None:
         """
-        Clone the pp-files repository
+        Clone the pp-files repository.
+        If file types are specified, only the files of these types are checked out.
         """
         print(f"[green]|INFO| Cloning [cyan]Puppeter Files[/] repository to {self.path.local_puppeteer_files_dir}")
-        Shell.call(f"git clone {self.puppeter_files_repo} {self.path.local_puppeteer_files_dir}")
+        sparse_patterns = [f"*.{file_type}" for file_type in self.file_types]
+        self._checkout(
+            self.update_mirror(self.puppeter_files_repo),
+            self.puppeter_files_repo,
+            self.path.local_puppeteer_files_dir,
+            sparse_patterns=sparse_patterns
+        )
+
+    def update_mirror(self, repo: str) -> str:
+        """
+        Create the bare mirror of the repository in the local cache or fetch the new commits into the existing one.
+        The mirror is cloned into a temporary directory and moved into place only if the clone succeeded,
+        so an interrupted clone does not leave a broken mirror. A mirror that fails to update is cloned again.
+
+        :param repo: The URL of the repository.
+        :return: The path to the mirror.
+        :raises subprocess.CalledProcessError: If the mirror does not exist and cannot be cloned.
+        """
+        mirror = join(self.path.mirrors_dir, repo.rsplit('/', 1)[-1])
+
+        if isdir(mirror):
+            print(f"[green]|INFO| Fetching updates to the mirror {mirror}")
+            if subprocess.run(['git', '--git-dir', mirror, 'remote', 'update', '--prune']).returncode == 0:
+                return mirror
+            print(f"[red]|WARNING| Failed to update the mirror {mirror}, cloning it again")
+
+        makedirs(self.path.mirrors_dir, exist_ok=True)
+        tmp_mirror = tempfile.mkdtemp(prefix=f"{basename(mirror)}.", suffix='.tmp', dir=self.path.mirrors_dir)
+        try:
+            subprocess.run(['git', 'clone', '--mirror', repo, tmp_mirror], check=True)
+            shutil.rmtree(mirror, ignore_errors=True)
+            os.replace(tmp_mirror, mirror)
+        except subprocess.CalledProcessError:
+            if not isdir(mirror):
+                raise
+            print(f"[red]|WARNING| Failed to clone {repo}, the existing mirror {mirror} is used")
+        except OSError:
+            if not isdir(mirror):
+                raise
+            # Another run has moved its mirror into place first
+        finally:
+            shutil.rmtree(tmp_mirror, ignore_errors=True)
+
+        return mirror
+
+    @staticmethod
+    def get_commit(path: str) -> Optional[str]:
+        """
+        :param path: The path of the working tree.
+        :return: The SHA of the checked out commit, or None if the path is not a git working tree.
+        """
+        result = subprocess.run(['git', '-C', path, 'rev-parse', 'HEAD'], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    @staticmethod
+    def _checkout(mirror: str, repo: str, path: str, sparse_patterns: Optional[list] = None) -> None:
+        """
+        Check out the working tree from the mirror. The objects are shared with the mirror instead of being copied.
+        :param mirror: The path to the mirror.
+        :param repo: The URL of the original repository set as the origin of the working tree.
+        :param path: The path of the working tree.
+        :param sparse_patterns: The patterns of the sparse checkout. If empty, all files are checked out.
+        """
+        Shell.call(f"git clone --shared --no-checkout '{mirror}' '{path}'")
+        Shell.call(f"git -C '{path}' remote set-url origin '{repo}'")
+
+        if sparse_patterns:
+            patterns = ' '.join(f"'{pattern}'" for pattern in sparse_patterns)
+            Shell.call(f"git -C '{path}' sparse-checkout set --no-cone {patterns}")
+
+        Shell.call(f"git -C '{path}' read-tree -mu HEAD")
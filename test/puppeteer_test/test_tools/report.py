@@ -1,42 +1,415 @@
 # -*- coding: utf-8 -*-
-from os.path import join, isfile, basename, exists
+import filecmp
+import os
+import re
+import shutil
+import tarfile
+from collections import Counter
+from os.path import join, isfile, exists, isdir
+from posixpath import dirname as remote_dirname, basename as remote_basename
+from typing import Optional
+from urllib.parse import urlparse, unquote
 from rich import print
 
 from host_tools import File, Dir
 
-from ssh_wrapper import Sftp
-
 from .paths import Paths
-from bs4 import BeautifulSoup
+from .ssh_session import SshSession
+from .html_path_rewriter import HtmlPathRewriter
+from .report_parser import ReportParser
 
 
 class Report:
+    no_text_tags = ('table', 'script', 'style', 'title', 'head')
 
-    def __init__(self, version: str, browser: str):
+    def __init__(self, version: str, browser: str, shard: Optional[int] = None, report_dir: Optional[str] = None):
         self.__paths = Paths()
-        self.dir = join(self.__paths.local_report_dir, version, browser.lower())
-        self.path = join(self.dir, 'out', 'report.html')
+        self.shard = shard
         self.tmp_dir = self.__paths.tmp_dir
-        self.archive_path = join(self.tmp_dir, basename(self.__paths.remote_result_archive))
+
+        if report_dir is not None:
+            self.dir = report_dir
+        elif shard is None:
+            self.dir = join(self.__paths.local_report_dir, version, browser.lower())
+        else:
+            self.dir = join(self.tmp_dir, 'shards', str(shard), 'report')
+
+        self.path = join(self.dir, 'out', 'report.html')
         Dir.create(self.dir, stdout=False)
 
 
-    def download(self, sftp: Sftp) -> None:
-        sftp.download_file(self.__paths.remote_result_archive, self.archive_path, stdout=True)
+    def download(self, session: SshSession) -> None:
+        """
+        Download the report directory from the droplet as a gzip-compressed tar stream over the SSH session.
+        The entries are extracted as they arrive, without an intermediate archive on either side.
+
+        :param session: The SSH session to the droplet.
+        """
+        remote_dir = self.__paths.remote_report_dir
         Dir.delete(self.dir, clear_dir=True, stdout=False) if exists(self.dir) else None
-        File.unpacking_zip(self.archive_path, self.dir, delete_archive=True)
+        Dir.create(self.dir, stdout=False)
+
+        channel = session.connection.get_transport().open_session()
+        channel.exec_command(f"tar -C '{remote_dirname(remote_dir)}' -czf - '{remote_basename(remote_dir)}'")
+
+        files, size = 0, 0
+        try:
+            with channel.makefile('rb') as stream, tarfile.open(fileobj=stream, mode='r|gz') as tar:
+                for member in tar:
+                    tar.extract(member, self.dir, **self._extract_options())
+                    if member.isfile():
+                        files, size = files + 1, size + member.size
+        finally:
+            exit_status = channel.recv_exit_status()
+            channel.close()
+
+        if exit_status != 0:
+            print(f"[red]|WARNING| Report streaming finished with exit status {exit_status}")
+
+        print(f"[green]|INFO| Downloaded [cyan]{files}[/] report files ({size / 1024 ** 2:.1f} MB) to {self.dir}")
+
+    @staticmethod
+    def _extract_options() -> dict:
+        """
+        :return: The 'data' extraction filter rejecting unsafe paths, if it is supported by the Python version.
+        """
+        return {'filter': 'data'} if hasattr(tarfile, 'data_filter') else {}
+
+    def merge(self, reports: list["Report"]) -> None:
+        """
+        Merge the reports downloaded from several droplets into this report directory.
+        A file of a later shard that clashes with a different file of an earlier shard is renamed
+        to `<name>_shard_<n>` and the links of its report.html are updated.
+        The tables of the report.html files are combined into one.
+
+        :param reports: The reports to merge.
+        """
+        Dir.delete(self.dir, clear_dir=True, stdout=False) if exists(self.dir) else None
+        html_reports = []
+
+        for report in reports:
+            if not isdir(report.dir):
+                print(f"[red]|WARNING| Report of shard {report.shard} not exists {report.dir}")
+                continue
+
+            telemetry = join(report.dir, 'out', 'telemetry.csv')
+            if isfile(telemetry):
+                os.replace(telemetry, join(report.dir, 'out', f'telemetry_shard_{report.shard}.csv'))
+
+            renamed = self._copy_shard_files(report)
+            if isfile(report.path):
+                html_reports.append(report._rename_links(File.read(report.path), renamed))
+
+        if html_reports:
+            File.write(self.path, self._merge_html(html_reports), encoding='utf-8')
+
+        print(f"[green]|INFO| Merged [cyan]{len(html_reports)}[/] reports into {self.dir}")
+
+    def _copy_shard_files(self, report: "Report") -> dict[str, str]:
+        """
+        Copy the files of the shard report, except report.html, into this report directory.
+        :param report: The report of the shard.
+        :return: The new paths of the renamed files by their old paths, relative to the report directory.
+        """
+        renamed = {}
+        for root, _, files in os.walk(report.dir):
+            for name in files:
+                src = join(root, name)
+                if src == report.path:
+                    continue
+
+                rel_path = os.path.relpath(src, report.dir)
+                dst = join(self.dir, rel_path)
+                if isfile(dst) and not filecmp.cmp(src, dst, shallow=False):
+                    stem, ext = os.path.splitext(rel_path)
+                    renamed[rel_path] = f"{stem}_shard_{report.shard}{ext}"
+                    dst = join(self.dir, renamed[rel_path])
+
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+        return renamed
+
+    def _rename_links(self, html: str, renamed: dict[str, str]) -> str:
+        """
+        :param html: The content of report.html.
+        :param renamed: The new paths of the renamed files by their old paths, relative to the report directory.
+        :return: The content with the relative links to the renamed files pointing to their new paths.
+        """
+        from bs4 import BeautifulSoup
+
+        if not renamed:
+            return html
+
+        html_dir = os.path.dirname(self.path)
+        links = {
+            os.path.relpath(join(self.dir, old), html_dir).replace(os.sep, '/'):
+                os.path.relpath(join(self.dir, new), html_dir).replace(os.sep, '/')
+            for old, new in renamed.items()
+        }
+
+        soup = BeautifulSoup(html, 'html.parser')
+        for tag in soup.find_all(['a', 'img', 'link', 'script', 'source', 'video']):
+            for attr in ('href', 'src'):
+                link = tag.get(attr)
+                if not link or urlparse(link).scheme:
+                    continue
+                path = os.path.normpath(unquote(urlparse(link).path)).replace(os.sep, '/')
+                if path in links:
+                    tag[attr] = links[path]
+        return str(soup)
+
+    def merge_rerun(self, rerun: "Report") -> int:
+        """
+        Merge the report of a rerun of some tests into this report directory in place.
+        The rows of the rerun tests replace their rows in the tables of report.html, the other rows are kept.
+        The files of the rerun are copied over the files of the report.
+
+        :param rerun: The report of the rerun.
+        :return: The number of replaced rows.
+        """
+        if not isfile(rerun.path) or not isfile(self.path):
+            print(f"[red]|WARNING| Rerun report {rerun.path} is not merged into {self.path}: report not exists")
+            return 0
+
+        html = File.read(self.path)
+        rerun_html = File.read(rerun.path)
+        os.remove(rerun.path)
+        telemetry = join(rerun.dir, 'out', 'telemetry.csv')
+        if isfile(telemetry):
+            os.replace(telemetry, join(rerun.dir, 'out', 'telemetry_rerun.csv'))
+        shutil.copytree(rerun.dir, self.dir, dirs_exist_ok=True)
+
+        merged, replaced = self._replace_html_rows(html, rerun_html)
+        File.write(self.path, merged, encoding='utf-8')
+        print(f"[green]|INFO| Replaced [cyan]{replaced}[/] rows of rerun tests in {self.path}")
+        return replaced
+
+    @staticmethod
+    def _replace_html_rows(html: str, rerun_html: str) -> tuple[str, int]:
+        """
+        Replace the data rows of the html report with the rows of the same tests from the rerun report.
+        The rows are matched by the text of the test column, which is recognized by its header.
+
+        :param html: The content of the html report.
+        :param rerun_html: The content of the html report of the rerun.
+        :return: The content of the merged html report and the number of replaced rows.
+        """
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        rerun_rows = {}
+        for table in BeautifulSoup(rerun_html, 'html.parser').find_all('table'):
+            rerun_rows.update(Report._test_rows(table))
+
+        replaced = 0
+        for table in soup.find_all('table'):
+            for test, row in Report._test_rows(table).items():
+                if test in rerun_rows:
+                    row.replace_with(rerun_rows.pop(test))
+                    replaced += 1
+
+        return str(soup), replaced
+
+    def test_rows(self) -> dict[str, str]:
+        """
+        :return: The html of the report.html table rows by the names of their tests.
+        """
+        from bs4 import BeautifulSoup
 
-    def convert_paths_to_relative(self):
         if not isfile(self.path):
-            return print(f"[red]|WARNING| Report not exists {self.path}")
+            return {}
 
-        soup = BeautifulSoup(File.read(self.path), 'html.parser')
+        rows = {}
+        for table in BeautifulSoup(File.read(self.path), 'html.parser').find_all('table'):
+            rows.update({test: str(row) for test, row in self._test_rows(table).items()})
+        return rows
+
+    def test_header(self) -> Optional[str]:
+        """
+        :return: The html of the header row of the first report.html table that has a test column.
+        """
+        from bs4 import BeautifulSoup
+
+        if not isfile(self.path):
+            return None
+
+        for table in BeautifulSoup(File.read(self.path), 'html.parser').find_all('table'):
+            if self._test_column(table) is not None:
+                return str(next(row for row in table.find_all('tr') if row.find('th')))
+        return None
 
-        for a in soup.find_all('a', href=True):
-            a['href'] = a['href'].replace(self.__paths.remote_report_dir, '.')
+    def create(self, header: str) -> None:
+        """
+        Create report.html with an empty table of tests. Used when no test was run on the droplet.
+        :param header: The html of the header row of the table.
+        """
+        Dir.create(join(self.dir, 'out'), stdout=False)
+        File.write(
+            self.path,
+            f"<html><body><table><thead>{header}</thead><tbody></tbody></table></body></html>",
+            encoding='utf-8'
+        )
 
-        for td in soup.find_all('td'):
-            if td.string and 'self.__paths.remote_report_dir' in td.string:
-                td.string = td.string.replace(self.__paths.remote_report_dir, '.')
+    def add_rows(self, rows: list[str]) -> int:
+        """
+        Append the rows to the first table of report.html that has a test column.
+        The links and images of the rows to the files missing from the report directory,
+        such as the screenshots of a previous report, are replaced with their text.
 
+        :param rows: The html of the table rows.
+        :return: The number of added rows.
+        """
+        from bs4 import BeautifulSoup
+
+        if not rows:
+            return 0
+        if not isfile(self.path):
+            print(f"[red]|WARNING| Report not exists {self.path}, {len(rows)} rows are not added")
+            return 0
+
+        soup = BeautifulSoup(File.read(self.path), 'html.parser')
+        table = next((table for table in soup.find_all('table') if self._test_column(table) is not None), None)
+        if table is None:
+            print(f"[red]|WARNING| There is no table of tests in {self.path}, {len(rows)} rows are not added")
+            return 0
+
+        target = table.tbody or table
+        for row in rows:
+            row = BeautifulSoup(row, 'html.parser')
+            for tag in row.find_all(['a', 'img']):
+                link = tag.get('href' if tag.name == 'a' else 'src')
+                if link and not urlparse(link).scheme and not link.startswith('#') and not self._exists(link):
+                    tag.unwrap() if tag.name == 'a' else tag.replace_with(tag.get('alt') or '')
+            target.append(row)
         File.write(self.path, str(soup), encoding='utf-8')
+        return len(rows)
+
+    def _exists(self, link: str) -> bool:
+        """
+        :param link: The relative link of report.html.
+        :return: True if the linked file exists in the report directory.
+        """
+        path = unquote(urlparse(link).path)
+        return bool(path) and exists(join(os.path.dirname(self.path), path))
+
+    @staticmethod
+    def _test_rows(table) -> dict:
+        """
+        :param table: The parsed html table.
+        :return: The data rows of the table by the text of their test column, which is recognized by its header.
+        """
+        rows, column = {}, None
+        for row in table.find_all('tr'):
+            headers = Report._headers(row)
+            if headers:
+                column = Report._find_test_column(headers)
+                continue
+            cells = row.find_all('td')
+            if column is not None and len(cells) > column:
+                rows[' '.join(cells[column].get_text().split())] = row
+        return rows
+
+    @staticmethod
+    def _test_column(table) -> Optional[int]:
+        """
+        :param table: The parsed html table.
+        :return: The index of the test column of the table, None if the table has no test column.
+        """
+        header_row = next((row for row in table.find_all('tr') if row.find('th')), None)
+        return Report._find_test_column(Report._headers(header_row)) if header_row else None
+
+    @staticmethod
+    def _headers(row) -> list[str]:
+        return [' '.join(th.get_text().split()).lower() for th in row.find_all('th')]
+
+    @staticmethod
+    def _find_test_column(headers: list[str]) -> Optional[int]:
+        return next(
+            (num for num, header in enumerate(headers) if any(name in header for name in ReportParser.test_headers)),
+            None
+        )
+
+    @staticmethod
+    def _merge_html(html_reports: list[str]) -> str:
+        """
+        Combine the html reports into one by appending the data rows of each table
+        to the matching table of the first report.
+        The counts in the text outside the tables, which differ between the reports, are summed,
+        and a summary of the merged rows is added before the first table.
+
+        :param html_reports: The contents of the html reports.
+        :return: The content of the merged html report.
+        """
+        from bs4 import BeautifulSoup
+
+        soups = [BeautifulSoup(html, 'html.parser') for html in html_reports]
+        soup, tables = soups[0], soups[0].find_all('table')
+
+        for other in soups[1:]:
+            for num, table in enumerate(other.find_all('table')):
+                if num >= len(tables):
+                    break
+                target = tables[num].tbody or tables[num]
+                for row in table.find_all('tr'):
+                    if not row.find('th'):
+                        target.append(row)
+
+        Report._sum_counts(soups)
+        if tables:
+            tables[0].insert_before(Report._summary(soup, len(soups)))
+        return str(soup)
+
+    @staticmethod
+    def _sum_counts(soups: list) -> None:
+        """
+        Replace the integers of the texts outside the tables of the first report with their sums over all reports.
+        Only the texts that differ between the reports just in the integers are changed.
+
+        :param soups: The parsed html reports.
+        """
+        texts = [
+            [text for text in soup.find_all(string=True) if text.strip() and not text.find_parent(Report.no_text_tags)]
+            for soup in soups
+        ]
+        if any(len(report_texts) != len(texts[0]) for report_texts in texts):
+            return
+
+        for versions in zip(*texts):
+            if len(set(versions)) == 1 or any(re.search(r'\d[.,:]\d', text) for text in versions):
+                continue
+            if len({re.sub(r'\d+', '#', text) for text in versions}) != 1:
+                continue
+
+            sums = [sum(map(int, numbers)) for numbers in zip(*(re.findall(r'\d+', text) for text in versions))]
+            parts = re.split(r'\d+', versions[0])
+            versions[0].replace_with(''.join(part + str(num) for part, num in zip(parts, sums)) + parts[-1])
+
+    @staticmethod
+    def _summary(soup, reports: int):
+        """
+        :param soup: The parsed merged html report.
+        :param reports: The number of merged reports.
+        :return: The paragraph with the number of tests in the merged report by their status.
+        """
+        parser = ReportParser()
+        parser.feed(str(soup))
+        parser.close()
+        statuses = Counter(result.status for result in parser.results)
+
+        summary = soup.new_tag('p', attrs={'class': 'merged-summary'})
+        summary.string = (
+            f"Merged reports: {reports}. Tests: {len(parser.results)}"
+            + ''.join(f", {status}: {count}" for status, count in sorted(statuses.items()))
+        )
+        return summary
+
+    def convert_paths_to_relative(self):
+        """
+        Replace the absolute droplet paths of the report directory with relative ones in report.html,
+        so the links work in the local copy. The file is rewritten as a stream, without parsing the document.
+        """
+        if not isfile(self.path):
+            return print(f"[red]|WARNING| Report not exists {self.path}")
+
+        replaced = HtmlPathRewriter(self.__paths.remote_report_dir, '.').rewrite_file(self.path)
+        print(f"[green]|INFO| Converted [cyan]{replaced}[/] report paths to relative in {self.path}")
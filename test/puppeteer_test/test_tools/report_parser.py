@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Optional
+
+
+@dataclass
+class TestResult:
+    test: str
+    status: str
+    duration: Optional[float]
+
+
+class ReportParser(HTMLParser):
+    """
+    A class to extract per-test statuses and durations from the tables of report.html.
+
+    The columns are recognized by their header names: the test column by 'file', 'test' or 'name',
+    the status column by 'status' or 'result' and the duration column by 'time' or 'duration'.
+    The file is fed to the parser in chunks, so only the rows are kept in memory.
+    """
+    test_headers = ('file', 'test', 'name')
+    status_headers = ('status', 'result')
+    duration_headers = ('duration', 'time')
+    chunk_size = 1024 * 1024
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.results: list[TestResult] = []
+        self._columns: Optional[dict] = None
+        self._row: Optional[list] = None
+        self._cell: Optional[list] = None
+        self._header_row = False
+
+    def parse(self, path: str) -> list[TestResult]:
+        """
+        :param path: The path to report.html.
+        :return: The results of the tests found in the report.
+        """
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            while chunk := f.read(self.chunk_size):
+                self.feed(chunk)
+        self.close()
+        return self.results
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == 'table':
+            self._columns = None
+        elif tag == 'tr':
+            self._row, self._header_row = [], False
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+            self._header_row = self._header_row or tag == 'th'
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(' '.join(''.join(self._cell).split()))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._handle_row(self._row)
+            self._row = None
+
+    def handle_data(self, data: str) -> None:
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _handle_row(self, row: list) -> None:
+        if self._header_row:
+            self._columns = self._find_columns(row)
+            return
+
+        if not self._columns or len(row) <= max(self._columns.values()):
+            return
+
+        test = row[self._columns['test']]
+        if test:
+            self.results.append(TestResult(
+                test=test,
+                status=row[self._columns['status']].lower() if 'status' in self._columns else 'unknown',
+                duration=self.parse_duration(row[self._columns['duration']]) if 'duration' in self._columns else None
+            ))
+
+    def _find_columns(self, headers: list) -> Optional[dict]:
+        columns = {}
+        for num, header in enumerate(header.lower() for header in headers):
+            for column, names in (
+                    ('test', self.test_headers),
+                    ('status', self.status_headers),
+                    ('duration', self.duration_headers)
+            ):
+                if column not in columns and any(name in header for name in names):
+                    columns[column] = num
+                    break
+        return columns if 'test' in columns else None
+
+    @staticmethod
+    def parse_duration(value: str) -> Optional[float]:
+        """
+        Convert the duration to seconds. Supported formats: '1:02:03', '02:03', '1.5s', '1500ms', '1m 2s' and '12.5'.
+        :param value: The duration text.
+        :return: The duration in seconds, or None if the text is not a duration.
+        """
+        value = value.strip().lower()
+        if re.fullmatch(r'\d+(:\d{1,2}){1,2}(\.\d+)?', value):
+            seconds = 0.0
+            for part in value.split(':'):
+                seconds = seconds * 60 + float(part)
+            return seconds
+
+        units = {'h': 3600, 'm': 60, 'min': 60, 's': 1, 'sec': 1, 'ms': 0.001}
+        parts = re.findall(r'(\d+(?:\.\d+)?)\s*(ms|min|sec|h|m|s)?', value)
+        if not parts or re.sub(r'[\d.\s]|ms|min|sec|h|m|s', '', value):
+            return None
+        return sum(float(number) * units.get(unit or 's') for number, unit in parts)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import os
+import shlex
+import threading
+from contextlib import contextmanager
+from os import makedirs
+from os.path import join, isfile, dirname, getsize, exists
+from posixpath import join as remote_join
+from typing import Optional
+
+from host_tools import Dir
+from rich import print
+
+from .paths import Paths
+from .ssh_session import SshSession
+
+
+class ReportSync:
+    """
+    A class to mirror the remote report directory into the local one incrementally.
+
+    The remote files are listed with their sizes and modification times and compared with the state
+    saved by the previous pass. A file that only grew and whose already downloaded part is unchanged
+    gets just the new bytes appended, other changed files are downloaded again. Unchanged files are skipped.
+    The state is kept outside the mirrored directory, so it is not published with the report.
+    """
+    state_file_name = '.sync_state.json'
+    chunk_size = 1024 * 1024
+
+    def __init__(self, session: SshSession, remote_dir: str, local_dir: str, state_dir: str = None):
+        """
+        :param session: The SSH session to the droplet.
+        :param remote_dir: The remote directory to mirror.
+        :param local_dir: The local directory to mirror into.
+        :param state_dir: The directory of the sync state file. Defaults to Paths.tmp_dir.
+        """
+        self.session = session
+        self.remote_dir = remote_dir
+        self.local_dir = local_dir
+        self.state_path = join(state_dir or Paths().tmp_dir, self.state_file_name)
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """
+        Remove the local directory together with the sync state, so the next pass downloads everything.
+        """
+        Dir.delete(self.local_dir, clear_dir=True, stdout=False) if exists(self.local_dir) else None
+        Dir.create(self.local_dir, stdout=False)
+        os.remove(self.state_path) if isfile(self.state_path) else None
+
+    def sync(self) -> tuple[int, int]:
+        """
+        Mirror the new and changed remote files into the local directory.
+        :return: The number of updated files and the number of transferred bytes.
+        """
+        with self._lock:
+            state = self._load_state()
+            files, transferred = 0, 0
+
+            for rel, size, mtime in self._list_remote_files():
+                previous = state.get(rel)
+                if previous and previous['size'] == size and previous['mtime'] == mtime:
+                    continue
+
+                local_path = join(self.local_dir, rel)
+                offset = self._get_append_offset(rel, local_path, previous, size)
+                transferred += self._download(remote_join(self.remote_dir, rel), local_path, offset)
+                state[rel] = {'size': size, 'mtime': mtime, 'md5': self._local_md5(local_path)}
+                files += 1
+
+            self._save_state(state)
+            return files, transferred
+
+    @contextmanager
+    def live(self, interval: int):
+        """
+        Run the sync passes in a background thread every `interval` seconds while the context is active.
+        Connection errors in a pass are reported and the next pass is tried as usual.
+
+        :param interval: The interval between the passes in seconds.
+        """
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                try:
+                    files, transferred = self.session.call(self.sync)
+                    if files:
+                        print(f"[cyan]|INFO| Live report sync: {files} files, {transferred / 1024:.1f} KB")
+                except Exception as e:
+                    print(f"[red]|WARNING| Live report sync failed: {e}")
+
+        thread = threading.Thread(target=loop, name='report-sync', daemon=True)
+        thread.start()
+        try:
+            yield self
+        finally:
+            stop.set()
+            thread.join()
+
+    def _list_remote_files(self) -> list[tuple[str, int, float]]:
+        """
+        :return: The relative path, size and modification time of each remote file.
+        """
+        output = self.session.exec_command(
+            f"find {shlex.quote(self.remote_dir)} -type f -printf '%P\\t%s\\t%T@\\n' 2>/dev/null",
+            stdout=False,
+            stderr=False
+        ).stdout
+
+        files = []
+        for line in (output or '').splitlines():
+            parts = line.rsplit('\t', 2)
+            if len(parts) == 3 and parts[0] != self.state_file_name:
+                files.append((parts[0], int(parts[1]), float(parts[2])))
+        return files
+
+    def _get_append_offset(self, rel: str, local_path: str, previous: Optional[dict], size: int) -> int:
+        """
+        Check whether the remote file only grew since the previous pass.
+        The md5 of the remote file prefix is compared with the md5 of the local copy.
+
+        :return: The offset to download the file from, 0 if the whole file has to be downloaded.
+        """
+        if not previous or not isfile(local_path) or size <= previous['size']:
+            return 0
+
+        local_size = getsize(local_path)
+        if local_size != previous['size']:
+            return 0
+
+        remote_path = shlex.quote(remote_join(self.remote_dir, rel))
+        output = self.session.exec_command(
+            f"head -c {local_size} {remote_path} | md5sum", stdout=False, stderr=False
+        ).stdout
+        return local_size if output and output.split()[0] == previous['md5'] else 0
+
+    def _download(self, remote_path: str, local_path: str, offset: int = 0) -> int:
+        """
+        Download the remote file starting from the offset.
+        :return: The number of transferred bytes.
+        """
+        makedirs(dirname(local_path), exist_ok=True)
+        transferred = 0
+
+        with (
+            self.session.sftp_client.open(remote_path, 'rb') as remote,
+            open(local_path, 'r+b' if offset else 'wb') as local
+        ):
+            remote.seek(offset)
+            local.seek(offset)
+            local.truncate()
+            while chunk := remote.read(self.chunk_size):
+                local.write(chunk)
+                transferred += len(chunk)
+
+        return transferred
+
+    @staticmethod
+    def _local_md5(path: str) -> str:
+        with open(path, 'rb') as f:
+            return hashlib.file_digest(f, 'md5').hexdigest()
+
+    def _load_state(self) -> dict:
+        if not isfile(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, state: dict) -> None:
+        makedirs(dirname(self.state_path), exist_ok=True)
+        with open(self.state_path, 'w') as f:
+            json.dump(state, f)
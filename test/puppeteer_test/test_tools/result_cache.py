@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from os import makedirs
+from os.path import dirname
+from typing import Optional
+
+from .paths import Paths
+
+
+@dataclass
+class CachedResult:
+    test: str
+    status: str
+    duration: Optional[float]
+    row: Optional[str]
+    header: Optional[str] = None
+
+
+class ResultCache:
+    """
+    A content-addressed cache of the passed test results in a local SQLite database.
+
+    A result is stored under the digest of everything that affects it: the puppeteer scripts, the input file
+    from pp-files, the DocumentServer version, the browser and the test options. While none of them changes,
+    the test is not run again and its cached result is put into the report.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS results (
+            key TEXT PRIMARY KEY,
+            created REAL NOT NULL,
+            test TEXT NOT NULL,
+            status TEXT,
+            duration REAL,
+            row TEXT,
+            header TEXT
+        );
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        :param db_path: The path to the SQLite database. Defaults to Paths.result_cache_file.
+        """
+        self.db_path = db_path or Paths().result_cache_file
+
+    @staticmethod
+    def key(script_digest: str, input_digest: str, ds_version: str, browser: str, options: dict) -> str:
+        """
+        :param script_digest: The digest of the puppeteer scripts.
+        :param input_digest: The sha256 hex digest of the input file of the test.
+        :param ds_version: The DocumentServer version.
+        :param browser: The browser the test is run in.
+        :param options: The test options that affect the result.
+        :return: The sha256 hex digest identifying the result.
+        """
+        content = json.dumps([script_digest, input_digest, ds_version, browser.lower(), options], sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def script_digest(manifest: dict, files_dir: str = 'files') -> str:
+        """
+        :param manifest: The content digests of the puppeteer files by their paths relative to the puppeteer directory.
+        :param files_dir: The directory of the input files relative to the puppeteer directory.
+        :return: The digest of the files outside the input files directory.
+        """
+        sha256 = hashlib.sha256()
+        for path, digest in sorted(manifest.items()):
+            if not path.startswith(f"{files_dir}/"):
+                sha256.update(f"{path}\0{digest}\n".encode('utf-8'))
+        return sha256.hexdigest()
+
+    def get(self, keys: dict[str, str]) -> dict[str, CachedResult]:
+        """
+        :param keys: The result keys by the test files.
+        :return: The cached results by the test files, only for the keys found in the cache.
+        """
+        if not keys:
+            return {}
+
+        by_key = {key: file for file, key in keys.items()}
+        found = {}
+        with closing(self._connect()) as db:
+            for chunk in (list(by_key)[num:num + 500] for num in range(0, len(by_key), 500)):
+                rows = db.execute(
+                    f"SELECT key, test, status, duration, row, header FROM results "
+                    f"WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, test, status, duration, row, header in rows:
+                    found[by_key[key]] = CachedResult(test, status, duration, row, header)
+        return found
+
+    def add(self, results: dict[str, CachedResult]) -> int:
+        """
+        Store the results, replacing the results stored under the same keys.
+        :param results: The results by their keys.
+        :return: The number of stored results.
+        """
+        with closing(self._connect()) as db, db:
+            db.executemany(
+                "INSERT OR REPLACE INTO results (key, created, test, status, duration, row, header) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (key, time.time(), result.test, result.status, result.duration, result.row, result.header)
+                    for key, result in results.items()
+                )
+            )
+        return len(results)
+
+    def _connect(self) -> sqlite3.Connection:
+        makedirs(dirname(self.db_path), exist_ok=True)
+        db = sqlite3.connect(self.db_path)
+        db.executescript(self.schema)
+        return db
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+import sqlite3
+import time
+from contextlib import closing
+from os import makedirs
+from os.path import dirname
+from typing import Optional
+
+from .paths import Paths
+from .report_parser import TestResult
+
+
+class RunHistory:
+    """
+    A class to store the results of the test runs in a local SQLite database.
+
+    Each run is indexed by the DocumentServer version, browser, droplet size and commit of the tests,
+    and keeps the status and duration of every test parsed from its report.
+    """
+    schema = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created REAL NOT NULL,
+            ds_version TEXT,
+            browser TEXT,
+            droplet_size TEXT,
+            commit_sha TEXT
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            test TEXT NOT NULL,
+            status TEXT,
+            duration REAL
+        );
+        CREATE INDEX IF NOT EXISTS results_test ON results(test);
+        CREATE INDEX IF NOT EXISTS results_run ON results(run_id);
+        CREATE INDEX IF NOT EXISTS runs_browser_version ON runs(browser, ds_version);
+    """
+
+    def __init__(self, db_path: str = None):
+        """
+        :param db_path: The path to the SQLite database. Defaults to Paths.history_file.
+        """
+        self.db_path = db_path or Paths().history_file
+
+    def add_run(
+            self,
+            results: list[TestResult],
+            ds_version: str,
+            browser: str,
+            droplet_size: str = None,
+            commit: str = None
+    ) -> int:
+        """
+        Record the results of a run.
+        :param results: The results of the tests.
+        :param ds_version: The DocumentServer version.
+        :param browser: The browser the tests were run in.
+        :param droplet_size: The size slug of the droplet.
+        :param commit: The commit of the tests.
+        :return: The ID of the run.
+        """
+        with closing(self._connect()) as db, db:
+            run_id = db.execute(
+                "INSERT INTO runs (created, ds_version, browser, droplet_size, commit_sha) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), ds_version, browser, droplet_size, commit)
+            ).lastrowid
+            db.executemany(
+                "INSERT INTO results (run_id, test, status, duration) VALUES (?, ?, ?, ?)",
+                ((run_id, result.test, result.status, result.duration) for result in results)
+            )
+        return run_id
+
+    def durations(self, browser: str = None, last_runs: int = 5) -> dict[str, float]:
+        """
+        :param browser: The browser of the runs. If None, the runs in all browsers are used.
+        :param last_runs: The number of the latest runs of each test to average.
+        :return: The average duration in seconds of each test.
+        """
+        query = """
+            SELECT test, AVG(duration) FROM (
+                SELECT r.test, r.duration,
+                       ROW_NUMBER() OVER (PARTITION BY r.test ORDER BY r.run_id DESC) AS num
+                FROM results r JOIN runs ON runs.id = r.run_id
+                WHERE r.duration IS NOT NULL AND (:browser IS NULL OR runs.browser = :browser)
+            )
+            WHERE num <= :last_runs
+            GROUP BY test
+        """
+        with closing(self._connect()) as db:
+            return dict(db.execute(query, {'browser': browser, 'last_runs': last_runs}).fetchall())
+
+    def slowest(self, limit: int = 20, browser: str = None, ds_version: str = None) -> list[tuple]:
+        """
+        :param limit: The number of tests to return.
+        :param browser: The browser of the runs. If None, the runs in all browsers are used.
+        :param ds_version: The DocumentServer version of the runs. If None, the runs of all versions are used.
+        :return: Rows of the test name, average and maximum duration and the number of runs, the slowest first.
+        """
+        query = """
+            SELECT r.test, AVG(r.duration), MAX(r.duration), COUNT(*)
+            FROM results r JOIN runs ON runs.id = r.run_id
+            WHERE r.duration IS NOT NULL
+              AND (:browser IS NULL OR runs.browser = :browser)
+              AND (:ds_version IS NULL OR runs.ds_version = :ds_version)
+            GROUP BY r.test
+            ORDER BY AVG(r.duration) DESC
+            LIMIT :limit
+        """
+        with closing(self._connect()) as db:
+            return db.execute(query, {'browser': browser, 'ds_version': ds_version, 'limit': limit}).fetchall()
+
+    def regressions(self, browser: str, ratio: float = 1.5, min_delta: float = 5.0) -> list[tuple]:
+        """
+        Compare the latest run in the browser with the latest run of the previous DocumentServer version.
+        A test has regressed if it is slower by both the ratio and the minimum delta, or if it passed before
+        and does not pass now.
+
+        :param browser: The browser of the runs.
+        :param ratio: The minimum ratio of the current duration to the previous one.
+        :param min_delta: The minimum difference of the durations in seconds.
+        :return: Rows of the test name, previous and current status and duration.
+        """
+        current, previous = self._latest_runs_of_versions(browser)
+        if current is None or previous is None:
+            return []
+
+        query = """
+            SELECT cur.test, prev.status, cur.status, prev.duration, cur.duration
+            FROM results cur JOIN results prev ON prev.test = cur.test AND prev.run_id = :previous
+            WHERE cur.run_id = :current AND (
+                (prev.status = 'passed' AND cur.status != 'passed')
+                OR (cur.duration >= prev.duration * :ratio AND cur.duration - prev.duration >= :min_delta)
+            )
+            ORDER BY cur.duration - prev.duration DESC
+        """
+        params = {'current': current, 'previous': previous, 'ratio': ratio, 'min_delta': min_delta}
+        with closing(self._connect()) as db:
+            return db.execute(query, params).fetchall()
+
+    def _latest_runs_of_versions(self, browser: str) -> tuple[Optional[int], Optional[int]]:
+        """
+        :return: The ID of the latest run in the browser and the ID of the latest run of a different version.
+        """
+        with closing(self._connect()) as db:
+            latest = db.execute(
+                "SELECT id, ds_version FROM runs WHERE browser = ? ORDER BY id DESC LIMIT 1", (browser,)
+            ).fetchone()
+            if not latest:
+                return None, None
+
+            previous = db.execute(
+                "SELECT id FROM runs WHERE browser = ? AND id < ? AND ds_version IS NOT ? ORDER BY id DESC LIMIT 1",
+                (browser, latest[0], latest[1])
+            ).fetchone()
+            return latest[0], previous[0] if previous else None
+
+    def _connect(self) -> sqlite3.Connection:
+        makedirs(dirname(self.db_path), exist_ok=True)
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA foreign_keys = ON")
+        db.executescript(self.schema)
+        return db
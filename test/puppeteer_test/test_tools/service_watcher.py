@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import shlex
+import time
+from typing import Callable, Optional
+
+from rich import print
+
+from data import ServiceWatchError
+from .linux_script_demon import LinuxScriptDemon
+from .ssh_session import SshSession
+
+
+class ServiceState:
+    """
+    The state of a systemd service together with the exit code and exit status of its main process.
+    """
+    properties = ('ActiveState', 'ExecMainCode', 'ExecMainStatus')
+
+    def __init__(self, status: Optional[str], exit_code: Optional[int], exit_status: Optional[int]):
+        self.status = status
+        self.exit_code = exit_code
+        self.exit_status = exit_status
+
+    @classmethod
+    def show_cmd(cls, service_name: str) -> str:
+        """
+        :param service_name: The name of the systemd service.
+        :return: The command printing all properties of the state in one call.
+        """
+        return f"systemctl show {' '.join(f'-p {name}' for name in cls.properties)} {service_name}"
+
+    @classmethod
+    def parse(cls, output: str) -> "ServiceState":
+        """
+        Parse the output of the `systemctl show` command.
+        :param output: The `Key=Value` pairs separated by whitespace.
+        :return: The parsed service state.
+        """
+        values = dict(item.split('=', 1) for item in (output or '').split() if '=' in item)
+        return cls(
+            status=values.get('ActiveState', '').lower() or None,
+            exit_code=cls._to_int(values.get('ExecMainCode')),
+            exit_status=cls._to_int(values.get('ExecMainStatus'))
+        )
+
+    @staticmethod
+    def _to_int(value: Optional[str]) -> Optional[int]:
+        return int(value) if value and value.strip().lstrip('-').isdigit() else None
+
+
+class ServiceWatcher:
+    """
+    A class to wait for the systemd service to exit using a single long-lived SSH channel.
+
+    The remote side streams the service journal and checks the service state every `check_interval` seconds.
+    When the service leaves the active state, the final state is printed after a sentinel line,
+    so the local side reacts almost immediately without polling over new connections.
+    """
+    sentinel = '__PUPPETEER_SERVICE_EXITED__'
+    heartbeat = '__PUPPETEER_SERVICE_ACTIVE__'
+    active_states = ('active', 'activating', 'reloading')
+
+    def __init__(
+            self,
+            session: SshSession,
+            linux_service: LinuxScriptDemon,
+            check_interval: float = 0.5,
+            heartbeat_interval: int = 15,
+            max_restarts: int = 5
+    ):
+        """
+        :param session: The SSH session to the droplet.
+        :param linux_service: The Linux service to watch.
+        :param check_interval: The interval in seconds between the service state checks on the remote side.
+        :param heartbeat_interval: The interval in seconds between the heartbeat lines used to detect a dead channel.
+        :param max_restarts: The number of restarts in a row without any output after which the watcher
+            falls back to polling the service state.
+        """
+        self.session = session
+        self.linux_service = linux_service
+        self.check_interval = check_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.max_restarts = max_restarts
+        self._has_output = False
+
+    def watch_cmd(self) -> str:
+        """
+        Generate the remote command that streams the service log and reports the service exit.
+        :return: The command to execute on the remote server.
+        """
+        name = self.linux_service.name
+        checks_per_heartbeat = max(int(self.heartbeat_interval / self.check_interval), 1)
+        script = f"""\
+sudo journalctl -f -n 0 -o cat -u {name} &
+JOURNAL_PID=$!
+trap 'kill $JOURNAL_PID 2>/dev/null' EXIT
+COUNTER=0
+while case "$(systemctl is-active {name})" in {'|'.join(self.active_states)}) true;; *) false;; esac; do
+    sleep {self.check_interval}
+    COUNTER=$((COUNTER + 1))
+    [ $((COUNTER % {checks_per_heartbeat})) -eq 0 ] && echo '{self.heartbeat}'
+done
+kill $JOURNAL_PID 2>/dev/null
+echo "{self.sentinel} $({ServiceState.show_cmd(name)} | tr '\\n' ' ')"\
+"""
+        return f"bash -c {shlex.quote(script)}"
+
+    def wait(self, on_log: Callable[[str], None] = None) -> ServiceState:
+        """
+        Block until the service exits. The watcher is restarted if the channel is closed without the sentinel.
+        After `max_restarts` restarts in a row without any output, e.g. if journalctl is missing,
+        the service state is polled with `systemctl show` instead.
+
+        :param on_log: The callback called for each new line of the service log.
+        :return: The final state of the service.
+        :raises ServiceWatchError: If the service state cannot be read.
+        """
+        restarts = 0
+        while restarts < self.max_restarts:
+            self._has_output = False
+            state = self.session.call(lambda: self._watch(on_log))
+            if state:
+                return state
+            restarts = 0 if self._has_output else restarts + 1
+            time.sleep(self.check_interval)
+
+        print(
+            f"[red]|WARNING||{self.session.server.ip}| Watcher of {self.linux_service.name} "
+            f"restarted {restarts} times without output, polling the service state"
+        )
+        return self._poll()
+
+    def _poll(self) -> ServiceState:
+        failures = 0
+        while True:
+            output = self.session.exec_command(
+                ServiceState.show_cmd(self.linux_service.name), stdout=False, stderr=False
+            ).stdout
+            state = ServiceState.parse(output)
+            if state.status is None:
+                failures += 1
+                if failures >= self.max_restarts:
+                    raise ServiceWatchError(
+                        f"|ERROR||{self.session.server.ip}| Failed to get the state of "
+                        f"{self.linux_service.name}: {output!r}"
+                    )
+            elif state.status not in self.active_states:
+                return state
+            else:
+                failures = 0
+
+            time.sleep(self.heartbeat_interval)
+
+    def _watch(self, on_log: Callable[[str], None] = None) -> Optional[ServiceState]:
+        channel = self.session.connection.get_transport().open_session()
+        channel.settimeout(self.heartbeat_interval * 3)
+        channel.exec_command(self.watch_cmd())
+
+        try:
+            with channel.makefile('r') as stream:
+                for line in stream:
+                    self._has_output = True
+                    line = line.rstrip('\n')
+                    if line.startswith(self.sentinel):
+                        return ServiceState.parse(line[len(self.sentinel):])
+                    if line != self.heartbeat and on_log:
+                        on_log(line)
+        finally:
+            channel.close()
+
+        return None
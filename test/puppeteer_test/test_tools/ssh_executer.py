@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
-from typing import Optional
+import shlex
+from typing import Optional, Union
 from ssh_wrapper import Ssh
 from ssh_wrapper.data import CommandOutput
 
 from .linux_script_demon import LinuxScriptDemon
+from .ssh_session import SshSession
+from .service_watcher import ServiceState
 
 
 
@@ -13,11 +16,11 @@ class SshExecuter:
     and monitoring Linux service scripts.
 
     Attributes:
-        ssh (Ssh): An instance of the SSH connection handler.
+        ssh (Ssh | SshSession): An instance of the SSH connection handler or a persistent SSH session.
         linux_service (LinuxScriptDemon): An instance of the Linux service script manager.
     """
 
-    def __init__(self, ssh: Ssh, linux_service: LinuxScriptDemon):
+    def __init__(self, ssh: Union[Ssh, SshSession], linux_service: LinuxScriptDemon):
         self.ssh = ssh
         self.linux_service = linux_service
 
@@ -29,6 +32,15 @@ class SshExecuter:
         for cmd in self.linux_service.start_demon_commands():
             self.exec_cmd(cmd)
 
+    def reset_workspace(self, paths: list) -> None:
+        """
+        Clean the results of the previous run on a reused droplet: remove the given paths and the service journal.
+
+        :param paths: The remote paths to remove.
+        """
+        self.exec_cmd(f"rm -rf {' '.join(shlex.quote(path) for path in paths)}", stdout=False)
+        self.exec_cmd("sudo journalctl --rotate && sudo journalctl --vacuum-time=1s", stdout=False, stderr=False)
+
     def get_service_exit_code(self) -> Optional[int]:
         """
         Retrieves the exit code of the service's main process.
@@ -59,6 +71,14 @@ class SshExecuter:
 
         return None
 
+    def get_service_state(self) -> ServiceState:
+        """
+        Retrieves the status, exit code and exit status code of the service in a single call.
+
+        :return: The state of the service.
+        """
+        return ServiceState.parse(self.exec_cmd(ServiceState.show_cmd(self.linux_service.name), stdout=False).stdout)
+
     def change_service_dir_access(self):
         """
         Change the access permissions of the Linux service directory.
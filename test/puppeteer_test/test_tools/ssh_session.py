@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+import threading
+from contextlib import ExitStack
+from typing import Callable, Optional, TypeVar
+
+from paramiko.ssh_exception import SSHException
+from rich import print
+from ssh_wrapper import Ssh, Sftp, ServerData
+from ssh_wrapper.data import CommandOutput
+
+T = TypeVar('T')
+
+
+class SshSession:
+    """
+    A class that keeps a single SSH connection to the droplet alive for the whole run.
+
+    The SSH and SFTP clients share one transport. If the connection drops, it is reopened
+    transparently on the next call, and the session can be shared between threads. The session provides
+    the same `exec_command` and `server` interface as `Ssh`, so it can be passed to SshExecuter
+    instead of a one-off connection.
+    """
+    connection_errors = (SSHException, EOFError, OSError)
+    socket_errors = (SSHException, EOFError, ConnectionError, TimeoutError)
+
+    def __init__(self, server: ServerData, keepalive: int = 30, retries: int = 3):
+        """
+        :param server: The server data with the cached droplet IP address.
+        :param keepalive: The interval in seconds of the keepalive packets sent over the transport.
+        :param retries: The number of reconnection attempts for a single call.
+        """
+        self.server = server
+        self.keepalive = keepalive
+        self.retries = retries
+        self._stack: Optional[ExitStack] = None
+        self._ssh: Optional[Ssh] = None
+        self._sftp: Optional[Sftp] = None
+        self._sftp_client = None
+        self._lock = threading.RLock()
+
+    @property
+    def ssh(self) -> Ssh:
+        """
+        The SSH client. The connection is opened or reopened if it is not active.
+        """
+        with self._lock:
+            if not self.is_active():
+                self._connect()
+            return self._ssh
+
+    @property
+    def sftp(self) -> Sftp:
+        """
+        The SFTP client opened over the SSH connection of the session.
+        """
+        with self._lock:
+            ssh = self.ssh
+            if self._sftp is None:
+                self._sftp = self._stack.enter_context(Sftp(self.server, ssh.connection))
+            return self._sftp
+
+    @property
+    def sftp_client(self):
+        """
+        The low-level paramiko SFTP client of the session, used for partial file reads.
+        """
+        with self._lock:
+            ssh = self.ssh
+            if self._sftp_client is None:
+                self._sftp_client = self._stack.enter_context(ssh.connection.open_sftp())
+            return self._sftp_client
+
+    @property
+    def connection(self):
+        """
+        The underlying SSH connection.
+        """
+        return self.ssh.connection
+
+    def is_active(self) -> bool:
+        """
+        Check that the SSH transport is open.
+        :return: True if the connection is alive, False otherwise.
+        """
+        if self._ssh is None:
+            return False
+
+        try:
+            transport = self._ssh.connection.get_transport()
+        except self.connection_errors:
+            return False
+        return bool(transport and transport.is_active())
+
+    def exec_command(self, cmd: str, stdout: bool = True, stderr: bool = True) -> CommandOutput:
+        """
+        Execute a command over the session, reconnecting if the connection has dropped.
+        :param cmd: The command to execute.
+        :param stdout: Output the standard output.
+        :param stderr: Output the standard error.
+        :return: The output of the executed command.
+        """
+        return self.call(lambda: self.ssh.exec_command(cmd, stdout=stdout, stderr=stderr))
+
+    def call(self, func: Callable[[], T]) -> T:
+        """
+        Call the function that uses the session, reconnecting and retrying if the connection is lost.
+        Other errors, e.g. a missing local or remote file, are raised immediately.
+
+        :param func: The function to call.
+        :return: The result of the function.
+        """
+        for attempt in range(1, self.retries + 1):
+            try:
+                return func()
+            except self.connection_errors as e:
+                if attempt == self.retries or not self._is_connection_lost(e):
+                    raise
+                print(f"[red]|WARNING||{self.server.ip}| SSH connection lost: {e}. Reconnecting...")
+                self.close()
+
+    def _is_connection_lost(self, error: Exception) -> bool:
+        """
+        :param error: The error raised by a call over the session.
+        :return: True for socket and SSH errors or if the transport is no longer active.
+        """
+        return isinstance(error, self.socket_errors) or not self.is_active()
+
+    def close(self) -> None:
+        """
+        Close the SSH and SFTP clients of the session.
+        """
+        with self._lock:
+            if self._stack is not None:
+                try:
+                    self._stack.close()
+                except self.connection_errors:
+                    pass
+
+            self._stack, self._ssh, self._sftp, self._sftp_client = None, None, None, None
+
+    def _connect(self) -> None:
+        self.close()
+        self._stack = ExitStack()
+        self._ssh = self._stack.enter_context(Ssh(self.server))
+        transport = self._ssh.connection.get_transport()
+        transport.set_keepalive(self.keepalive) if transport else None
+
+    def __enter__(self) -> "SshSession":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
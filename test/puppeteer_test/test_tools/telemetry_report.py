@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import csv
+import html
+from glob import glob
+from os.path import join, basename, splitext
+from typing import Optional
+
+from rich import print
+
+
+class TelemetryReport:
+    """
+    A class to render the resource samples collected on the droplet into telemetry.html next to report.html.
+
+    Each telemetry*.csv file of the report directory gets a summary table and line charts drawn as inline SVG,
+    so the page has no external dependencies.
+    """
+    charts = (
+        ('CPU, %', ('cpu',)),
+        ('Memory, MB', ('mem_used_mb', 'swap_used_mb', 'chrome_rss_mb', 'firefox_rss_mb', 'node_rss_mb')),
+        ('Load average', ('load1',)),
+        ('Disk, KB/s', ('disk_read_kbs', 'disk_write_kbs')),
+        ('Network, KB/s', ('net_rx_kbs', 'net_tx_kbs')),
+    )
+    colors = ('#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd')
+    width, height = 800, 160
+
+    def __init__(self, report_dir: str):
+        """
+        :param report_dir: The directory with report.html and the telemetry CSV files.
+        """
+        self.report_dir = report_dir
+        self.path = join(report_dir, 'telemetry.html')
+
+    def render(self) -> Optional[str]:
+        """
+        Render the telemetry page.
+        :return: The path to telemetry.html, or None if there are no samples.
+        """
+        sections = []
+        for csv_path in sorted(glob(join(self.report_dir, 'telemetry*.csv'))):
+            samples = self._read(csv_path)
+            if samples:
+                sections.append(self._section(splitext(basename(csv_path))[0], samples))
+
+        if not sections:
+            return None
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(
+                "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Telemetry</title><style>"
+                "body{font-family:sans-serif}table{border-collapse:collapse}"
+                "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}"
+                "svg{background:#fafafa;border:1px solid #ddd}</style></head><body>"
+                f"{''.join(sections)}</body></html>"
+            )
+
+        print(f"[green]|INFO| Telemetry summary is saved to {self.path}")
+        return self.path
+
+    @staticmethod
+    def _read(csv_path: str) -> dict[str, list[float]]:
+        """
+        :return: The samples of each column.
+        """
+        samples = {}
+        with open(csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    values = {key: float(value) for key, value in row.items()}
+                except (TypeError, ValueError):
+                    continue
+                for key, value in values.items():
+                    samples.setdefault(key, []).append(value)
+        return samples
+
+    def _section(self, title: str, samples: dict[str, list[float]]) -> str:
+        times = samples.get('time', [])
+        duration = times[-1] - times[0] if len(times) > 1 else 0
+        rows = ''.join(
+            f"<tr><th>{html.escape(key)}</th><td>{min(values):.1f}</td>"
+            f"<td>{sum(values) / len(values):.1f}</td><td>{max(values):.1f}</td></tr>"
+            for key, values in samples.items() if key != 'time'
+        )
+        charts = ''.join(
+            self._chart(name, {key: samples[key] for key in keys if key in samples})
+            for name, keys in self.charts
+        )
+        return (
+            f"<h2>{html.escape(title)}</h2><p>{len(times)} samples, {duration / 60:.1f} min</p>"
+            f"<table><tr><th></th><th>min</th><th>avg</th><th>max</th></tr>{rows}</table>{charts}"
+        )
+
+    def _chart(self, name: str, series: dict[str, list[float]]) -> str:
+        if not series:
+            return ''
+
+        top = max((max(values) for values in series.values()), default=0) or 1
+        lines, legend = [], []
+        for num, (key, values) in enumerate(series.items()):
+            color = self.colors[num % len(self.colors)]
+            step = self.width / max(len(values) - 1, 1)
+            points = ' '.join(
+                f"{i * step:.1f},{self.height - value / top * (self.height - 10):.1f}" for i, value in enumerate(values)
+            )
+            lines.append(f"<polyline fill='none' stroke='{color}' stroke-width='1.5' points='{points}'/>")
+            legend.append(f"<span style='color:{color}'>&#9632; {html.escape(key)}</span>")
+
+        return (
+            f"<h3>{html.escape(name)} (max {top:.1f})</h3><div>{' '.join(legend)}</div>"
+            f"<svg width='{self.width}' height='{self.height}'>{''.join(lines)}</svg>"
+        )
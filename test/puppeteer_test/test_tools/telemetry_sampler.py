@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+from os.path import join
+
+from .paths import Paths
+
+
+class TelemetrySampler:
+    """
+    A class to create the resource sampler that runs on the droplet next to the tests.
+
+    The sampler is a dependency-free python3 script reading /proc. Every interval it appends a CSV row
+    with the CPU usage, memory and swap, load average, disk and network throughput
+    and the summary RSS of the browser and NodeJs processes. The processes are matched by their executable,
+    so the content processes of Firefox, named e.g. 'Web Content', are counted as Firefox.
+    """
+    columns = (
+        'time', 'cpu', 'mem_used_mb', 'swap_used_mb', 'load1', 'disk_read_kbs', 'disk_write_kbs',
+        'net_rx_kbs', 'net_tx_kbs', 'chrome_rss_mb', 'firefox_rss_mb', 'node_rss_mb'
+    )
+
+    script = r'''
+import os, re, sys, time
+
+out_path, interval = sys.argv[1], float(sys.argv[2])
+processes = {'chrome': ('chrome',), 'firefox': ('firefox',), 'node': ('node',)}
+# The names of the Firefox child processes, used if the executable of a process cannot be read
+firefox_children = (
+    'web content', 'isolated web co', 'webextensions', 'privileged cont', 'file content', 'rdd process',
+    'socket process', 'utility process', 'gpu process', 'forkserver'
+)
+
+
+def cpu_times():
+    with open('/proc/stat') as f:
+        values = [int(v) for v in f.readline().split()[1:]]
+    return sum(values), values[3] + values[4]
+
+
+def memory():
+    info = {}
+    with open('/proc/meminfo') as f:
+        for line in f:
+            key, value = line.split(':', 1)
+            info[key] = int(value.split()[0])
+    used = info['MemTotal'] - info.get('MemAvailable', info['MemFree'])
+    return used / 1024, (info['SwapTotal'] - info['SwapFree']) / 1024
+
+
+def disk_sectors():
+    read = write = 0
+    with open('/proc/diskstats') as f:
+        for line in f:
+            parts = line.split()
+            if re.fullmatch(r'(sd[a-z]+|vd[a-z]+|xvd[a-z]+|nvme\d+n\d+)', parts[2]):
+                read, write = read + int(parts[5]), write + int(parts[9])
+    return read, write
+
+
+def net_bytes():
+    rx = tx = 0
+    with open('/proc/net/dev') as f:
+        for line in f.readlines()[2:]:
+            name, data = line.split(':', 1)
+            if name.strip() != 'lo':
+                values = data.split()
+                rx, tx = rx + int(values[0]), tx + int(values[8])
+    return rx, tx
+
+
+def process_name(pid):
+    try:
+        return os.path.basename(os.readlink(f'/proc/{pid}/exe')).lower()
+    except OSError:
+        pass
+    with open(f'/proc/{pid}/comm') as f:
+        comm = f.read().strip().lower()
+    return 'firefox' if comm in firefox_children else comm
+
+
+def process_rss():
+    rss = dict.fromkeys(processes, 0.0)
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            process = process_name(pid)
+            with open(f'/proc/{pid}/statm') as f:
+                pages = int(f.read().split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        for name, patterns in processes.items():
+            if any(pattern in process for pattern in patterns):
+                rss[name] += pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    return rss
+
+
+with open(out_path, 'a', buffering=1) as out:
+    if out.tell() == 0:
+        out.write('@HEADER@\n')
+    prev_cpu, prev_disk, prev_net, prev_time = cpu_times(), disk_sectors(), net_bytes(), time.time()
+    while True:
+        time.sleep(interval)
+        now, cpu, disk, net = time.time(), cpu_times(), disk_sectors(), net_bytes()
+        elapsed = max(now - prev_time, 1e-6)
+        total, idle = cpu[0] - prev_cpu[0], cpu[1] - prev_cpu[1]
+        mem_used, swap_used = memory()
+        rss = process_rss()
+        row = (
+            int(now), 100 * (total - idle) / max(total, 1), mem_used, swap_used, os.getloadavg()[0],
+            (disk[0] - prev_disk[0]) / 2 / elapsed, (disk[1] - prev_disk[1]) / 2 / elapsed,
+            (net[0] - prev_net[0]) / 1024 / elapsed, (net[1] - prev_net[1]) / 1024 / elapsed,
+            rss['chrome'], rss['firefox'], rss['node']
+        )
+        out.write(','.join(f'{value:.1f}' if isinstance(value, float) else str(value) for value in row) + '\n')
+        prev_cpu, prev_disk, prev_net, prev_time = cpu, disk, net, now
+'''
+
+    def __init__(self, interval: int = 5, script_dir: str = None):
+        """
+        :param interval: The sampling interval in seconds.
+        :param script_dir: The directory where the sampler script will be saved. Defaults to Paths.tmp_dir.
+        """
+        self.path = Paths()
+        self.interval = interval
+        self.script_path = join(script_dir or self.path.tmp_dir, self.path.telemetry_sampler_name)
+
+    @property
+    def start_cmd(self) -> str:
+        """
+        :return: The command that starts the sampler in the background and stores its PID in TELEMETRY_PID.
+        """
+        return (
+            f"rm -f '{self.path.remote_telemetry_file}'\n"
+            f"python3 '{self.path.remote_telemetry_sampler}' '{self.path.remote_telemetry_file}' {self.interval} &\n"
+            f"TELEMETRY_PID=$!"
+        )
+
+    @property
+    def stop_cmd(self) -> str:
+        """
+        :return: The command that stops the sampler and copies the samples into the report directory.
+        """
+        return (
+            f"kill $TELEMETRY_PID 2>/dev/null\n"
+            f"mkdir -p '{self.path.remote_report_dir}'\n"
+            f"cp '{self.path.remote_telemetry_file}' '{self.path.remote_report_dir}/' 2>/dev/null"
+        )
+
+    def create(self) -> str:
+        """
+        Create the sampler script file.
+        :return: The path to the created script.
+        """
+        with open(self.script_path, 'w', newline='') as f:
+            f.write(self.script.replace('@HEADER@', ','.join(self.columns)))
+        return self.script_path
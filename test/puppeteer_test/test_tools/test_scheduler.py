@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import heapq
+from posixpath import basename
+from statistics import median
+from typing import Optional
+
+
+class TestScheduler:
+    """
+    A class to order the test files by their historical durations.
+
+    The files are ordered by the longest-processing-time-first heuristic: the longest tests start first,
+    so the threads that take the next file from the list finish at about the same time.
+    A test without history is estimated by the median duration of the known tests.
+    """
+
+    def __init__(self, durations: dict[str, float], default_duration: Optional[float] = None):
+        """
+        :param durations: The historical duration in seconds of each test, by file path or file name.
+        :param default_duration: The duration of an unknown test. Defaults to the median of the known durations.
+        """
+        self.durations = durations
+        self.default_duration = default_duration or (median(durations.values()) if durations else 1.0)
+
+    def estimate(self, file: str) -> float:
+        """
+        :param file: The path of the test file relative to the puppeteer files directory.
+        :return: The expected duration of the test in seconds.
+        """
+        duration = self.durations.get(file, self.durations.get(basename(file)))
+        return duration if duration is not None else self.default_duration
+
+    def order(self, files: list[str]) -> list[str]:
+        """
+        :param files: The test files.
+        :return: The test files, the longest first.
+        """
+        return sorted(files, key=lambda file: (-self.estimate(file), file))
+
+    def assign(self, files: list[str], workers: int) -> list[list[str]]:
+        """
+        Simulate the run of the ordered files, where each file is taken by the first free worker.
+        :param files: The test files.
+        :param workers: The number of threads or droplets.
+        :return: The files executed by each worker.
+        """
+        workers = max(workers, 1)
+        assignment = [[] for _ in range(workers)]
+        free_at = [(0.0, num) for num in range(workers)]
+
+        for file in self.order(files):
+            time, num = heapq.heappop(free_at)
+            assignment[num].append(file)
+            heapq.heappush(free_at, (time + self.estimate(file), num))
+
+        return assignment
+
+    def makespan(self, files: list[str], workers: int) -> float:
+        """
+        :param files: The test files.
+        :param workers: The number of threads or droplets.
+        :return: The predicted time in seconds until the last worker finishes.
+        """
+        return max((sum(map(self.estimate, files)) for files in self.assign(files, workers)), default=0.0)
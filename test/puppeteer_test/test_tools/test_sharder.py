@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+from os.path import join, relpath, getsize
+from typing import Optional
+
+from .paths import Paths
+from .test_scheduler import TestScheduler
+
+
+class TestShard:
+    """
+    A subset of the puppeteer test files that is executed on a single droplet.
+    """
+
+    def __init__(self, index: int):
+        """
+        :param index: The sequence number of the shard, starting from 1.
+        """
+        self.index = index
+        self.files: list = []
+        self.size: int = 0
+        self.duration: float = 0.0
+
+    def add(self, file: str, size: int, duration: float = 0.0) -> None:
+        """
+        Add a file to the shard.
+        :param file: The path of the file relative to the puppeteer files directory.
+        :param size: The size of the file in bytes.
+        :param duration: The expected duration of the test in seconds.
+        """
+        self.files.append(file)
+        self.size += size
+        self.duration += duration
+
+    def __repr__(self):
+        return f"TestShard(index={self.index}, files={len(self.files)}, size={self.size}, duration={self.duration:.0f})"
+
+
+class TestSharder:
+    """
+    A class to split the puppeteer test files into balanced shards.
+    """
+    ignore_dirs = {'.git'}
+
+    def __init__(self, files_dir: str = None):
+        """
+        :param files_dir: The directory with the puppeteer test files. Defaults to Paths.local_puppeteer_files_dir.
+        """
+        self.files_dir = files_dir or Paths().local_puppeteer_files_dir
+
+    def get_files(self) -> dict:
+        """
+        Collect the test files and their sizes.
+        :return: A dictionary where the key is the relative path of the file and the value is its size in bytes.
+        """
+        files = {}
+        for root, dirs, file_names in os.walk(self.files_dir):
+            dirs[:] = [d for d in dirs if d not in self.ignore_dirs]
+            for name in file_names:
+                path = join(root, name)
+                files[relpath(path, self.files_dir).replace(os.sep, '/')] = getsize(path)
+        return files
+
+    def split(self, count: int, scheduler: Optional[TestScheduler] = None) -> list[TestShard]:
+        """
+        Split the test files into shards using the longest-processing-time-first heuristic,
+        where each file is placed into the currently lightest shard.
+        The files are weighted by their expected durations if the scheduler is passed, otherwise by their sizes.
+
+        :param count: The number of shards.
+        :param scheduler: The scheduler with the historical durations of the tests.
+        :return: A list of shards, a shard is empty if there are fewer files than shards.
+        """
+        shards = [TestShard(index) for index in range(1, max(count, 1) + 1)]
+        files = self.get_files()
+
+        if scheduler is None:
+            for file, size in sorted(files.items(), key=lambda item: (-item[1], item[0])):
+                min(shards, key=lambda shard: (shard.size, len(shard.files))).add(file, size)
+            return shards
+
+        for file in scheduler.order(list(files)):
+            min(shards, key=lambda shard: (shard.duration, len(shard.files))).add(
+                file, files[file], scheduler.estimate(file)
+            )
+        return shards
@@ -2,14 +2,18 @@
 import os
 import shutil
 import time
+from collections import deque
+from copy import copy
+from os.path import isdir, isfile, join, relpath
+from posixpath import basename
 
 from host_tools import Dir
 from rich.console import Console
-from ssh_wrapper import Ssh, Sftp, ServerData
-from typing import Union
+from ssh_wrapper import ServerData
+from contextlib import nullcontext
+from typing import Union, Optional, Iterable
 
-from digitalocean_wrapper import DigitalOceanWrapper
-from data import DropletConfig, PuppeteerChromeConfig, droplet_exists, SSHConfig
+from data import DropletConfig, PuppeteerChromeConfig, droplet_exists, SSHConfig, ImageBakeError
 from .document_server import DocumentServer
 from .Uploader import Uploader
 from .paths import Paths
@@ -18,6 +22,24 @@ from .puppeteer_run_script import PuppeteerRunScript
 from .report import Report
 from .ssh_executer import SshExecuter
 from .digitalocean_ssh_key import DigitalOceanSshKey
+from .puppeter_repo import PuppeterRepo
+from .puppeteer_archive import PuppeteerArchive
+from .test_sharder import TestShard, TestSharder
+from .test_scheduler import TestScheduler
+from .droplet_sizer import DropletSizer
+from .telemetry_sampler import TelemetrySampler
+from .telemetry_report import TelemetryReport
+from .tracer import Tracer, traced
+from .ssh_session import SshSession
+from .service_watcher import ServiceWatcher, ServiceState
+from .image_registry import ImageRegistry
+from .droplet_pool import DropletPool
+from .report_sync import ReportSync
+from .report_parser import ReportParser
+from .run_history import RunHistory
+from .result_cache import ResultCache, CachedResult
+from .artifact_cache import ArtifactCache
+from .cached_digitalocean import CachedDigitalOcean
 
 
 console = Console()
@@ -43,41 +65,276 @@ class TestTools:
         self.path = Paths()
         self.puppeteer_config = puppeteer_config
         self.ds = DocumentServer(self.puppeteer_config.ds_url)
-        self.ds.check_example_is_up()
 
-        self.do = DigitalOceanWrapper()
+        self.do = CachedDigitalOcean()
         self.droplet_config = DropletConfig()
 
         self.linux_service = LinuxScriptDemon(self.path.remote_puppeter_run_sh, user=self.droplet_config.default_user)
+        self.flags = flags
         self.puppeteer_run_script = PuppeteerRunScript(self.puppeteer_config, flags=flags)
 
-        self.do_ssh_keys_id = DigitalOceanSshKey(self.droplet_config, self.do).get_keys_id()
-        self.ds_version = self.ds.get_version()
-        self.report = Report(version=self.ds_version, browser=self.puppeteer_config.browser)
+        self._do_ssh_key: Optional[DigitalOceanSshKey] = None
+        self.image_registry = ImageRegistry()
+        self.pool = DropletPool(self.do, self.droplet_config)
+        self.history = RunHistory()
+        self._report: Optional[Report] = None
+        self.report_version: Optional[str] = None
 
         self.droplet = None
+        self._droplet_ip: Optional[str] = None
+        self._session: Optional[SshSession] = None
+        self.droplet_name = self.droplet_config.name
+        self.droplet_size = self.droplet_config.size
+        self.auto_size = False
+        self.shard: Optional[TestShard] = None
+        self.tmp_dir = self.path.tmp_dir
+        self.puppeteer_archive = self.path.local_puppeteer_archive
+        self.delta_upload = True
+        self.file_types: Optional[list] = None
+        self._archive: Optional[PuppeteerArchive] = None
+        self.live_status = True
+        self.live_sync = 0
+        self.telemetry_interval = 5
+        self.artifact_cache: Optional[ArtifactCache] = None
+        self.result_cache: Optional[ResultCache] = None
+        self.cached_results: dict[str, CachedResult] = {}
+        self.schedule = False
+        self.predicted_makespan: Optional[float] = None
+        self.actual_makespan: Optional[float] = None
         self.retry_num = 2
 
-        self._prepare_tmp_dir()
+    @property
+    def ds_version(self) -> Optional[str]:
+        """
+        The DocumentServer version. It is requested on the first access.
+        """
+        return self.ds.get_version()
+
+    @property
+    def do_ssh_key(self) -> DigitalOceanSshKey:
+        """
+        The manager of the DigitalOcean SSH keys. It is created on the first access, since it reads the local public key.
+        """
+        if self._do_ssh_key is None:
+            self._do_ssh_key = DigitalOceanSshKey(self.droplet_config, self.do)
+        return self._do_ssh_key
+
+    @property
+    def do_ssh_keys_id(self) -> list:
+        """
+        The DigitalOcean SSH key IDs added to the droplet. They are requested on the first access.
+        """
+        return self.do_ssh_key.get_keys_id()
+
+    @property
+    def report(self) -> Report:
+        """
+        The report of the test run. It is created on the first access, when the DocumentServer version is known.
+        The report directory is named after report_version if it is set, otherwise after the DocumentServer version.
+        """
+        if self._report is None:
+            self._report = Report(
+                version=self.report_version or self.ds_version,
+                browser=self.puppeteer_config.browser,
+                shard=self.shard.index if self.shard else None
+            )
+        return self._report
+
+    @property
+    def session(self) -> SshSession:
+        """
+        The SSH session to the droplet shared by all remote operations of the run.
+        It is opened on the first access and reconnects transparently if the connection drops.
+        """
+        if self._session is None:
+            self._session = SshSession(ServerData(self.get_droplet_ip(), self.droplet_config.default_user))
+        return self._session
 
+    def close_session(self) -> None:
+        """
+        Close the SSH session to the droplet if it is open.
+        """
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def check_document_server(self) -> bool:
+        """
+        Check that the DocumentServer example page is up.
+        """
+        return self.ds.check_example_is_up()
 
-    def create_test_droplet(self):
+    def spawn_shard(self, shard: TestShard) -> "TestTools":
+        """
+        Create the TestTools instance that runs the given shard on its own droplet.
+        The configuration, DocumentServer and DigitalOcean objects are shared with the current instance.
+        The files of the shard can be assigned later, before the puppeteer archive is prepared.
+
+        :param shard: The shard of the test files to run.
+        :return: The TestTools instance for the shard.
+        """
+        shard_tools = copy(self)
+        shard_tools.shard = shard
+        shard_tools._report = None
+        shard_tools._archive = None
+        shard_tools._droplet_ip = None
+        shard_tools._session = None
+        shard_tools.droplet = None
+        shard_tools.droplet_name = f"{self.droplet_config.name}-{shard.index}"
+        shard_tools.tmp_dir = join(self.path.tmp_dir, 'shards', str(shard.index))
+        Dir.create(shard_tools.tmp_dir, stdout=False)
+        shard_tools.puppeteer_archive = join(shard_tools.tmp_dir, self.path.puppeteer_archive_name)
+        shard_tools.puppeteer_run_script = PuppeteerRunScript(
+            self.puppeteer_config, script_dir=shard_tools.tmp_dir, flags=self.flags
+        )
+        shard_tools.live_status = False
+        return shard_tools
+
+    def spawn_browser(self, browser: str, provision_browsers: list = None) -> "TestTools":
+        """
+        Create the TestTools instance that runs the tests in another browser.
+        The puppeteer archive is shared with the current instance, so it is prepared once for all browsers.
+        The report is saved to the directory of the browser.
+
+        :param browser: The browser to run the tests in.
+        :param provision_browsers: The browsers to install on the droplet. Defaults to the browser of the instance.
+        :return: The TestTools instance for the browser.
+        """
+        browser_tools = copy(self)
+        browser_tools.tmp_dir = join(self.path.tmp_dir, 'browsers', browser)
+        Dir.create(browser_tools.tmp_dir, stdout=False)
+        browser_tools.puppeteer_config = self.puppeteer_config.for_browser(
+            browser, join(browser_tools.tmp_dir, self.path.puppeter_config_file_name)
+        )
+        browser_tools.puppeteer_run_script = PuppeteerRunScript(
+            browser_tools.puppeteer_config,
+            script_dir=browser_tools.tmp_dir,
+            flags=self.flags,
+            browsers=provision_browsers
+        )
+        browser_tools._archive = self.archive
+        browser_tools._report = None
+        browser_tools._droplet_ip = None
+        browser_tools._session = None
+        browser_tools.droplet = None
+        browser_tools.droplet_name = f"{self.droplet_config.name}-{browser}"
+        return browser_tools
+
+    def spawn_target(self, ds_url: str, index: int) -> "TestTools":
+        """
+        Create the TestTools instance that runs the tests against another DocumentServer.
+        The puppeteer archive is shared with the current instance, so it is prepared once for all targets.
+        The report is saved to the directory of the target version.
+
+        :param ds_url: The URL of the DocumentServer example, e.g. https://host/example.
+        :param index: The number of the target, used in the names of its droplet and temporary directory.
+        :return: The TestTools instance for the DocumentServer.
+        """
+        target_tools = copy(self)
+        target_tools.tmp_dir = join(self.path.tmp_dir, 'targets', str(index))
+        Dir.create(target_tools.tmp_dir, stdout=False)
+        target_tools.puppeteer_config = self.puppeteer_config.for_target(
+            ds_url, join(target_tools.tmp_dir, self.path.puppeter_config_file_name)
+        )
+        target_tools.ds = DocumentServer(target_tools.puppeteer_config.ds_url)
+        target_tools.puppeteer_run_script = PuppeteerRunScript(
+            target_tools.puppeteer_config,
+            script_dir=target_tools.tmp_dir,
+            flags=self.flags,
+            browsers=self.puppeteer_run_script.browsers
+        )
+        target_tools._archive = self.archive
+        target_tools._report = None
+        target_tools.report_version = None
+        target_tools._droplet_ip = None
+        target_tools._session = None
+        target_tools.droplet = None
+        target_tools.droplet_name = f"{self.droplet_config.name}-target-{index}"
+        return target_tools
+
+    def use_droplet_of(self, test: "TestTools") -> None:
+        """
+        Run on the droplet and over the SSH session of another TestTools instance.
+        :param test: The TestTools instance that owns the droplet.
+        """
+        self.droplet = test.droplet
+        self.droplet_name = test.droplet_name
+        self._droplet_ip = test.get_droplet_ip()
+        self._session = test.session
+
+    @traced
+    def clone_puppeteer_repo(self) -> None:
+        """
+        Clone the Dep.Tests and pp-files repositories if they have not been cloned yet.
+        The working trees are checked out from the local mirror cache, which is updated by an incremental fetch.
+        If file types are set, only the pp-files of these types are checked out.
+        """
+        if not isdir(self.path.local_dep_test):
+            PuppeterRepo(file_types=self.file_types).clone()
+
+    @property
+    def archive(self) -> PuppeteerArchive:
+        """
+        The puppeteer archive of the run. If the instance runs a shard, only the test files of the shard are included.
+        """
+        if self._archive is None:
+            self._archive = PuppeteerArchive(self.puppeteer_archive, files=self.shard.files if self.shard else None)
+        return self._archive
+
+    @traced
+    def prepare_puppeteer_archive(self) -> None:
+        """
+        Prepare the puppeteer files for uploading to the droplet.
+        In the delta upload mode, the content hashes of the files are calculated,
+        otherwise the whole puppeteer archive is created.
+        """
+        self.clone_puppeteer_repo()
+        self.archive.manifest() if self.delta_upload else self.archive.create()
+
+    def get_droplet_image(self) -> Union[str, int]:
+        """
+        Get the image for the test droplet. If a snapshot was baked for the configured base image, browser
+        and provisioning steps, the snapshot is used and the provisioning is skipped in the run script.
+
+        :return: The snapshot ID or the base image slug from the droplet config.
+        """
+        snapshot = self.image_registry.get(
+            self.droplet_config.image,
+            self.puppeteer_config.browser,
+            self.puppeteer_run_script.provisioning_fingerprint
+        )
+
+        if not snapshot:
+            return self.droplet_config.image
+
+        print(f"[green]|INFO| Droplet will be created from the pre-baked image [cyan]{snapshot['name']}[/]")
+        self.puppeteer_run_script.provisioned = True
+        return snapshot['id']
+
+    @traced
+    def create_test_droplet(self, image: Union[str, int] = None):
         """
         Create a new DigitalOcean droplet for testing if it does not already exist.
+        :param image: The image of the droplet. Defaults to the pre-baked snapshot if exists or the base image.
         """
-        if self.droplet_config.name in self.do.droplet.get_droplet_names():
-            self.droplet = self.do.droplet.get_by_name(self.droplet_config.name)
-            return print(f"[magenta]|INFO| Droplet [cyan]{self.droplet_config.name}[/] already exists")
+        self.close_session()
+        self._droplet_ip = None
 
+        self.droplet = self.do.droplet.get_by_name(self.droplet_name)
+        if self.droplet:
+            return print(f"[magenta]|INFO| Droplet [cyan]{self.droplet_name}[/] already exists")
+
+        self.plan_droplet_size() if self.auto_size else None
         self.droplet = self.do.droplet.create(
-            name=self.droplet_config.name,
-            size_slug=self.droplet_config.size,
+            name=self.droplet_name,
+            size_slug=self.droplet_size,
             region=self.droplet_config.region,
-            image=self.droplet_config.image,
+            image=image or self.get_droplet_image(),
             ssh_keys=self.do_ssh_keys_id,
             wait_until_up=True
         )
 
+    @traced
     @droplet_exists
     def move_to_user_project(self):
         """
@@ -86,88 +343,513 @@ class TestTools:
         if self.droplet_config.do_project_name:
             self.do.droplet.move_to_project(self.droplet, self.droplet_config.do_project_name)
 
+    @traced
     @droplet_exists
     def delete_test_droplet(self):
         """
         Delete the test droplet from DigitalOcean.
         """
+        self.close_session()
         self.do.droplet.delete(self.droplet)
 
     @droplet_exists
     def get_droplet_ip(self):
         """
-        Get the IP address of the test droplet.
+        Get the IP address of the test droplet. The address is requested once and cached for the droplet.
         :return: The IP address of the droplet.
         """
-        return self.do.droplet.info(self.droplet, load=True).get_ip_address()
+        if self._droplet_ip is None:
+            self._droplet_ip = self.do.droplet.info(self.droplet, load=True).get_ip_address()
+        return self._droplet_ip
 
+    @traced
     @droplet_exists
     def run_script_on_droplet(self):
         """
         Upload and run the Puppeteer script on the test droplet.
         """
-        _server = ServerData(self.get_droplet_ip(), self.droplet_config.default_user)
-        with Ssh(_server) as ssh, Sftp(_server, ssh.connection) as sftp:
-            ssh_executer = SshExecuter(ssh, linux_service=self.linux_service)
-            uploader = Uploader(sftp, self.puppeteer_config, self.linux_service, self.puppeteer_run_script)
+        ssh_executer = SshExecuter(self.session, linux_service=self.linux_service)
+
+        if not ssh_executer.check_service_status():
+            if self.delta_upload or not isfile(self.puppeteer_archive):
+                self.prepare_puppeteer_archive()
+            self.schedule_tests() if self.schedule else None
+            self.skip_cached_tests() if self.result_cache else None
+            if self.all_cached:
+                return print(f"[green]|INFO||{self.droplet_name}| All tests are cached, nothing is run on the droplet")
+            self.puppeteer_run_script.telemetry = (
+                TelemetrySampler(self.telemetry_interval, script_dir=self.tmp_dir) if self.telemetry_interval else None
+            )
+            self.puppeteer_run_script.artifacts = self.artifact_cache
+            with Tracer().span('upload_test_files', 'tools', droplet=self.droplet_name):
+                self.session.call(lambda: self._create_uploader().upload_test_files())
+            ssh_executer.start_script_service()
+
+    def get_scheduler(self) -> TestScheduler:
+        """
+        :return: The scheduler with the recent durations of the tests in the configured browser from the run history.
+        """
+        return TestScheduler(self.history.durations(browser=self.puppeteer_config.browser))
 
-            if not ssh_executer.check_service_status():
-                uploader.upload_test_files()
-                ssh_executer.start_script_service()
+    @traced
+    def plan_droplet_size(self) -> None:
+        """
+        Choose the cheapest droplet size that runs the tests of the instance without swapping
+        and CPU oversubscription. If the threads are not set in the flags, their number is chosen too.
+        """
+        sizer = DropletSizer()
+        files = self.shard.files if self.shard else list(TestSharder().get_files())
+        durations = self.history.durations(browser=self.puppeteer_config.browser)
+        scheduler = TestScheduler(durations, default_duration=None if durations else sizer.config.test_duration)
+        threads = (self.flags or {}).get('threads')
+
+        plan = sizer.plan(len(files), sum(map(scheduler.estimate, files)), self.puppeteer_run_script.browsers, threads)
+        self.droplet_size = plan.size.slug
+        if not threads:
+            self.flags = {**(self.flags or {}), 'threads': plan.threads}
+            self.puppeteer_run_script.flags = self.flags
+        print(f"[green]|INFO||{self.droplet_name}| Droplet plan: [cyan]{plan}")
+
+    @traced
+    def schedule_tests(self) -> None:
+        """
+        Pass the test files of the run to the script ordered by their historical durations, the longest first.
+        """
+        files = self.shard.files if self.shard else list(TestSharder().get_files())
+        self.predicted_makespan = self.puppeteer_run_script.schedule(self.get_scheduler(), files)
+        print(
+            f"[green]|INFO||{self.droplet_name}| [cyan]{len(files)}[/] tests are scheduled, "
+            f"predicted makespan: [cyan]{self.predicted_makespan / 60:.1f}[/] min"
+        )
 
+    def _create_uploader(self) -> Uploader:
+        return Uploader(
+            self.session.sftp,
+            self.puppeteer_config,
+            self.linux_service,
+            self.puppeteer_run_script,
+            puppeteer_archive=self.archive,
+            tmp_dir=self.tmp_dir,
+            ssh_executer=SshExecuter(self.session, linux_service=self.linux_service) if self.delta_upload else None
+        )
+
+    @traced
     @droplet_exists
-    def wait_execute_script(self, active_status: str = 'active') -> None:
+    def wait_execute_script(self, active_status: str = 'active') -> ServiceState:
         """
         Waits for the execution of the specified Linux service on the droplet.
 
-        This method continuously checks the status of the specified Linux service on the droplet,
-        waiting for it to change from the active status. If the service becomes inactive or deactivates,
+        In the 'event' wait mode, the service log and its exit are streamed over a single SSH channel,
+        so the exit is noticed within a second. In the 'poll' wait mode, the status of the service is checked
+        every SSHConfig.wait_execution_time seconds. When the service deactivates,
         it prints the service's log, exit code, and exit status code.
 
+        If live status is disabled (several droplets are waited for at once),
+        the progress is printed as plain lines instead of the live console status.
+        If live sync is enabled, the report is mirrored to the local directory while waiting.
+
         :param active_status: The status indicating that the service is active. Default is 'active'.
+        :return: The final state of the service, None if all tests are cached and the service was not started.
         """
-        wait_interval = self.ssh_config.wait_execution_time or 60
-        msg = f"[cyan]|INFO| Waiting for execute {self.linux_service.name}. Wait interval: {wait_interval} seconds"
+        if self.all_cached:
+            return None
+
         line = '-' * 90
+        ssh_executer = SshExecuter(self.session, linux_service=self.linux_service)
+        start = time.perf_counter()
+
+        with self._live_report_sync():
+            if self.ssh_config.wait_mode == 'event':
+                state = self._wait_service_exit(line)
+            else:
+                state = self._poll_service_status(ssh_executer, line, active_status)
+
+        self.actual_makespan = time.perf_counter() - start
+
+        print(
+            f"[blue]{line}\n|INFO| Service {self.linux_service.name} log:\n"
+            f"{line}\n\n{ssh_executer.get_service_log(1000)}\n{line}\n\n"
+            f"[green]|INFO||{self.session.server.ip}| Service [cyan]{self.linux_service.name}[/] "
+            f"deactivated with status [cyan]{state.status}[/]. "
+            f"Exit Code: [cyan]{state.exit_code}[/] "
+            f"Exit Status Code: [cyan]{state.exit_status}[/]"
+        )
+        return state
+
+    def _wait_service_exit(self, line: str) -> ServiceState:
+        """
+        Wait for the service exit streamed by the ServiceWatcher.
+        :param line: The separator line for the output.
+        :return: The final state of the service.
+        """
+        msg = f"[cyan]|INFO||{self.droplet_name}| Waiting for execute {self.linux_service.name}. Wait mode: event"
         print(f"[bold cyan]{line}\n{msg}\n{line}")
+        log_tail = deque(maxlen=20)
 
-        with console.status(msg) as status:
+        with console.status(msg) if self.live_status else nullcontext() as status:
+            def on_log(log_line: str) -> None:
+                log_tail.append(log_line)
+                status.update(f"{msg}\n" + '\n'.join(log_tail)) if status else None
+
+            return ServiceWatcher(self.session, self.linux_service).wait(on_log=on_log)
+
+    def _poll_service_status(self, ssh_executer: SshExecuter, line: str, active_status: str) -> ServiceState:
+        """
+        Check the service status at a fixed interval until it changes from the active status.
+        :param ssh_executer: The SshExecuter of the session.
+        :param line: The separator line for the output.
+        :param active_status: The status indicating that the service is active.
+        :return: The final state of the service.
+        """
+        wait_interval = self.ssh_config.wait_execution_time or 60
+        msg = (
+            f"[cyan]|INFO||{self.droplet_name}| Waiting for execute {self.linux_service.name}. "
+            f"Wait interval: {wait_interval} seconds"
+        )
+        print(f"[bold cyan]{line}\n{msg}\n{line}")
+
+        with console.status(msg) if self.live_status else nullcontext() as status:
             while True:
-                with Ssh(ServerData(self.get_droplet_ip(), self.droplet_config.default_user)) as ssh:
-                    ssh_executer = SshExecuter(ssh, linux_service=self.linux_service)
-                    out = ssh_executer.get_service_status()
-                    service_status = out.stdout.lower() if out.stdout else None
-
-                    if service_status and service_status != active_status.lower():
-                        return print(
-                            f"[blue]{line}\n|INFO| Service {self.linux_service.name} log:\n"
-                            f"{line}\n\n{ssh_executer.get_service_log(1000)}\n{line}\n\n"
-                            f"[green]|INFO||{ssh.server.ip}| Service [cyan]{self.linux_service.name}[/] "
-                            f"deactivated with status [cyan]{service_status}[/]. "
-                            f"Exit Code: [cyan]{ssh_executer.get_service_exit_code()}[/] "
-                            f"Exit Status Code: [cyan]{ssh_executer.get_service_exit_status()}[/]"
-                        )
+                out = ssh_executer.get_service_status()
+                service_status = out.stdout.lower() if out.stdout else None
+
+                if service_status and service_status != active_status.lower():
+                    return ssh_executer.get_service_state()
 
+                if status:
                     status.update(f"{msg}\n{ssh_executer.get_service_log(line_num=20)}")
-                    time.sleep(wait_interval)
+                else:
+                    print(f"[cyan]|INFO||{self.droplet_name}| Service {self.linux_service.name} is {service_status}")
 
+                time.sleep(wait_interval)
+
+    @traced
     @droplet_exists
     def download_report(self):
         """
-        Downloads a report from the droplet using SFTP.
+        Downloads a report from the droplet as a stream over the SSH session.
+        If live sync is enabled, only the files changed since the last sync pass are downloaded.
+        The timings of the remote stages written by the run script are added to the trace.
+        If all tests are cached, an empty report is created for the cached results instead.
+        """
+        if self.all_cached:
+            header = next((result.header for result in self.cached_results.values() if result.header), None)
+            return self.report.create(header or '<tr><th>Test</th><th>Status</th><th>Duration</th></tr>')
+
+        if not self.live_sync:
+            self.session.call(lambda: self.report.download(self.session))
+        else:
+            files, transferred = self.session.call(self._create_report_sync().sync)
+            print(
+                f"[green]|INFO| Final report sync: [cyan]{files}[/] files ({transferred / 1024 ** 2:.1f} MB) "
+                f"to {self.report.dir}"
+            )
+
+        markers = join(self.report.dir, 'out', self.path.trace_markers_name)
+        Tracer().add_markers(markers, track=f"{self.droplet_name} remote") if isfile(markers) else None
+
+    def _create_report_sync(self) -> ReportSync:
+        return ReportSync(
+            self.session, self.path.remote_report_dir, join(self.report.dir, 'out'), state_dir=self.tmp_dir
+        )
+
+    def _live_report_sync(self):
+        """
+        :return: The context that mirrors the report every `live_sync` seconds, if live sync is enabled.
+        """
+        if not self.live_sync:
+            return nullcontext()
+
+        report_sync = self._create_report_sync()
+        report_sync.reset()
+        print(f"[green]|INFO| Live report sync to {report_sync.local_dir} every [cyan]{self.live_sync}[/] seconds")
+        return report_sync.live(self.live_sync)
+
+    @droplet_exists
+    def provision_droplet(self) -> None:
+        """
+        Run only the provisioning steps of the script on the droplet and wait for them to finish.
+        :raises ImageBakeError: If the provisioning script failed.
+        """
+        Dir.create(self.tmp_dir, stdout=False)
+        self.session.call(lambda: self._create_uploader().upload_provisioning_files())
+        SshExecuter(self.session, linux_service=self.linux_service).start_script_service()
+
+        state = self.wait_execute_script()
+        if state.exit_status != 0:
+            raise ImageBakeError(f"|ERROR| Provisioning of the droplet failed with exit status {state.exit_status}")
+
+    @traced
+    def lease_pool_droplet(self) -> None:
+        """
+        Lease a warm droplet from the pool for the configured browser and image, or create a new pool member.
+        The workspace of the previous run on the leased droplet is cleaned.
+        """
+        self.droplet_name = self.pool.lease(self.puppeteer_config.browser.lower(), self._get_pool_image_key())
+        self.create_test_droplet()
+        self.reset_workspace()
+
+    @traced
+    def return_pool_droplet(self) -> None:
+        """
+        Return the leased droplet to the pool. Idle pool members exceeding the pool size or TTL are deleted.
+        """
+        self.close_session()
+        self.pool.release(self.droplet_name)
+
+    def warm_pool(self) -> None:
+        """
+        Create and provision droplets until the pool has PoolConfig.size free members for the configured browser.
+        """
+        missing = self.pool.missing(self.puppeteer_config.browser.lower(), self._get_pool_image_key())
+        print(f"[green]|INFO| Warming up [cyan]{missing}[/] pool droplets")
+
+        for _ in range(missing):
+            self.droplet_name = self.pool.lease(self.puppeteer_config.browser.lower(), self._get_pool_image_key())
+            self.create_test_droplet()
+            self.move_to_user_project()
+            self.provision_droplet()
+            self.return_pool_droplet()
+
+    @traced
+    @droplet_exists
+    def reset_workspace(self) -> None:
+        """
+        Remove the report, the result archive and the service journal left by the previous run on the droplet.
         """
-        with Sftp(ServerData(self.get_droplet_ip(), self.droplet_config.default_user)) as sftp:
-            self.report.download(sftp)
+        SshExecuter(self.session, linux_service=self.linux_service).reset_workspace(
+            [self.path.remote_report_dir, self.path.remote_result_archive]
+        )
+
+    def _get_pool_image_key(self) -> str:
+        return self.image_registry.key(
+            self.droplet_config.image,
+            self.puppeteer_config.browser,
+            self.puppeteer_run_script.provisioning_fingerprint
+        )
+
+    def bake_image(self) -> int:
+        """
+        Provision a droplet from the base image, take its snapshot and record it in the image registry.
+        Subsequent test droplets are created from the snapshot and skip the provisioning steps.
+
+        The bake droplet is deleted whatever the result.
+
+        :return: The ID of the created snapshot.
+        :raises ImageBakeError: If the provisioning script failed or the snapshot is not found.
+        """
+        browser = self.puppeteer_config.browser.lower()
+        fingerprint = self.puppeteer_run_script.provisioning_fingerprint
+        snapshot_name = f"{self.droplet_config.name}-{browser}-{fingerprint}"
+        self.droplet_name = f"{self.droplet_config.name}-bake-{browser}"
+
+        self.create_test_droplet(image=self.droplet_config.image)
+        try:
+            self.move_to_user_project()
+            self.provision_droplet()
+            self.close_session()
+
+            print(f"[green]|INFO| Taking snapshot [cyan]{snapshot_name}[/] of the droplet {self.droplet_name}")
+            self.droplet.take_snapshot(snapshot_name, return_dict=False, power_off=True).wait(update_every_seconds=10)
+            snapshot = next((image for image in self.droplet.get_snapshots() if image.name == snapshot_name), None)
+            if snapshot is None:
+                raise ImageBakeError(f"|ERROR| Snapshot {snapshot_name} of the droplet {self.droplet_name} not found")
+
+            self.image_registry.add(self.droplet_config.image, browser, fingerprint, snapshot.id, snapshot_name)
+            print(f"[green]|INFO| Image [cyan]{snapshot_name}[/] (id: [cyan]{snapshot.id}[/]) is baked")
+            return snapshot.id
+        finally:
+            self.delete_test_droplet()
+
+    @traced
+    def get_failed_tests(self) -> list[str]:
+        """
+        Find the test files of the tests that did not pass in the downloaded report.
+        The tests are matched to the puppeteer files by their relative paths or file names.
+
+        :return: The failed test files relative to the puppeteer files directory.
+        """
+        if not isfile(self.report.path):
+            print(f"[red]|ERROR| Report not exists {self.report.path}")
+            return []
+
+        failed = {
+            result.test for result in ReportParser().parse(self.report.path)
+            if result.status not in ('passed', 'skipped')
+        }
+        files = self._match_test_files(failed, TestSharder().get_files())
+        unknown = failed - set(files)
+        if unknown:
+            print(f"[red]|WARNING| The failed tests are not found in the puppeteer files: {', '.join(sorted(unknown))}")
+        return sorted(set(files.values()))
+
+    @staticmethod
+    def _match_test_files(tests: Iterable[str], files: Iterable[str]) -> dict[str, str]:
+        """
+        Match the tests of a report to the puppeteer files by their relative paths or file names.
+        :param tests: The names of the tests in the report.
+        :param files: The test files relative to the puppeteer files directory.
+        :return: The matched test files by the names of the tests.
+        """
+        files = set(files)
+        names = {}
+        for file in sorted(files):
+            names.setdefault(basename(file), file)
+        return {test: test if test in files else names[test] for test in tests if test in files or test in names}
+
+    @property
+    def all_cached(self) -> bool:
+        """
+        True if all tests of the run are skipped, since their passed results are cached.
+        """
+        return bool(self.cached_results) and self.puppeteer_run_script.test_list == []
+
+    @traced
+    def skip_cached_tests(self) -> None:
+        """
+        Remove the tests with a cached passed result from the test list of the run.
+        A result is reused only if the puppeteer scripts, the input file, the DocumentServer version,
+        the browser and the test options are the same as in the run that stored it.
+        """
+        files = self.puppeteer_run_script.test_list
+        if files is None:
+            files = sorted(self.shard.files if self.shard else TestSharder().get_files())
+
+        keys = self._result_keys(files)
+        if not keys:
+            return print("[red]|WARNING| The result cache is not used: the DocumentServer version is unknown")
+
+        self.cached_results = self.result_cache.get(keys)
+        if self.cached_results:
+            self.puppeteer_run_script.test_list = [file for file in files if file not in self.cached_results]
+        print(
+            f"[green]|INFO||{self.droplet_name}| [cyan]{len(self.cached_results)}[/] of [cyan]{len(files)}[/] tests "
+            f"are skipped, their passed results are cached"
+        )
+
+    def cache_results(self) -> None:
+        """
+        Store the passed results of the tests run on the droplet in the result cache
+        and add the cached results of the skipped tests to the report.
+        """
+        rows = self.report.test_rows()
+        header = self.report.test_header()
+        passed = {
+            result.test: result for result in ReportParser().parse(self.report.path)
+            if result.status == 'passed' and result.test in rows
+        } if rows else {}
+
+        files = self._match_test_files(passed, TestSharder().get_files())
+        keys = self._result_keys(files.values())
+        stored = self.result_cache.add({
+            keys[file]: CachedResult(test, 'passed', passed[test].duration, rows[test], header)
+            for test, file in files.items() if file in keys
+        })
+
+        added = self.report.add_rows([result.row for result in self.cached_results.values() if result.row])
+        print(
+            f"[green]|INFO| [cyan]{stored}[/] passed results are saved to the result cache, "
+            f"[cyan]{added}[/] cached results are added to the report"
+        )
+
+    def _result_keys(self, files: Iterable[str]) -> dict[str, str]:
+        """
+        :param files: The test files relative to the puppeteer files directory.
+        :return: The result cache keys by the test files. Empty if the DocumentServer version is unknown.
+        """
+        if not self.ds_version:
+            return {}
+
+        manifest = self.archive.manifest()
+        files_dir = relpath(self.path.local_puppeteer_files_dir, self.path.local_puppeteer_dir).replace(os.sep, '/')
+        script_digest = ResultCache.script_digest(manifest, files_dir)
+        options = {
+            'testOptions': self.puppeteer_config.test_options.model_dump(exclude={'url'}),
+            'flags': {
+                name: value for name, value in (self.flags or {}).items()
+                if name not in ('threads', 'retries') and value is not None
+            }
+        }
+        return {
+            file: ResultCache.key(
+                script_digest, manifest[f"{files_dir}/{file}"], self.ds_version, self.puppeteer_config.browser, options
+            )
+            for file in files if f"{files_dir}/{file}" in manifest
+        }
+
+    @traced
+    def rerun_failed(self) -> None:
+        """
+        Rerun the failed tests of the downloaded report on the saved droplet and merge the results into the report.
+
+        The provisioning is skipped if the droplet was provisioned with the same fingerprint,
+        and only the puppeteer files changed since the last upload are transferred.
+        The rerun report is downloaded to a temporary directory and its rows replace the rows of the same tests
+        in the report. The rerun is not recorded in the run history, since it is not a run of the whole suite.
+        """
+        self.clone_puppeteer_repo()
+        failed = self.get_failed_tests()
+        if not failed:
+            return print(f"[green]|INFO| There are no failed tests to rerun in {self.report.path}")
+
+        self.droplet = self.do.droplet.get_by_name(self.droplet_name)
+        if not self.droplet:
+            return print(
+                f"[red]|ERROR| Droplet [cyan]{self.droplet_name}[/] was not found. "
+                f"Run the tests with --save_droplet to keep the droplet for reruns"
+            )
+
+        print(f"[green]|INFO| Rerunning [cyan]{len(failed)}[/] failed tests on the droplet [cyan]{self.droplet_name}")
+        report = self.report
+        self.puppeteer_run_script.test_list = failed
+        self._report = Report(
+            version=self.ds_version,
+            browser=self.puppeteer_config.browser,
+            report_dir=join(self.tmp_dir, 'rerun', 'report')
+        )
+        try:
+            self.reset_workspace()
+            self.run_script_on_droplet()
+            self.wait_execute_script()
+            self.download_report()
+            self.report.convert_paths_to_relative()
+            report.merge_rerun(self.report)
+        finally:
+            self._report = report
+            self.close_session()
 
     def handle_report(self):
         """
         Processing the report
         """
         self.report.convert_paths_to_relative()
+        TelemetryReport(join(self.report.dir, 'out')).render()
+        self.record_history()
+        self.cache_results() if self.result_cache else None
+
+    def record_history(self) -> None:
+        """
+        Parse the statuses and durations of the tests from the report and store them in the run history.
+        """
+        if not isfile(self.report.path):
+            return
+
+        results = ReportParser().parse(self.report.path)
+        if not results:
+            return print(f"[red]|WARNING| No test results found in the report {self.report.path}")
+
+        run_id = self.history.add_run(
+            results,
+            ds_version=self.ds_version,
+            browser=self.puppeteer_config.browser,
+            droplet_size=self.droplet_size,
+            commit=PuppeterRepo.get_commit(self.path.local_dep_test)
+        )
+        print(f"[green]|INFO| Results of [cyan]{len(results)}[/] tests are saved to the run history, run id: {run_id}")
 
-    def _prepare_tmp_dir(self) -> None:
+    def prepare_tmp_dir(self) -> None:
         """
-        Create a temporary directory for storing script and other files.
+        Create a temporary directory for storing script and other files. Called at the start of a test run.
 
         If the directory already exists, it will be deleted first. The deletion process will handle any permission issues by
         changing the permissions of the files and directories to ensure they can be removed.
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from os import makedirs
+from os.path import dirname
+from typing import Optional
+
+from rich import print
+
+from data.decorators import singleton
+
+
+@singleton
+class Tracer:
+    """
+    A singleton class to record the timing spans of a run and export them in the Chrome trace-event format.
+
+    Local spans are recorded per thread, so the spans of the methods called by a pipeline stage are nested
+    under the stage. Remote spans are added from the wall-clock timestamps written by the run script
+    and are shown on a separate track of each droplet. The exported file can be opened in Perfetto
+    or chrome://tracing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._tracks: dict[str, int] = {}
+
+    def reset(self) -> None:
+        """
+        Remove the recorded spans.
+        """
+        with self._lock:
+            self._events, self._tracks = [], {}
+
+    @contextmanager
+    def span(self, name: str, category: str, track: Optional[str] = None, **args):
+        """
+        Record the execution time of the block.
+        :param name: The name of the span.
+        :param category: The category of the span, e.g. 'stage' or 'tools'.
+        :param track: The name of the track. Defaults to the name of the current thread.
+        :param args: Additional arguments shown with the span.
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, time.time(), track=track or threading.current_thread().name, **args)
+
+    def add(self, name: str, category: str, start: float, end: float, track: str, **args) -> None:
+        """
+        Add a complete span.
+        :param name: The name of the span.
+        :param category: The category of the span.
+        :param start: The start time as a UNIX timestamp in seconds.
+        :param end: The end time as a UNIX timestamp in seconds.
+        :param track: The name of the track.
+        :param args: Additional arguments shown with the span.
+        """
+        with self._lock:
+            if track not in self._tracks:
+                self._tracks[track] = len(self._tracks) + 1
+            self._events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round(start * 1e6),
+                'dur': round(max(end - start, 0) * 1e6),
+                'pid': os.getpid(),
+                'tid': self._tracks[track],
+                'args': {key: str(value) for key, value in args.items()}
+            })
+
+    def add_markers(self, path: str, track: str) -> int:
+        """
+        Add the spans from the marker file written by the run script.
+        Each line of the file is '<name> B|E <UNIX timestamp>', a span is made of its B and E lines.
+
+        :param path: The path to the marker file.
+        :param track: The name of the track of the spans.
+        :return: The number of added spans.
+        """
+        begins, count = {}, 0
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 3 or parts[1] not in ('B', 'E'):
+                    continue
+                name, phase, timestamp = parts[0], parts[1], float(parts[2])
+                if phase == 'B':
+                    begins[name] = timestamp
+                elif name in begins:
+                    self.add(name, 'remote', begins.pop(name), timestamp, track=track)
+                    count += 1
+        return count
+
+    def export(self, path: str) -> str:
+        """
+        Save the recorded spans to a JSON file in the Chrome trace-event format.
+        :param path: The path to the file.
+        :return: The path to the file.
+        """
+        with self._lock:
+            metadata = [
+                {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': track}}
+                for track, tid in self._tracks.items()
+            ]
+            events = sorted(self._events, key=lambda event: event['ts'])
+
+        makedirs(dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f)
+
+        print(f"[green]|INFO| Trace of [cyan]{len(events)}[/] spans is saved to {path}")
+        return path
+
+
+def traced(method):
+    """
+    Record the execution time of the TestTools method with the droplet name as an argument.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with Tracer().span(method.__name__, 'tools', droplet=getattr(self, 'droplet_name', None)):
+            return method(self, *args, **kwargs)
+
+    return wrapper